@@ -0,0 +1,96 @@
+import threading
+import numpy as np
+import pandas as pd
+from forecast import get_forecast_engine
+from queries import get_rotulos
+from tenants import PorTenant
+# --- ANOMALIAS DE CONSUMO POR EQUIPAMENTO ---
+# Parte dos intervalos entre trocas por equipamento × suprimento que o motor de
+# previsão já mantém de forma incremental (somas atualizadas só com as trocas
+# novas). Cada par é comparado com os pares do mesmo modelo de equipamento e do
+# mesmo suprimento; quando há poucos pares assim, a base passa a ser a categoria
+# e o tipo do suprimento. A comparação usa o z-score robusto (mediana e MAD,
+# 0,6745·(x − mediana)/MAD) do logaritmo do intervalo médio, de modo que trocar
+# duas vezes mais rápido que os pares pesa o mesmo que duas vezes mais devagar e
+# poucos equipamentos extremos não deslocam a base. O resultado é guardado por
+# versão dos dados: enquanto nenhuma troca entra ou sai, a página só lê o cache.
+Z_PADRAO = 3.5
+MINIMO_INTERVALOS = 3
+MINIMO_PARES = 5
+# MAD nulo (metade dos pares com o mesmo intervalo): usa o desvio absoluto médio,
+# com a constante que o torna comparável ao MAD numa distribuição normal.
+_CONSTANTE_MAD = 0.6745
+_CONSTANTE_MEAN_AD = 0.7979
+def _z_robusto(valores, grupos):
+    """z-score robusto de cada valor dentro do seu grupo (Series alinhadas)."""
+    agrupado = valores.groupby(grupos)
+    mediana = agrupado.transform('median')
+    desvio = (valores - mediana).abs()
+    mad = desvio.groupby(grupos).transform('median')
+    mean_ad = desvio.groupby(grupos).transform('mean')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.where(mad > 0, _CONSTANTE_MAD * (valores - mediana) / mad, np.where(mean_ad > 0, _CONSTANTE_MEAN_AD * (valores - mediana) / mean_ad, 0.0))
+    return pd.Series(z, index=valores.index), mediana
+def calcular_anomalias(intervalos, rotulos, minimo_intervalos=MINIMO_INTERVALOS, minimo_pares=MINIMO_PARES):
+    """Pares equipamento × suprimento com o z-score em relação à base de comparação.
+
+    `intervalos` é o DataFrame de ForecastEngine.intervalos(). Pares com menos de
+    `minimo_intervalos` intervalos ficam de fora; a base modelo × suprimento só é
+    usada quando tem pelo menos `minimo_pares` pares.
+    """
+    df = intervalos[(intervalos['Trocas'] - 1 >= minimo_intervalos) & (intervalos['Intervalo Médio (dias)'] > 0)].copy()
+    if df.empty:
+        return df
+    df['Categoria'] = df['ID Suprimento'].map(rotulos.get('Categoria', {})).fillna('Não definida')
+    df['Tipo'] = df['ID Suprimento'].map(rotulos.get('Tipo', {})).fillna('Não definido')
+    log_intervalo = np.log(df['Intervalo Médio (dias)'].astype(float))
+    grupo_modelo = df['Equipamento'] + " · " + df['Suprimento']
+    grupo_categoria = df['Categoria'] + " · " + df['Tipo']
+    z_modelo, mediana_modelo = _z_robusto(log_intervalo, grupo_modelo)
+    z_categoria, mediana_categoria = _z_robusto(log_intervalo, grupo_categoria)
+    pares_modelo = grupo_modelo.map(grupo_modelo.value_counts())
+    usa_modelo = pares_modelo >= minimo_pares
+    df['Base'] = np.where(usa_modelo, "Modelo: " + grupo_modelo, "Categoria: " + grupo_categoria)
+    df['Pares na Base'] = np.where(usa_modelo, pares_modelo, grupo_categoria.map(grupo_categoria.value_counts()))
+    df['Intervalo da Base (dias)'] = np.exp(np.where(usa_modelo, mediana_modelo, mediana_categoria))
+    df['Z Robusto'] = np.where(usa_modelo, z_modelo, z_categoria)
+    # Quantas vezes mais rápido que a base o equipamento troca este suprimento.
+    df['Ritmo vs. Base'] = df['Intervalo da Base (dias)'] / df['Intervalo Médio (dias)']
+    colunas = ['Setor', 'Equipamento', 'Suprimento', 'Categoria', 'Tipo', 'Trocas', 'Intervalo Médio (dias)', 'Consumo Mensal', 'Base', 'Pares na Base', 'Intervalo da Base (dias)', 'Ritmo vs. Base', 'Z Robusto', 'Última Troca', 'ID Equipamento', 'ID Suprimento']
+    return df[colunas].sort_values('Z Robusto', ignore_index=True)
+def classificar(df, limiar=Z_PADRAO):
+    """Rótulo de cada par: consumo acima (intervalo curto) ou abaixo (intervalo longo) da base, ou normal."""
+    return pd.Series(np.select([df['Z Robusto'] <= -limiar, df['Z Robusto'] >= limiar], ['Consumo acima da base', 'Consumo abaixo da base'], 'Normal'), index=df.index)
+class AnomalyCache:
+    """Último resultado de calcular_anomalias por versão dos dados, rótulos e parâmetros."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chave = None
+        self._rotulos = None
+        self._resultado = None
+        self.calculos = 0
+        self.acertos = 0
+    def obter(self, minimo_intervalos=MINIMO_INTERVALOS, minimo_pares=MINIMO_PARES):
+        engine = get_forecast_engine()
+        versao = engine.refresh()
+        rotulos = get_rotulos() or {}
+        chave = (versao, minimo_intervalos, minimo_pares)
+        with self._lock:
+            # Os rótulos vêm do cache de cadastros: um objeto novo significa cadastro alterado.
+            if chave == self._chave and rotulos is self._rotulos:
+                self.acertos += 1
+                return self._resultado
+        resultado = calcular_anomalias(engine.intervalos(), rotulos, minimo_intervalos, minimo_pares)
+        with self._lock:
+            self._chave, self._rotulos, self._resultado = chave, rotulos, resultado
+            self.calculos += 1
+        return resultado
+    def stats(self):
+        with self._lock:
+            return {"versao": self._chave[0] if self._chave else None, "calculos": self.calculos, "acertos": self.acertos}
+_caches = PorTenant(AnomalyCache)
+def get_anomalias(minimo_intervalos=MINIMO_INTERVALOS, minimo_pares=MINIMO_PARES):
+    """Anomalias do tenant corrente (só recalculadas quando chegam ou saem trocas). Não altere o DataFrame devolvido."""
+    return _caches.get().obter(minimo_intervalos, minimo_pares)
+def anomalias_stats():
+    return _caches.get().stats()
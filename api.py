@@ -0,0 +1,257 @@
+import argparse
+import hmac
+import json
+import logging
+import tempfile
+import uuid
+from datetime import date, datetime
+from starlette.applications import Starlette
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from audit import iniciar_auditoria, definir_ator
+from db import set_error_handler, execute_query, commit_changes, rollback_changes, get_pool_metrics
+from export import FORMATOS, write_export
+from instrumentation import metrics
+from queries import COLUNAS_HISTORICO, get_users, get_equipamentos, get_suprimentos, get_change_logs_page, get_change_log, count_change_logs, registrar_troca, apagar_troca
+from rollup import count_rollup
+from search import palavras
+from settings import section, resolver_tenant, tenant_config
+from tenants import PADRAO, definir_tenant, tenant_atual
+# --- API HTTP (JSON) ---
+# Mesma camada de dados da interface (pool, cache de cadastros, rollup e estoque),
+# exposta para scripts e para o sistema de chamados sem uma sessão do Streamlit.
+# As rotas são assíncronas e cada operação de banco roda inteira numa thread do
+# threadpool, de modo que a transação presa à thread começa e termina nela.
+# Execução: uvicorn api:app --port 8000   (ou python api.py --port 8000)
+# Autenticação: cabeçalho "Authorization: Bearer <token>" com o [api] token das
+# secrets. Sem token configurado a API aceita só leituras.
+# Tenant: pelo host da requisição (hosts em [tenants.<id>]); o cabeçalho
+# "X-Tenant: <id>" só vale com [tenants] por_parametro = true. Sem nenhum dos dois,
+# o tenant padrão. Os outros tenants só são atendidos com o próprio token em
+# [tenants.<id>.api] token: o [api] token de nível superior vale só para o padrão.
+def _raise_error(message, exc=None):
+    # Na API os erros de banco viram exceções e respostas 500, em vez de None.
+    if exc is not None:
+        raise exc
+    raise RuntimeError(message)
+set_error_handler(_raise_error)
+_logger = logging.getLogger(__name__)
+iniciar_auditoria()
+_config = section("api")
+metrics.configure(slow_query_ms=section("diagnostics").get("slow_query_ms", 500), log_file=section("diagnostics").get("log_file"))
+LIMITE_MAXIMO = int(_config.get("max_page_size", 500))
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+class JSON(JSONResponse):
+    def render(self, content):
+        return json.dumps(content, ensure_ascii=False, default=_json_default, separators=(",", ":")).encode("utf-8")
+def _definir_tenant(request):
+    # A ContextVar do tenant definida aqui é copiada pelo run_in_threadpool para a thread da operação.
+    try:
+        definir_tenant(resolver_tenant(request.headers.get("host"), request.headers.get("x-tenant")))
+    except ValueError as e:
+        raise HTTPException(404, str(e))
+def _token_do_tenant(tenant):
+    if tenant == PADRAO:
+        return section("api").get("token")
+    # Sem herdar o token de nível superior: o cliente de um órgão não abre os dados de outro.
+    return tenant_config(tenant).get("api", {}).get("token")
+def _autorizar(request, escrita=False):
+    _definir_tenant(request)
+    tenant = tenant_atual()
+    token = _token_do_tenant(tenant)
+    if not token and tenant != PADRAO:
+        raise HTTPException(403, f"A API não atende o tenant '{tenant}': defina [tenants.{tenant}.api] token nas secrets.")
+    if not token:
+        if escrita:
+            raise HTTPException(403, "API somente leitura: defina [api] token nas secrets para liberar escritas.")
+        return
+    enviado = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+    if not hmac.compare_digest(enviado.encode(), str(token).encode()):
+        raise HTTPException(401, "Token inválido ou ausente.")
+def _int(valor, nome, minimo=None, maximo=None, padrao=None):
+    if valor in (None, ""):
+        if padrao is None:
+            raise HTTPException(400, f"Parâmetro obrigatório: {nome}.")
+        return padrao
+    try:
+        numero = int(valor)
+    except (TypeError, ValueError):
+        raise HTTPException(400, f"'{nome}' deve ser um número inteiro.")
+    if (minimo is not None and numero < minimo) or (maximo is not None and numero > maximo):
+        raise HTTPException(400, f"'{nome}' fora do intervalo permitido.")
+    return numero
+def _filtros(request):
+    params = request.query_params
+    mes = params.get("mes") or None
+    if mes:
+        try:
+            datetime.strptime(mes, "%Y-%m")
+        except ValueError:
+            raise HTTPException(400, "'mes' deve estar no formato AAAA-MM.")
+    return {"categoria": params.get("categoria") or None, "setor": params.get("setor") or None, "mes": mes, "busca": params.get("busca") or None}
+# --- ROTAS ---
+async def saude(request):
+    _definir_tenant(request)
+    try:
+        pool = await run_in_threadpool(get_pool_metrics)
+    except Exception as e:
+        _logger.error("Verificação de saúde falhou: %s", e)
+        return JSON({"status": "erro", "erro": "Banco de dados indisponível."}, status_code=503)
+    return JSON({"status": "ok", "pool": pool})
+async def listar_setores(request):
+    _autorizar(request)
+    return JSON(await run_in_threadpool(get_users) or [])
+async def listar_equipamentos(request):
+    _autorizar(request)
+    setor_id = _int(request.query_params.get("setor_id"), "setor_id", minimo=1, padrao=0) or None
+    equipamentos = await run_in_threadpool(get_equipamentos, setor_id) or []
+    return JSON([{'id': eq['id'], 'modelo': eq['modelo'], 'categoria': eq['categoria'], 'setor': eq['usuarios']['name']} for eq in equipamentos])
+async def listar_suprimentos(request):
+    _autorizar(request)
+    return JSON(await run_in_threadpool(get_suprimentos, request.query_params.get("categoria") or None) or [])
+def _pagina_trocas(filtros, sort_by, ascending, limit, offset):
+    # Sem busca textual o total vem do rollup; com ela, da contagem das trocas encontradas.
+    if palavras(filtros["busca"]):
+        total = count_change_logs(**filtros)
+    else:
+        total = count_rollup(filtros["categoria"], filtros["setor"], filtros["mes"])
+    return total, get_change_logs_page(**filtros, sort_by=sort_by, ascending=ascending, limit=limit, offset=offset)
+async def listar_trocas(request):
+    _autorizar(request)
+    params = request.query_params
+    filtros = _filtros(request)
+    sort_by = params.get("ordenar_por", "Data")
+    if sort_by not in COLUNAS_HISTORICO:
+        raise HTTPException(400, f"'ordenar_por' deve ser um de: {', '.join(COLUNAS_HISTORICO)}.")
+    ascending = params.get("ordem", "desc").lower() == "asc"
+    limit = _int(params.get("limite"), "limite", minimo=1, maximo=LIMITE_MAXIMO, padrao=50)
+    offset = _int(params.get("deslocamento"), "deslocamento", minimo=0, padrao=0)
+    total, itens = await run_in_threadpool(_pagina_trocas, filtros, sort_by, ascending, limit, offset)
+    return JSON({"total": total, "limite": limit, "deslocamento": offset, "itens": itens})
+async def obter_troca(request):
+    _autorizar(request)
+    troca = await run_in_threadpool(get_change_log, request.path_params["troca_id"])
+    if not troca:
+        raise HTTPException(404, "Troca não encontrada.")
+    return JSON(troca)
+def _validar_troca(dados):
+    """Mesmas regras do 'Registrar Troca': o equipamento é do setor e o suprimento da categoria dele."""
+    equipamento = execute_query("SELECT id, setor_id, categoria FROM equipamentos WHERE id = %s;", (dados["equipamento_id"],), fetch="one")
+    if not equipamento or equipamento['setor_id'] != dados["setor_id"]:
+        raise HTTPException(422, "Equipamento não encontrado no setor informado.")
+    if not equipamento['categoria']:
+        raise HTTPException(422, "O equipamento não tem uma categoria definida.")
+    suprimento = execute_query("SELECT id, categoria FROM suprimentos WHERE id = %s;", (dados["suprimento_id"],), fetch="one")
+    if not suprimento or suprimento['categoria'] != equipamento['categoria']:
+        raise HTTPException(422, f"Suprimento não cadastrado na categoria '{equipamento['categoria']}'.")
+def _ator(request):
+    return f"api:{request.client.host}" if request.client else "api"
+def _registrar(dados, ator):
+    # As threads do threadpool são reaproveitadas: o ator é definido a cada operação.
+    definir_ator(ator)
+    iniciar_auditoria()
+    _validar_troca(dados)
+    try:
+        log_id = registrar_troca(dados["setor_id"], dados["equipamento_id"], dados["suprimento_id"], dados["data"], dados["observacao"])
+        commit_changes()
+    except Exception:
+        rollback_changes()
+        raise
+    return log_id
+async def criar_troca(request):
+    _autorizar(request, escrita=True)
+    try:
+        corpo = await request.json()
+    except ValueError:
+        raise HTTPException(400, "Corpo da requisição deve ser um JSON.")
+    if not isinstance(corpo, dict):
+        raise HTTPException(400, "Corpo da requisição deve ser um objeto JSON.")
+    try:
+        data_troca = date.fromisoformat(corpo["data"]) if corpo.get("data") else date.today()
+    except (TypeError, ValueError):
+        raise HTTPException(400, "'data' deve estar no formato AAAA-MM-DD.")
+    dados = {
+        "setor_id": _int(corpo.get("setor_id"), "setor_id", minimo=1),
+        "equipamento_id": _int(corpo.get("equipamento_id"), "equipamento_id", minimo=1),
+        "suprimento_id": _int(corpo.get("suprimento_id"), "suprimento_id", minimo=1),
+        "data": data_troca,
+        "observacao": str(corpo.get("observacao") or ""),
+    }
+    log_id = await run_in_threadpool(_registrar, dados, _ator(request))
+    return JSON({"id": log_id}, status_code=201)
+def _apagar(log_id, ator):
+    definir_ator(ator)
+    iniciar_auditoria()
+    if not get_change_log(log_id):
+        return False
+    try:
+        apagar_troca(log_id)
+        commit_changes()
+    except Exception:
+        rollback_changes()
+        raise
+    return True
+async def excluir_troca(request):
+    _autorizar(request, escrita=True)
+    if not await run_in_threadpool(_apagar, request.path_params["troca_id"], _ator(request)):
+        raise HTTPException(404, "Troca não encontrada.")
+    return Response(status_code=204)
+def _gerar_exportacao(formato, filtros):
+    arquivo = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    write_export(arquivo, formato, **filtros)
+    arquivo.seek(0)
+    return arquivo
+def _ler_blocos(arquivo, tamanho=256 * 1024):
+    try:
+        while bloco := arquivo.read(tamanho):
+            yield bloco
+    finally:
+        arquivo.close()
+async def exportar_trocas(request):
+    _autorizar(request)
+    formato = request.query_params.get("formato", "CSV")
+    if formato not in FORMATOS:
+        raise HTTPException(400, f"'formato' deve ser um de: {', '.join(FORMATOS)}.")
+    # O arquivo é gerado em blocos vindos do banco (como no dashboard) e enviado em partes.
+    arquivo = await run_in_threadpool(_gerar_exportacao, formato, _filtros(request))
+    info = FORMATOS[formato]
+    return StreamingResponse(
+        iterate_in_threadpool(_ler_blocos(arquivo)),
+        media_type=info['mime'],
+        headers={"Content-Disposition": f'attachment; filename="historico_trocas.{info["extensao"]}"'},
+    )
+async def _erro_http(request, exc):
+    return JSON({"erro": exc.detail}, status_code=exc.status_code)
+async def _erro_interno(request, exc):
+    # O detalhe (SQL, tabelas, conexão) fica no log do servidor; o cliente recebe só
+    # um código para localizá-lo.
+    codigo = uuid.uuid4().hex[:12]
+    _logger.error("Erro interno %s em %s %s", codigo, request.method, request.url.path, exc_info=exc)
+    return JSON({"erro": "Erro interno.", "codigo": codigo}, status_code=500)
+routes = [
+    Route("/api/saude", saude),
+    Route("/api/setores", listar_setores),
+    Route("/api/equipamentos", listar_equipamentos),
+    Route("/api/suprimentos", listar_suprimentos),
+    Route("/api/trocas", listar_trocas),
+    Route("/api/trocas", criar_troca, methods=["POST"]),
+    Route("/api/trocas/exportar", exportar_trocas),
+    Route("/api/trocas/{troca_id:int}", obter_troca),
+    Route("/api/trocas/{troca_id:int}", excluir_troca, methods=["DELETE"]),
+]
+app = Starlette(routes=routes, exception_handlers={HTTPException: _erro_http, Exception: _erro_interno})
+def main(argv=None):
+    import uvicorn
+    parser = argparse.ArgumentParser(description="API HTTP do Gerenciador de Suprimentos.")
+    parser.add_argument("--host", default=_config.get("host", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(_config.get("port", 8000)))
+    parser.add_argument("--workers", type=int, default=1, help="Processos; cada um tem seu próprio pool de conexões.")
+    args = parser.parse_args(argv)
+    uvicorn.run("api:app" if args.workers > 1 else app, host=args.host, port=args.port, workers=args.workers)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+import atexit
+import json
+import logging
+import queue
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from db import on_commit_writes, execute_query, execute_many, commit_changes, rollback_changes
+from instrumentation import metrics
+from settings import section
+from tenants import PADRAO, PorTenant, definir_tenant, tenant_atual
+# --- TRILHA DE AUDITORIA ---
+# Cada INSERT/UPDATE/DELETE confirmado por commit_changes() vira um evento em
+# auditoria_eventos: quando, quem (ator da thread e página), em qual tabela, qual
+# comando com quais parâmetros, quantas linhas e o id gerado. Escritas desfeitas
+# por rollback não são registradas. O commit só põe os eventos numa fila em
+# memória limitada; uma thread grava a fila em lotes, fora do caminho das páginas.
+# Com a fila cheia o commit espera até [audit] espera_maxima segundos por espaço
+# (contrapressão) e, passado esse tempo, o evento é descartado e contado.
+# Tabelas derivadas (rollup, índice de busca) ficam de fora por padrão: são
+# recalculadas a partir de trocas_cartucho, que já aparece na trilha.
+# Cada tenant tem a sua fila e a sua thread, que gravam no banco do próprio tenant.
+_logger = logging.getLogger(__name__)
+_WS_RE = re.compile(r"\s+")
+_OPERACAO_RE = re.compile(r"^\s*(INSERT|REPLACE|UPDATE|DELETE)", re.IGNORECASE)
+_UPSERT_RE = re.compile(r"\bON\s+DUPLICATE\s+KEY\b", re.IGNORECASE)
+IGNORAR_PADRAO = ("trocas_mensais", "trocas_busca")
+_INSERIR_EVENTO = """
+    INSERT INTO auditoria_eventos (criado_em, transacao, ator, pagina, operacao, tabela, linhas, registro_id, comando, parametros)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
+"""
+_local = threading.local()
+def definir_ator(ator):
+    """Quem está agindo na thread atual (ex.: 'interface:1a2b3c4d', 'api:10.0.0.5')."""
+    _local.ator = ator
+def ator_atual():
+    return getattr(_local, "ator", None)
+def _parametros(params, limite=2000):
+    if params is None:
+        return None
+    texto = json.dumps(list(params) if isinstance(params, tuple) else params, ensure_ascii=False, default=str)
+    return texto if len(texto) <= limite else texto[:limite] + "…"
+class AuditWriter:
+    """Fila limitada de eventos de auditoria e a thread que os grava em lotes."""
+    def __init__(self, capacidade=10000, lote=500, intervalo=1.0, espera_maxima=2.0, ignorar=IGNORAR_PADRAO, tenant=PADRAO):
+        self.tenant = tenant
+        self.lote = lote
+        self.intervalo = intervalo
+        self.espera_maxima = espera_maxima
+        self.ignorar = frozenset(t.lower() for t in ignorar) | {"auditoria_eventos"}
+        self._fila = queue.Queue(maxsize=capacidade)
+        self._lock = threading.Lock()
+        self._stats = {"enfileirados": 0, "gravados": 0, "descartados": 0, "falhas": 0, "espera_total": 0.0, "espera_max": 0.0}
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="audit-writer" if tenant == PADRAO else f"audit-writer-{tenant}", daemon=True)
+        self._thread.start()
+    def registrar(self, escritas):
+        """Ouvinte de commit: transforma as escritas da transação em eventos e os põe na fila."""
+        transacao = uuid.uuid4().hex
+        ator, pagina = ator_atual(), metrics.current_page()
+        inicio = time.monotonic()
+        prazo = inicio + self.espera_maxima
+        enfileirados = descartados = 0
+        for instante, tabela, query, params, linhas, registro_id in escritas:
+            if tabela in self.ignorar:
+                continue
+            evento = (instante, transacao, ator, pagina, tabela, query, params, linhas, registro_id)
+            try:
+                self._fila.put(evento, timeout=max(prazo - time.monotonic(), 0))
+                enfileirados += 1
+            except queue.Full:
+                descartados += 1
+        espera = time.monotonic() - inicio
+        with self._lock:
+            self._stats["enfileirados"] += enfileirados
+            self._stats["espera_total"] += espera
+            self._stats["espera_max"] = max(self._stats["espera_max"], espera)
+            if descartados:
+                self._stats["descartados"] += descartados
+        if descartados:
+            _logger.warning("Fila de auditoria cheia: %d evento(s) descartado(s).", descartados)
+    def _proximo_lote(self):
+        try:
+            eventos = [self._fila.get(timeout=self.intervalo)]
+        except queue.Empty:
+            return []
+        while len(eventos) < self.lote:
+            try:
+                eventos.append(self._fila.get_nowait())
+            except queue.Empty:
+                break
+        return eventos
+    def _gravar(self, eventos):
+        linhas = []
+        for instante, transacao, ator, pagina, tabela, query, params, n, registro_id in eventos:
+            operacao = _OPERACAO_RE.match(query)
+            operacao = operacao.group(1).upper() if operacao else "?"
+            # O id gerado só tem sentido num INSERT simples (num upsert ou DELETE o driver devolve o último id da conexão).
+            if operacao != "INSERT" or _UPSERT_RE.search(query):
+                registro_id = None
+            linhas.append((
+                datetime.fromtimestamp(instante), transacao, ator, pagina, operacao, tabela,
+                n if n is not None and n >= 0 else None, registro_id,
+                _WS_RE.sub(" ", query).strip()[:2000], _parametros(params),
+            ))
+        try:
+            execute_many(_INSERIR_EVENTO, linhas, batch_size=self.lote)
+            commit_changes()
+        except Exception as e:
+            rollback_changes()
+            with self._lock:
+                self._stats["falhas"] += len(eventos)
+            _logger.error("Falha ao gravar %d evento(s) de auditoria: %s", len(eventos), e)
+            return
+        with self._lock:
+            self._stats["gravados"] += len(eventos)
+    def _loop(self):
+        definir_tenant(self.tenant)
+        while not (self._parar.is_set() and self._fila.empty()):
+            eventos = self._proximo_lote()
+            if eventos:
+                try:
+                    self._gravar(eventos)
+                finally:
+                    for _ in eventos:
+                        self._fila.task_done()
+    def pendentes(self):
+        return self._fila.qsize()
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["pendentes"] = self.pendentes()
+        stats["capacidade"] = self._fila.maxsize
+        return stats
+    def esvaziar(self, timeout=10.0):
+        """Espera os eventos já enfileirados serem gravados (no máximo `timeout` segundos); devolve True se terminou."""
+        prazo = time.monotonic() + timeout
+        while self._fila.unfinished_tasks:
+            if time.monotonic() >= prazo:
+                return False
+            time.sleep(0.05)
+        return True
+    def fechar(self, timeout=10.0):
+        """Grava o que ainda está na fila e encerra a thread."""
+        self._parar.set()
+        self._thread.join(timeout)
+def _criar_writer():
+    cfg = section("audit")
+    if not cfg.get("enabled", True):
+        return None
+    writer = AuditWriter(
+        capacidade=int(cfg.get("capacidade", 10000)),
+        lote=int(cfg.get("lote", 500)),
+        intervalo=float(cfg.get("intervalo", 1.0)),
+        espera_maxima=float(cfg.get("espera_maxima", 2.0)),
+        ignorar=cfg.get("ignorar", IGNORAR_PADRAO),
+        tenant=tenant_atual(),
+    )
+    atexit.register(writer.fechar)
+    # Registrado só com a auditoria ligada: sem ouvintes, db.py nem anota as escritas.
+    on_commit_writes(_registrar_escritas)
+    return writer
+_writers = PorTenant(_criar_writer)
+def _registrar_escritas(escritas):
+    # Ouvinte de commit: roda no tenant da transação e entrega as escritas à fila dele.
+    writer = _writers.existente()
+    if writer is not None:
+        writer.registrar(escritas)
+def iniciar_auditoria():
+    """Liga a trilha de auditoria do tenant corrente a partir de [audit]; devolve o AuditWriter (None se desligada)."""
+    return _writers.get()
+def get_audit_writer():
+    return _writers.existente()
+# --- CONSULTA DA TRILHA ---
+def _where_eventos(tabela=None, operacao=None, ator=None, desde=None, ate=None):
+    condicoes, params = [], []
+    if tabela:
+        condicoes.append("tabela = %s")
+        params.append(tabela)
+    if operacao:
+        condicoes.append("operacao = %s")
+        params.append(operacao)
+    if ator:
+        condicoes.append("ator LIKE %s")
+        params.append(f"%{ator}%")
+    if desde:
+        condicoes.append("criado_em >= %s")
+        params.append(desde)
+    if ate:
+        condicoes.append("criado_em < %s")
+        params.append(ate)
+    return (" WHERE " + " AND ".join(condicoes)) if condicoes else "", tuple(params)
+def get_eventos(tabela=None, operacao=None, ator=None, desde=None, ate=None, limit=100, offset=0):
+    """Eventos da trilha, do mais recente para o mais antigo."""
+    where, params = _where_eventos(tabela, operacao, ator, desde, ate)
+    query = f"SELECT id, criado_em, transacao, ator, pagina, operacao, tabela, linhas, registro_id, comando, parametros FROM auditoria_eventos{where} ORDER BY id DESC LIMIT %s OFFSET %s;"
+    return execute_query(query, params + (limit, offset), fetch="all") or []
+def count_eventos(tabela=None, operacao=None, ator=None, desde=None, ate=None):
+    where, params = _where_eventos(tabela, operacao, ator, desde, ate)
+    row = execute_query(f"SELECT COUNT(*) AS total FROM auditoria_eventos{where};", params, fetch="one")
+    return row['total'] if row else 0
+def get_tabelas_auditadas():
+    return [row['tabela'] for row in execute_query("SELECT DISTINCT tabela FROM auditoria_eventos ORDER BY tabela;", fetch="all") or []]
@@ -0,0 +1,151 @@
+import re
+import sqlite3
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
+# --- BACKENDS DE ARMAZENAMENTO ---
+# db.py fala com o banco só por meio de um backend: abrir conexões já configuradas,
+# criar cursores, iniciar transações, testar conexões ociosas, reconhecer erros de
+# conexão, rodar EXPLAIN e traduzir o SQL. As consultas da aplicação continuam
+# escritas no dialeto do MariaDB (%s, ON DUPLICATE KEY UPDATE, INSERT IGNORE,
+# DATE_FORMAT, CONCAT_WS...) e o backend SQLite as traduz uma única vez por texto de query.
+# Escolha em [database] backend = "mariadb" (padrão) ou "sqlite".
+class MariaDBBackend:
+    name = "mariadb"
+    def __init__(self, cfg):
+        import mysql.connector  # só é carregado quando o MariaDB é o backend escolhido
+        self._mysql = mysql.connector
+        self.Error = mysql.connector.Error
+        self.cfg = cfg
+    def connect(self):
+        conn = self._mysql.connect(
+            host=self.cfg["host"],
+            port=self.cfg["port"],
+            database=self.cfg["database"],
+            user=self.cfg["username"],
+            password=self.cfg["password"],
+        )
+        # Leituras não precisam de transação: com autocommit ligado cada SELECT enxerga
+        # os dados mais recentes sem um COMMIT/ROLLBACK extra antes de devolver a conexão.
+        conn.autocommit = True
+        return conn
+    def ping(self, conn):
+        conn.ping(reconnect=True, attempts=1, delay=0)
+        conn.autocommit = True
+    def begin(self, conn):
+        conn.start_transaction()
+    def cursor(self, conn, dictionary=False, buffered=True):
+        return conn.cursor(dictionary=dictionary, buffered=buffered)
+    def translate(self, query):
+        return query
+    def is_connection_error(self, e):
+        return isinstance(e, (self._mysql.errors.OperationalError, self._mysql.errors.InterfaceError))
+    def explain(self, cur, query, params, alias):
+        """(índice usado, tipo de acesso, linhas estimadas) da tabela `alias` no plano."""
+        cur.execute("EXPLAIN " + query.strip().rstrip(";"), params)
+        plano = [row for row in cur.fetchall() if row.get('table') == alias]
+        if not plano:
+            return None, None, None
+        return plano[0].get('key'), plano[0].get('type'), plano[0].get('rows')
+# --- SQLITE ---
+_PLACEHOLDER_RE = re.compile(r"%s")
+_INSERT_IGNORE_RE = re.compile(r"\bINSERT\s+IGNORE\s+INTO\b", re.IGNORECASE)
+_ON_DUPLICATE_RE = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.IGNORECASE)
+_VALUES_FN_RE = re.compile(r"\bVALUES\((\w+)\)", re.IGNORECASE)
+_FOR_UPDATE_RE = re.compile(r"\s+FOR\s+UPDATE\b", re.IGNORECASE)
+def _date_format(valor, formato):
+    """DATE_FORMAT do MariaDB para datas ISO (formatos com %Y, %m, %d...)."""
+    if valor is None:
+        return None
+    if not isinstance(valor, (date, datetime)):
+        valor = datetime.fromisoformat(str(valor))
+    return valor.strftime(formato)
+def _concat_ws(separador, *valores):
+    """CONCAT_WS do MariaDB: junta os valores não nulos com o separador."""
+    return separador.join(str(v) for v in valores if v is not None)
+def _dict_factory(cursor, row):
+    return {desc[0]: valor for desc, valor in zip(cursor.description, row)}
+_adaptadores_registrados = False
+def _registrar_adaptadores():
+    # Datas vão para o SQLite como texto ISO e voltam como date/datetime nas colunas
+    # declaradas DATE/DATETIME/TIMESTAMP, como acontece com o mysql.connector.
+    global _adaptadores_registrados
+    if _adaptadores_registrados:
+        return
+    sqlite3.register_adapter(date, date.isoformat)
+    sqlite3.register_adapter(datetime, lambda valor: valor.isoformat(sep=" "))
+    sqlite3.register_converter("DATE", lambda valor: date.fromisoformat(valor.decode()))
+    sqlite3.register_converter("DATETIME", lambda valor: datetime.fromisoformat(valor.decode()))
+    sqlite3.register_converter("TIMESTAMP", lambda valor: datetime.fromisoformat(valor.decode()))
+    _adaptadores_registrados = True
+class SQLiteBackend:
+    """Banco local em arquivo (modo WAL), para uso offline e para benchmarks."""
+    name = "sqlite"
+    Error = sqlite3.Error
+    def __init__(self, cfg):
+        _registrar_adaptadores()
+        self.path = cfg.get("path", "suprimentos.db")
+        self.busy_timeout = float(cfg.get("busy_timeout", 10))
+        self.memoria = self.path == ":memory:"
+        if self.memoria:
+            # Um banco em memória compartilhado por todas as conexões do pool.
+            self.path = f"file:suprimentos_{id(self)}?mode=memory&cache=shared"
+        elif not self.path.startswith("file:"):
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+    def connect(self):
+        # isolation_level=None: autocommit, com as transações abertas explicitamente por begin().
+        # check_same_thread=False: o pool garante que só uma thread usa a conexão por vez.
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout,
+            isolation_level=None,
+            check_same_thread=False,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            uri=self.path.startswith("file:"),
+        )
+        conn.create_function("DATE_FORMAT", 2, _date_format, deterministic=True)
+        conn.create_function("CONCAT_WS", -1, _concat_ws, deterministic=True)
+        if not self.memoria:
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.execute("PRAGMA foreign_keys=ON;")
+        return conn
+    def ping(self, conn):
+        conn.execute("SELECT 1;").fetchone()
+    def begin(self, conn):
+        # IMMEDIATE reserva a escrita já no início: duas transações não leem e depois
+        # disputam o lock de escrita (o que no SQLite terminaria em "database is locked").
+        conn.execute("BEGIN IMMEDIATE;")
+    def cursor(self, conn, dictionary=False, buffered=True):
+        cur = conn.cursor()
+        if dictionary:
+            cur.row_factory = _dict_factory
+        return cur
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def translate(query):
+        query = _PLACEHOLDER_RE.sub("?", query)
+        query = _INSERT_IGNORE_RE.sub("INSERT OR IGNORE INTO", query)
+        if _ON_DUPLICATE_RE.search(query):
+            query = _ON_DUPLICATE_RE.sub("ON CONFLICT DO UPDATE SET", query)
+            query = _VALUES_FN_RE.sub(r"excluded.\1", query)
+        return _FOR_UPDATE_RE.sub("", query)
+    def is_connection_error(self, e):
+        return isinstance(e, sqlite3.ProgrammingError)
+    def explain(self, cur, query, params, alias):
+        cur.execute("EXPLAIN QUERY PLAN " + self.translate(query.strip().rstrip(";")), params or ())
+        detalhes = [row['detail'] if isinstance(row, dict) else row[3] for row in cur.fetchall()]
+        for detalhe in detalhes:
+            palavras = detalhe.split()
+            if alias in palavras:
+                indice = re.search(r"(?:USING (?:COVERING )?INDEX|USING INTEGER PRIMARY KEY) ?(\w*)", detalhe)
+                tipo = "ALL" if palavras[0] == "SCAN" and not indice else palavras[0].lower()
+                return (indice.group(1) or "PRIMARY") if indice else None, tipo, None
+        return None, None, None
+BACKENDS = {"mariadb": MariaDBBackend, "sqlite": SQLiteBackend}
+def create_backend(database_cfg, connections_cfg):
+    """Backend escolhido em [database] backend, configurado por [connections.<backend>]."""
+    nome = database_cfg.get("backend", "mariadb")
+    if nome not in BACKENDS:
+        raise ValueError(f"Backend de banco desconhecido: {nome} (use {', '.join(BACKENDS)}).")
+    return BACKENDS[nome](connections_cfg.get(nome, {}))
@@ -0,0 +1,91 @@
+import argparse
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import _percentile
+# --- TESTE DE CARGA DA API ---
+# Dispara requisições GET em paralelo, cada thread com sua conexão keep-alive, por
+# um tempo fixo, e relata requisições por segundo e percentis de latência por rota.
+# Uso (com a API no ar): python bench/api_load.py --url http://127.0.0.1:8000 --concorrencia 16 --duracao 20
+ROTAS_PADRAO = [
+    "/api/trocas?limite=50",
+    "/api/trocas?limite=50&deslocamento=500",
+    "/api/setores",
+    "/api/suprimentos",
+    "/api/saude",
+]
+def _worker(base, rotas, token, fim, resultados, lock):
+    partes = urlsplit(base)
+    classe = http.client.HTTPSConnection if partes.scheme == "https" else http.client.HTTPConnection
+    conn = classe(partes.hostname, partes.port, timeout=30)
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    locais = {rota: [] for rota in rotas}
+    erros = 0
+    i = 0
+    while time.perf_counter() < fim:
+        rota = rotas[i % len(rotas)]
+        i += 1
+        inicio = time.perf_counter()
+        try:
+            conn.request("GET", rota, headers=headers)
+            resposta = conn.getresponse()
+            resposta.read()
+            if resposta.status >= 400:
+                erros += 1
+        except (OSError, http.client.HTTPException):
+            erros += 1
+            conn.close()
+            conn = classe(partes.hostname, partes.port, timeout=30)
+            continue
+        locais[rota].append((time.perf_counter() - inicio) * 1000)
+    conn.close()
+    with lock:
+        for rota, tempos in locais.items():
+            resultados["latencias"][rota].extend(tempos)
+        resultados["erros"] += erros
+def run(base, rotas, concorrencia, duracao, token=None):
+    resultados = {"latencias": {rota: [] for rota in rotas}, "erros": 0}
+    lock = threading.Lock()
+    inicio = time.perf_counter()
+    fim = inicio + duracao
+    threads = [threading.Thread(target=_worker, args=(base, rotas, token, fim, resultados, lock)) for _ in range(concorrencia)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    decorrido = time.perf_counter() - inicio
+    total = sum(len(v) for v in resultados["latencias"].values())
+    todas = sorted(t for v in resultados["latencias"].values() for t in v)
+    return {
+        "url": base,
+        "concorrencia": concorrencia,
+        "duracao_s": round(decorrido, 2),
+        "requisicoes": total,
+        "erros": resultados["erros"],
+        "req_por_s": round(total / decorrido, 1),
+        "p50_ms": round(_percentile(todas, 50), 2),
+        "p95_ms": round(_percentile(todas, 95), 2),
+        "p99_ms": round(_percentile(todas, 99), 2),
+        "rotas": {
+            rota: {"n": len(v), "p50_ms": round(_percentile(sorted(v), 50), 2), "p95_ms": round(_percentile(sorted(v), 95), 2)}
+            for rota, v in resultados["latencias"].items()
+        },
+    }
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga da API (requisições por segundo).")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rota", action="append", help="Rota a testar (pode repetir); padrão: histórico, cadastros e saúde.")
+    parser.add_argument("--concorrencia", type=int, default=8)
+    parser.add_argument("--duracao", type=float, default=10.0, help="Segundos de teste.")
+    parser.add_argument("--token", default=os.environ.get("API_TOKEN"))
+    args = parser.parse_args(argv)
+    resultado = run(args.url.rstrip("/"), args.rota or ROTAS_PADRAO, args.concorrencia, args.duracao, args.token)
+    print(json.dumps(resultado, ensure_ascii=False, indent=2))
+    return 1 if resultado["erros"] else 0
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+from instrumentation import _percentile
+# --- BENCHMARK DOS CAMINHOS QUENTES DO DASHBOARD ---
+# Para cada escala (número de trocas) um banco SQLite local é populado com
+# synthetic_data.py e, num processo Python novo, são medidos:
+# * get_change_logs (sem filtro e filtrado por setor) e o retrato incremental do
+#   histórico sem mudanças, depois das inclusões e depois das exclusões;
+# * o dashboard como a página o monta hoje (filtros, contagens, gráficos e uma
+#   página do histórico sobre o retrato) e, para comparação, o mesmo pelo rollup
+#   e consultas paginadas no banco e o pipeline em pandas sobre o DataFrame
+#   inteiro lido a cada rerun (filtro, groupby e value_counts);
+# * a exportação CSV do histórico completo;
+# * a busca textual (contagem e primeira página) por uma palavra da observação e
+#   por parte de um modelo;
+# * o registro de uma troca (INSERT + estoque + rollup + commit) e a sua exclusão.
+# Os bancos ficam em --dados e são reaproveitados entre execuções com a mesma semente.
+# O resultado é um JSON; --comparar aponta para um resultado anterior e falha se
+# alguma operação ficar mais lenta que --tolerancia vezes a medida de referência.
+# Uso: python bench/dashboard.py [--escalas 10000 100000 1000000] [--repeticoes 5] [--saida atual.json] [--comparar base.json]
+ESCALAS_PADRAO = [10000, 100000, 1000000]
+def _resumo(tempos, linhas=None):
+    ordenados = sorted(tempos)
+    return {
+        "repeticoes": len(ordenados),
+        "ms_mediana": round(_percentile(ordenados, 50), 2),
+        "ms_min": round(ordenados[0], 2),
+        "ms_p95": round(_percentile(ordenados, 95), 2),
+        "linhas": linhas,
+    }
+def _cronometrar(funcao, repeticoes):
+    tempos, resultado = [], None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return tempos, resultado
+def _popular(trocas, semente):
+    """Popula o banco vazio configurado; devolve os segundos gastos (None se já estava populado)."""
+    from db import execute_query
+    import numpy as np
+    import synthetic_data
+    existentes = execute_query("SELECT COUNT(*) AS n FROM trocas_cartucho;", fetch="one")['n']
+    if existentes == trocas:
+        return None
+    inicio = time.perf_counter()
+    synthetic_data.limpar()
+    rng = np.random.default_rng(semente)
+    cadastros = synthetic_data.gerar_cadastros(rng, 40, 400, 120)
+    synthetic_data.gravar_trocas(*synthetic_data.gerar_trocas(rng, trocas, *cadastros, anos=5))
+    synthetic_data.rebuild_rollup()
+    synthetic_data.rebuild_busca()
+    return round(time.perf_counter() - inicio, 2)
+def _pipeline_pandas(df, setor):
+    """Filtro, groupby e value_counts sobre o DataFrame inteiro, como o dashboard fazia antes do rollup."""
+    filtrado = df[df['Setor'] == setor]
+    return (
+        filtrado['Equipamento'].value_counts(),
+        filtrado['Tipo'].value_counts(),
+        filtrado.groupby(filtrado['Data'].dt.to_period('M'), observed=True).size(),
+        df['Setor'].value_counts(),
+    )
+def _pipeline_rollup(filtros):
+    from queries import get_change_logs_page
+    from rollup import get_rollup_filter_options, count_rollup, count_rollup_by, count_rollup_by_month
+    get_rollup_filter_options()
+    count_rollup(**filtros)
+    count_rollup_by('Equipamento', **filtros)
+    count_rollup_by('Tipo', **filtros)
+    count_rollup_by_month(**filtros)
+    return get_change_logs_page(**filtros, sort_by='Data', ascending=False, limit=50, offset=0)
+def _pipeline_retrato(filtros):
+    from queries import get_change_logs_snapshot, filtrar_historico, opcoes_filtros, contagens_por, contagens_por_mes, pagina_historico
+    historico = get_change_logs_snapshot()
+    opcoes_filtros(historico)
+    filtrado = filtrar_historico(historico, **filtros)
+    contagens_por(filtrado, 'Equipamento')
+    contagens_por(filtrado, 'Tipo')
+    contagens_por_mes(filtrado)
+    return pagina_historico(filtrado, 'Data', False, limit=50, offset=0)
+def medir_escala(trocas, repeticoes, registros, semente):
+    """Roda no processo filho, já com SECRETS_FILE apontando para o banco da escala."""
+    from datetime import date
+    from db import init_pool, execute_query, commit_changes, rollback_changes
+    from export import write_export
+    from migrate import ensure_schema
+    from queries import get_change_logs, get_change_logs_page, get_change_logs_snapshot, count_change_logs, registrar_troca, apagar_troca
+    init_pool()
+    ensure_schema()
+    popular_s = _popular(trocas, semente)
+    setor = execute_query("SELECT u.name FROM trocas_mensais r JOIN usuarios u ON r.usuario_id = u.id GROUP BY u.name ORDER BY SUM(r.total) DESC LIMIT 1;", fetch="one")['name']
+    operacoes = {}
+    tempos, df = _cronometrar(get_change_logs, repeticoes)
+    operacoes["get_change_logs"] = _resumo(tempos, len(df))
+    tempos, df_setor = _cronometrar(lambda: get_change_logs(setor=setor), repeticoes)
+    operacoes["get_change_logs_setor"] = _resumo(tempos, len(df_setor))
+    get_change_logs_snapshot()
+    tempos, df_snapshot = _cronometrar(get_change_logs_snapshot, repeticoes)
+    operacoes["snapshot_sem_mudancas"] = _resumo(tempos, len(df_snapshot))
+    tempos, _ = _cronometrar(lambda: _pipeline_pandas(df, setor), repeticoes)
+    operacoes["dashboard_pandas"] = _resumo(tempos, len(df))
+    tempos, pagina = _cronometrar(lambda: _pipeline_rollup({'categoria': None, 'setor': setor, 'mes': None}), repeticoes)
+    operacoes["dashboard_rollup"] = _resumo(tempos, len(pagina))
+    tempos, pagina = _cronometrar(lambda: _pipeline_retrato({'categoria': None, 'setor': setor, 'mes': None}), repeticoes)
+    operacoes["dashboard_retrato"] = _resumo(tempos, len(pagina))
+    def exportar():
+        with tempfile.TemporaryFile() as arquivo:
+            return write_export(arquivo, "CSV")
+    tempos, linhas = _cronometrar(exportar, repeticoes)
+    operacoes["exportar_csv"] = _resumo(tempos, linhas)
+    for nome, termo in (("buscar_observacao", "bandeja"), ("buscar_modelo", "impressora 001")):
+        tempos, total = _cronometrar(lambda: (count_change_logs(busca=termo), get_change_logs_page(busca=termo, limit=50))[0], repeticoes)
+        operacoes[nome] = _resumo(tempos, total)
+    troca = execute_query("SELECT usuario_id, equipamento_id, suprimento_id FROM trocas_cartucho ORDER BY id LIMIT 1;", fetch="one")
+    ids = []
+    def registrar():
+        try:
+            ids.append(registrar_troca(troca['usuario_id'], troca['equipamento_id'], troca['suprimento_id'], date.today(), "benchmark"))
+            commit_changes()
+        except Exception:
+            rollback_changes()
+            raise
+    tempos, _ = _cronometrar(registrar, registros)
+    operacoes["registrar_troca"] = _resumo(tempos, len(ids))
+    tempos, df_snapshot = _cronometrar(get_change_logs_snapshot, 1)
+    operacoes["snapshot_apos_inclusoes"] = _resumo(tempos, len(df_snapshot))
+    def apagar():
+        try:
+            apagar_troca(ids.pop())
+            commit_changes()
+        except Exception:
+            rollback_changes()
+            raise
+    tempos, _ = _cronometrar(apagar, registros)
+    operacoes["apagar_troca"] = _resumo(tempos, registros)
+    tempos, df_snapshot = _cronometrar(get_change_logs_snapshot, 1)
+    operacoes["snapshot_apos_exclusoes"] = _resumo(tempos, len(df_snapshot))
+    return {"popular_s": popular_s, "operacoes": operacoes}
+def _rodar_escala(trocas, dados, repeticoes, registros, semente):
+    from synthetic_data import VERSAO_GERADOR
+    nome = f"bench_{trocas}_{semente}_v{VERSAO_GERADOR}"
+    banco = os.path.join(dados, f"{nome}.db")
+    secrets = os.path.join(dados, f"{nome}.toml")
+    with open(secrets, "w", encoding="utf-8") as f:
+        f.write(f'[database]\nbackend = "sqlite"\n\n[connections.sqlite]\npath = {json.dumps(banco)}\n')
+    comando = [sys.executable, os.path.abspath(__file__), "--interno", str(trocas), "--repeticoes", str(repeticoes), "--registros", str(registros), "--semente", str(semente)]
+    saida = subprocess.run(comando, cwd=RAIZ, env={**os.environ, "SECRETS_FILE": secrets}, capture_output=True, text=True)
+    if saida.returncode != 0:
+        raise RuntimeError(f"Escala {trocas} falhou:\n{saida.stderr}")
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+def comparar(atual, referencia, tolerancia):
+    """Lista de (escala, operação, razão atual/referência) acima da tolerância."""
+    regressoes = []
+    for escala, medidas in atual["escalas"].items():
+        base = referencia.get("escalas", {}).get(escala, {}).get("operacoes", {})
+        for operacao, resumo in medidas["operacoes"].items():
+            if operacao in base and base[operacao]["ms_mediana"] > 0:
+                razao = resumo["ms_mediana"] / base[operacao]["ms_mediana"]
+                resumo["razao_referencia"] = round(razao, 2)
+                if razao > tolerancia:
+                    regressoes.append((escala, operacao, round(razao, 2)))
+    return regressoes
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do dashboard e do acesso a dados em várias escalas.")
+    parser.add_argument("--escalas", type=int, nargs="+", default=ESCALAS_PADRAO, help="Números de trocas.")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--registros", type=int, default=200, help="Trocas registradas (e apagadas) na medida de escrita.")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--dados", default=os.path.join(tempfile.gettempdir(), "suprimentos_bench"), help="Pasta dos bancos gerados.")
+    parser.add_argument("--saida", help="Grava o resultado em JSON neste arquivo.")
+    parser.add_argument("--comparar", help="Resultado JSON de referência.")
+    parser.add_argument("--tolerancia", type=float, default=1.25, help="Razão máxima aceita em relação à referência.")
+    parser.add_argument("--interno", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.interno:
+        print(json.dumps(medir_escala(args.interno, args.repeticoes, args.registros, args.semente)))
+        return 0
+    os.makedirs(args.dados, exist_ok=True)
+    import numpy
+    import pandas
+    resultado = {
+        "python": sys.version.split()[0],
+        "sqlite": sqlite3.sqlite_version,
+        "pandas": pandas.__version__,
+        "numpy": numpy.__version__,
+        "semente": args.semente,
+        "escalas": {},
+    }
+    for trocas in args.escalas:
+        print(f"Escala {trocas}...", file=sys.stderr)
+        resultado["escalas"][str(trocas)] = _rodar_escala(trocas, args.dados, args.repeticoes, args.registros, args.semente)
+    regressoes = []
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            regressoes = comparar(resultado, json.load(f), args.tolerancia)
+        resultado["regressoes"] = [{"escala": e, "operacao": o, "razao": r} for e, o, r in regressoes]
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    print(texto)
+    return 1 if regressoes else 0
+if __name__ == "__main__":
+    sys.exit(main())
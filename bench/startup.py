@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+# --- BENCHMARK DE INICIALIZAÇÃO ---
+# Mede, cada um num processo Python novo (partida a frio):
+# * o tempo de importação dos módulos da aplicação e de cada página, e quais
+#   bibliotecas pesadas (pandas, plotly, pyarrow, numpy) cada importação carrega;
+# * o tempo até a primeira renderização do app.py (AppTest do Streamlit) e o de
+#   abrir cada página a partir daí.
+# Sem banco acessível as páginas renderizam a tela de erro de conexão; o número
+# continua útil para comparar o custo de importação e de montagem da interface.
+# Uso: python bench/startup.py [--repeticoes 3] [--saida resultado.json]
+PESADAS = ("pandas", "plotly.express", "pyarrow", "numpy", "mysql.connector")
+_MEDIR_IMPORTACAO = """
+import importlib, json, sys, time
+inicio = time.perf_counter()
+importlib.import_module(sys.argv[1])
+decorrido = (time.perf_counter() - inicio) * 1000
+print(json.dumps({"ms": decorrido, "pesadas": [m for m in sys.argv[2:] if m in sys.modules]}))
+"""
+_MEDIR_RENDERIZACAO = """
+import json, sys, time
+inicio = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("app.py", default_timeout=120)
+at.run()
+primeira = (time.perf_counter() - inicio) * 1000
+paginas = {}
+for pagina in sys.argv[1:]:
+    t = time.perf_counter()
+    at.sidebar.radio[0].set_value(pagina).run()
+    paginas[pagina] = (time.perf_counter() - t) * 1000
+print(json.dumps({"primeira_renderizacao_ms": primeira, "excecoes": len(at.exception), "paginas_ms": paginas}))
+"""
+def _rodar(script, *args):
+    saida = subprocess.run([sys.executable, "-c", script, *args], cwd=RAIZ, capture_output=True, text=True, check=True)
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+def _mediana(valores):
+    valores = sorted(valores)
+    meio = len(valores) // 2
+    return valores[meio] if len(valores) % 2 else (valores[meio - 1] + valores[meio]) / 2
+def medir_importacoes(modulos, repeticoes):
+    resultado = {}
+    for modulo in modulos:
+        medidas = [_rodar(_MEDIR_IMPORTACAO, modulo, *PESADAS) for _ in range(repeticoes)]
+        resultado[modulo] = {"ms": round(_mediana([m["ms"] for m in medidas]), 1), "pesadas": medidas[-1]["pesadas"]}
+    return resultado
+def medir_renderizacao(paginas, repeticoes):
+    medidas = [_rodar(_MEDIR_RENDERIZACAO, *paginas) for _ in range(repeticoes)]
+    return {
+        "primeira_renderizacao_ms": round(_mediana([m["primeira_renderizacao_ms"] for m in medidas]), 1),
+        "excecoes": max(m["excecoes"] for m in medidas),
+        "paginas_ms": {p: round(_mediana([m["paginas_ms"][p] for m in medidas]), 1) for p in paginas},
+    }
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tempo de importação e de primeira renderização da aplicação.")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--sem-renderizacao", action="store_true", help="Mede só as importações.")
+    parser.add_argument("--saida", help="Grava o resultado em JSON neste arquivo.")
+    args = parser.parse_args(argv)
+    from paginas import PAGINAS
+    inicio = time.perf_counter()
+    resultado = {
+        "python": sys.version.split()[0],
+        "importacoes": medir_importacoes(["streamlit", "db", "queries", "migrate", "inventory"] + list(PAGINAS.values()), args.repeticoes),
+    }
+    if not args.sem_renderizacao:
+        resultado["renderizacao"] = medir_renderizacao(list(PAGINAS), args.repeticoes)
+    resultado["duracao_s"] = round(time.perf_counter() - inicio, 1)
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    print(texto)
+    return 0
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+import argparse
+import getpass
+import sys
+import unicodedata
+from collections import Counter
+import pandas as pd
+from audit import iniciar_auditoria, definir_ator
+from db import execute_query, execute_strict, execute_many, commit_changes, rollback_changes
+from queries import TIPOS_POR_CATEGORIA
+from rollup import increment_rollup_many
+from search import indexar_novas
+from settings import tenants
+from tenants import PADRAO, definir_tenant
+# --- IMPORTAÇÃO EM LOTE (CSV/XLSX) ---
+# Planilhas com milhares de trocas ou itens de catálogo são validadas em memória
+# (nomes de setor/equipamento/suprimento resolvidos para ids com uma única leitura
+# de cada tabela) e gravadas com executemany numa só transação. No modo de simulação
+# (dry-run) nada é gravado; apenas o relatório é devolvido.
+# Colunas esperadas em cada tipo de importação (nomes sem acento, minúsculos).
+COLUNAS_IMPORTACAO = {
+    "trocas": ["data", "setor", "equipamento", "suprimento", "tipo", "observacao"],
+    "equipamentos": ["modelo", "categoria", "setor"],
+    "suprimentos": ["modelo", "categoria", "tipo"],
+}
+COLUNAS_OBRIGATORIAS = {
+    "trocas": ["data", "setor", "equipamento", "suprimento"],
+    "equipamentos": ["modelo", "categoria", "setor"],
+    "suprimentos": ["modelo", "categoria", "tipo"],
+}
+def _normalizar(texto):
+    """Chave de comparação: sem acentos, sem espaços nas pontas e minúscula."""
+    texto = unicodedata.normalize("NFKD", str(texto).strip())
+    return "".join(c for c in texto if not unicodedata.combining(c)).lower()
+def read_table(arquivo, nome_arquivo=None):
+    """Lê um CSV (separador , ou ; detectado) ou XLSX como DataFrame de textos."""
+    nome = (nome_arquivo or getattr(arquivo, "name", "") or str(arquivo)).lower()
+    if nome.endswith((".xlsx", ".xls")):
+        df = pd.read_excel(arquivo, dtype=str)
+    else:
+        df = pd.read_csv(arquivo, dtype=str, sep=None, engine="python", encoding="utf-8-sig")
+    df.columns = [_normalizar(col).replace(" ", "_") for col in df.columns]
+    return df.fillna("")
+def _load_referencias():
+    usuarios = execute_query("SELECT id, name FROM usuarios;", fetch="all") or []
+    equipamentos = execute_query("SELECT id, modelo, categoria, setor_id FROM equipamentos;", fetch="all") or []
+    suprimentos = execute_query("SELECT id, modelo, categoria, tipo FROM suprimentos;", fetch="all") or []
+    return usuarios, equipamentos, suprimentos
+def _validar_trocas(df, usuarios, equipamentos, suprimentos):
+    setores = {_normalizar(u['name']): u['id'] for u in usuarios}
+    equip_por_setor = {}
+    for eq in equipamentos:
+        equip_por_setor.setdefault((eq['setor_id'], _normalizar(eq['modelo'])), []).append(eq)
+    sup_por_modelo = {}
+    for sup in suprimentos:
+        sup_por_modelo.setdefault((sup['categoria'], _normalizar(sup['modelo'])), []).append(sup)
+    datas = pd.to_datetime(df["data"], format="mixed", dayfirst=True, errors="coerce")
+    validos, erros = [], []
+    for pos, row in enumerate(df.itertuples(index=False)):
+        linha = pos + 2  # +1 pelo cabeçalho, +1 porque planilhas contam a partir de 1
+        data = datas.iloc[pos]
+        if pd.isna(data):
+            erros.append((linha, f"Data inválida: '{row.data}'."))
+            continue
+        setor_id = setores.get(_normalizar(row.setor))
+        if setor_id is None:
+            erros.append((linha, f"Setor não cadastrado: '{row.setor}'."))
+            continue
+        candidatos = equip_por_setor.get((setor_id, _normalizar(row.equipamento)), [])
+        if not candidatos:
+            erros.append((linha, f"Equipamento '{row.equipamento}' não encontrado no setor '{row.setor}'."))
+            continue
+        if len(candidatos) > 1:
+            erros.append((linha, f"Há mais de um equipamento '{row.equipamento}' no setor '{row.setor}'."))
+            continue
+        equipamento = candidatos[0]
+        if not equipamento['categoria']:
+            erros.append((linha, f"O equipamento '{row.equipamento}' não tem uma categoria definida."))
+            continue
+        # Mesma regra do "Registrar Troca": o suprimento precisa ser da categoria do equipamento.
+        opcoes = sup_por_modelo.get((equipamento['categoria'], _normalizar(row.suprimento)), [])
+        tipo = getattr(row, "tipo", "")
+        if tipo:
+            opcoes = [sup for sup in opcoes if _normalizar(sup['tipo']) == _normalizar(tipo)]
+        if not opcoes:
+            erros.append((linha, f"Suprimento '{row.suprimento}' não cadastrado na categoria '{equipamento['categoria']}'."))
+            continue
+        if len(opcoes) > 1:
+            erros.append((linha, f"Suprimento '{row.suprimento}' é ambíguo; informe a coluna 'tipo'."))
+            continue
+        validos.append((setor_id, equipamento['id'], data.date(), opcoes[0]['id'], getattr(row, "observacao", "")))
+    return validos, erros
+def _validar_equipamentos(df, usuarios, equipamentos):
+    setores = {_normalizar(u['name']): u['id'] for u in usuarios}
+    categorias = {_normalizar(c): c for c in TIPOS_POR_CATEGORIA}
+    # Um modelo repetido no mesmo setor tornaria ambíguas as importações de trocas.
+    existentes = {(e['setor_id'], _normalizar(e['modelo'])) for e in equipamentos}
+    validos, erros = [], []
+    for pos, row in enumerate(df.itertuples(index=False)):
+        linha = pos + 2
+        categoria = categorias.get(_normalizar(row.categoria))
+        setor_id = setores.get(_normalizar(row.setor))
+        if not row.modelo.strip():
+            erros.append((linha, "Modelo em branco."))
+        elif categoria is None:
+            erros.append((linha, f"Categoria inválida: '{row.categoria}'."))
+        elif setor_id is None:
+            erros.append((linha, f"Setor não cadastrado: '{row.setor}'."))
+        elif (setor_id, _normalizar(row.modelo)) in existentes:
+            erros.append((linha, f"Equipamento '{row.modelo.strip()}' já está cadastrado no setor '{row.setor}'."))
+        else:
+            existentes.add((setor_id, _normalizar(row.modelo)))
+            validos.append((row.modelo.strip(), setor_id, categoria))
+    return validos, erros
+def _validar_suprimentos(df, suprimentos):
+    categorias = {_normalizar(c): c for c in TIPOS_POR_CATEGORIA}
+    existentes = {(s['categoria'], _normalizar(s['modelo']), s['tipo']) for s in suprimentos}
+    validos, erros = [], []
+    for pos, row in enumerate(df.itertuples(index=False)):
+        linha = pos + 2
+        categoria = categorias.get(_normalizar(row.categoria))
+        tipos = {_normalizar(t): t for t in TIPOS_POR_CATEGORIA.get(categoria, [])}
+        tipo = tipos.get(_normalizar(row.tipo))
+        if not row.modelo.strip():
+            erros.append((linha, "Modelo em branco."))
+        elif categoria is None:
+            erros.append((linha, f"Categoria inválida: '{row.categoria}'."))
+        elif tipo is None:
+            erros.append((linha, f"Tipo '{row.tipo}' não existe na categoria '{categoria}'."))
+        elif (categoria, _normalizar(row.modelo), tipo) in existentes:
+            erros.append((linha, f"Suprimento '{row.modelo} ({tipo})' já está no catálogo."))
+        else:
+            existentes.add((categoria, _normalizar(row.modelo), tipo))
+            validos.append((row.modelo.strip(), categoria, tipo))
+    return validos, erros
+def _gravar(tipo_importacao, validos):
+    if tipo_importacao == "trocas":
+        anterior = execute_strict("SELECT COALESCE(MAX(id), 0) AS id FROM trocas_cartucho;", fetch="one")['id']
+        execute_many("INSERT INTO trocas_cartucho (usuario_id, equipamento_id, data_troca, suprimento_id, observacao) VALUES (%s, %s, %s, %s, %s);", validos)
+        increment_rollup_many(Counter((data.strftime('%Y-%m'), usuario_id, equipamento_id, suprimento_id) for usuario_id, equipamento_id, data, suprimento_id, _ in validos))
+        indexar_novas(anterior)
+    elif tipo_importacao == "equipamentos":
+        execute_many("INSERT INTO equipamentos (modelo, setor_id, categoria) VALUES (%s, %s, %s);", validos)
+    else:
+        execute_many("INSERT INTO suprimentos (modelo, categoria, tipo) VALUES (%s, %s, %s);", validos)
+def import_rows(tipo_importacao, df, dry_run=True):
+    """Valida as linhas do DataFrame e, fora do modo de simulação, grava as válidas.
+
+    Devolve um relatório com o total de linhas, as válidas, os erros por linha e se
+    algo foi gravado. Se houver qualquer erro, nada é gravado: a planilha deve ser
+    corrigida e importada de novo, evitando cargas pela metade.
+    """
+    if tipo_importacao not in COLUNAS_IMPORTACAO:
+        raise ValueError(f"Tipo de importação inválido: {tipo_importacao}")
+    faltando = [col for col in COLUNAS_OBRIGATORIAS[tipo_importacao] if col not in df.columns]
+    if faltando:
+        return {"total": len(df), "validos": 0, "erros": [(1, f"Colunas obrigatórias ausentes: {', '.join(faltando)}.")], "gravado": False}
+    df = df.reindex(columns=COLUNAS_IMPORTACAO[tipo_importacao], fill_value="")
+    usuarios, equipamentos, suprimentos = _load_referencias()
+    if tipo_importacao == "trocas":
+        validos, erros = _validar_trocas(df, usuarios, equipamentos, suprimentos)
+    elif tipo_importacao == "equipamentos":
+        validos, erros = _validar_equipamentos(df, usuarios, equipamentos)
+    else:
+        validos, erros = _validar_suprimentos(df, suprimentos)
+    relatorio = {"total": len(df), "validos": len(validos), "erros": erros, "gravado": False}
+    if dry_run or erros or not validos:
+        return relatorio
+    try:
+        _gravar(tipo_importacao, validos)
+        commit_changes()
+    except Exception:
+        rollback_changes()
+        raise
+    relatorio["gravado"] = True
+    return relatorio
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa trocas, equipamentos ou suprimentos de um CSV/XLSX.")
+    parser.add_argument("tipo", choices=sorted(COLUNAS_IMPORTACAO))
+    parser.add_argument("arquivo")
+    parser.add_argument("--dry-run", action="store_true", help="Apenas valida e mostra o relatório, sem gravar.")
+    parser.add_argument("--tenant", default=PADRAO, help="Tenant em cujo banco os dados são gravados ([tenants.<id>] nas secrets).")
+    args = parser.parse_args(argv)
+    if args.tenant not in tenants():
+        parser.error(f"tenant desconhecido: {args.tenant}")
+    definir_tenant(args.tenant)
+    iniciar_auditoria()
+    definir_ator(f"cli:{getpass.getuser()}")
+    relatorio = import_rows(args.tipo, read_table(args.arquivo), dry_run=args.dry_run)
+    print(f"Linhas lidas: {relatorio['total']} | Válidas: {relatorio['validos']} | Com erro: {len(relatorio['erros'])}")
+    for linha, erro in relatorio["erros"]:
+        print(f"  linha {linha}: {erro}")
+    if relatorio["gravado"]:
+        print(f"{relatorio['validos']} registros importados.")
+    elif not args.dry_run:
+        print("Nada foi gravado.")
+    return 1 if relatorio["erros"] else 0
+if __name__ == "__main__":
+    sys.exit(main())
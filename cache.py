@@ -0,0 +1,74 @@
+import threading
+import time
+from db import on_commit
+from settings import section
+from tenants import PorTenant
+# --- CACHE DE DADOS DE REFERÊNCIA ---
+# Setores, equipamentos e suprimentos quase nunca mudam, mas eram lidos do banco
+# a cada rerun (cada troca de selectbox). Ficam aqui em memória, compartilhados
+# entre as sessões, até expirar o TTL ou até um commit alterar a tabela de origem.
+class ReferenceCache:
+    """Cache em processo com TTL, invalidação por tabela e contadores de acerto/erro."""
+    def __init__(self, ttl=300.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}  # chave -> (valor, expira_em, tabelas de origem)
+        self._generations = {}  # tabela -> número de invalidações
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    def get_or_load(self, key, tables, loader):
+        """Devolve o valor em cache ou chama `loader()`; resultados None (erro) não são guardados."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            generation = tuple(self._generations.get(t, 0) for t in tables)
+        value = loader()
+        if value is None:
+            return value
+        with self._lock:
+            # Se uma invalidação aconteceu durante a leitura, o valor já nasce velho.
+            if generation == tuple(self._generations.get(t, 0) for t in tables):
+                self._entries[key] = (value, time.monotonic() + self.ttl, frozenset(tables))
+        return value
+    def invalidate(self, tables):
+        """Descarta as entradas que dependem de alguma das tabelas informadas."""
+        tables = set(tables)
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+            stale = [key for key, (_, _, deps) in self._entries.items() if deps & tables]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "invalidations": self.invalidations,
+            }
+# Um cache por tenant: os cadastros de um órgão nunca aparecem para outro.
+_caches = PorTenant(lambda: ReferenceCache(ttl=float(section("cache").get("reference_ttl", 300))))
+@on_commit
+def _invalidar(tables):
+    # Ouvinte de commit: roda no tenant da transação e só invalida o cache dele.
+    cache = _caches.existente()
+    if cache is not None:
+        cache.invalidate(tables)
+def get_reference_cache():
+    """Cache de cadastros do tenant corrente, invalidado a cada commit que altera suas tabelas."""
+    return _caches.get()
+def cached(key, tables, loader):
+    """Atalho para ler do cache de referência."""
+    return get_reference_cache().get_or_load(key, tables, loader)
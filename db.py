@@ -0,0 +1,508 @@
+import logging
+import re
+import threading
+import time
+from collections import deque
+from contextlib import closing, contextmanager
+from backends import create_backend
+from instrumentation import metrics
+from settings import section, tenant_config
+from tenants import PADRAO, PorTenant, tenant_atual, usando_tenant
+# --- POOL DE CONEXÕES COM O BANCO ---
+# Cada execução de script do Streamlit roda em sua própria thread. Em vez de
+# compartilhar uma única conexão entre todas as sessões, cada query pega uma
+# conexão emprestada do pool e a devolve logo em seguida. Quando uma escrita é
+# feita, a conexão fica presa à thread até commit_changes()/rollback_changes(),
+# para que a transação aconteça inteira na mesma conexão.
+class PoolTimeoutError(Exception):
+    """Nenhuma conexão ficou livre dentro do tempo de espera configurado."""
+class ConnectionPool:
+    """Pool de conexões limitado e thread-safe, com verificação de saúde em segundo plano."""
+    def __init__(self, connect, ping, min_size=2, max_size=10, timeout=10.0, health_interval=30.0, name="db-pool-health"):
+        self._connect = connect
+        self._ping = ping
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_interval = health_interval
+        self._cond = threading.Condition()
+        self._idle = deque()  # (conexão, instante em que foi devolvida)
+        self._owners = {}  # id(conexão) -> (conexão, thread dona, instante do empréstimo)
+        self._size = 0
+        self._waiters = 0
+        self._closed = False
+        self._stats = {"checkouts": 0, "timeouts": 0, "created": 0, "discarded": 0, "reclaimed": 0, "wait_total": 0.0, "wait_max": 0.0}
+        # Só a primeira conexão é aberta aqui (e valida as credenciais); as demais até
+        # min_size são abertas pela thread de saúde, fora do caminho da primeira página.
+        if min_size > 0:
+            self._idle.append((self._new_connection(), time.monotonic()))
+        self._health_thread = threading.Thread(target=self._health_loop, name=name, daemon=True)
+        self._health_thread.start()
+    def _new_connection(self):
+        conn = self._connect()
+        with self._cond:
+            self._size += 1
+            self._stats["created"] += 1
+        return conn
+    def acquire(self):
+        """Empresta uma conexão, esperando no máximo `timeout` segundos por uma livre."""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        create = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeoutError("O pool de conexões foi encerrado.")
+                if self._idle:
+                    conn, _ = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    # Reserva a vaga antes de soltar o lock; a conexão é aberta fora dele.
+                    self._size += 1
+                    create = True
+                    conn = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeoutError(f"Todas as {self.max_size} conexões estão em uso há mais de {self.timeout:.0f}s.")
+                self._waiters += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiters -= 1
+        if create:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+        waited = time.monotonic() - start
+        with self._cond:
+            if create:
+                self._stats["created"] += 1
+            self._owners[id(conn)] = (conn, threading.current_thread(), time.monotonic())
+            self._stats["checkouts"] += 1
+            self._stats["wait_total"] += waited
+            self._stats["wait_max"] = max(self._stats["wait_max"], waited)
+        return conn
+    def release(self, conn, discard=False):
+        """Devolve a conexão ao pool; conexões quebradas são descartadas e a vaga liberada."""
+        with self._cond:
+            if self._owners.pop(id(conn), None) is None:
+                return
+        if not discard:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except Exception:
+                discard = True
+        if discard or self._closed:
+            self._close_quietly(conn)
+            with self._cond:
+                self._size -= 1
+                self._stats["discarded"] += 1
+                self._cond.notify()
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+    def metrics(self):
+        """Retrato instantâneo do uso do pool."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                "size": self._size,
+                "max_size": self.max_size,
+                "idle": len(self._idle),
+                "in_use": len(self._owners),
+                "waiters": self._waiters,
+            })
+        stats["wait_avg"] = stats["wait_total"] / stats["checkouts"] if stats["checkouts"] else 0.0
+        return stats
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+    def _health_loop(self):
+        # Verificação de saúde fora do caminho das requisições: as queries nunca chamam
+        # is_connected()/reconnect(); quem testa as conexões ociosas é esta thread.
+        try:
+            self._fill_min()
+        except Exception:
+            pass
+        while not self._closed:
+            time.sleep(self.health_interval)
+            try:
+                self._reclaim_orphans()
+                self._check_idle()
+                self._fill_min()
+            except Exception:
+                pass
+    def _reclaim_orphans(self):
+        # Uma sessão que terminou sem commit/rollback (ex.: exceção no meio do script)
+        # deixaria a conexão presa para sempre; aqui ela volta ao pool desfeita.
+        with self._cond:
+            orphans = [conn for conn, owner, _ in self._owners.values() if not owner.is_alive()]
+        for conn in orphans:
+            self.release(conn)
+            with self._cond:
+                self._stats["reclaimed"] += 1
+    def _check_idle(self):
+        now = time.monotonic()
+        with self._cond:
+            stale = [item for item in self._idle if now - item[1] >= self.health_interval]
+            for item in stale:
+                self._idle.remove(item)
+        for conn, _ in stale:
+            try:
+                self._ping(conn)
+            except Exception:
+                self._close_quietly(conn)
+                with self._cond:
+                    self._size -= 1
+                    self._stats["discarded"] += 1
+                    self._cond.notify()
+                continue
+            with self._cond:
+                self._idle.appendleft((conn, time.monotonic()))
+                self._cond.notify()
+    def _fill_min(self):
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+            conn = self._new_connection()
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+# --- ERROS E INSTÂNCIA ÚNICA DO POOL ---
+# A camada de dados não depende do Streamlit: a interface registra st.error como
+# tratador de erros e a API registra um que propaga a exceção. Sem tratador, o
+# erro vai para o log.
+_logger = logging.getLogger(__name__)
+def _log_error(message, exc=None):
+    _logger.error(message)
+_error_handler = _log_error
+def set_error_handler(handler):
+    """Define quem recebe os erros de banco: handler(mensagem, exceção)."""
+    global _error_handler
+    _error_handler = handler or _log_error
+def _report_error(message, exc=None):
+    _error_handler(message, exc)
+# Cada tenant tem o seu backend e o seu pool, criados na primeira operação do tenant
+# a partir das suas secrets ([tenants.<id>.database] e [tenants.<id>.connections]
+# sobrepondo as de nível superior).
+def _criar_backend():
+    tenant = tenant_atual()
+    if tenant != PADRAO and "connections" not in tenant_config(tenant):
+        # Sem isso o tenant cairia no banco do tenant padrão e veria os dados de outro órgão.
+        raise ValueError(f"Configuração do tenant '{tenant}' incompleta: defina [tenants.{tenant}.connections.<backend>] no secrets.toml.")
+    return create_backend(section("database"), section("connections"))
+_backends = PorTenant(_criar_backend)
+def get_backend():
+    """Backend do banco do tenant corrente, escolhido em [database] backend (MariaDB por padrão ou SQLite)."""
+    return _backends.get()
+def _criar_pool():
+    try:
+        backend = get_backend()
+    except ValueError as e:
+        _report_error(str(e), e)
+        return None
+    tenant = tenant_atual()
+    cfg = section("connections").get(backend.name, {})
+    secao = f"[connections.{backend.name}]" if tenant == PADRAO else f"[tenants.{tenant}.connections.{backend.name}]"
+    try:
+        return ConnectionPool(
+            backend.connect,
+            backend.ping,
+            min_size=int(cfg.get("pool_min_size", 2)),
+            max_size=int(cfg.get("pool_size", 10)),
+            timeout=float(cfg.get("pool_timeout", 10)),
+            health_interval=float(cfg.get("pool_health_interval", 30)),
+            name="db-pool-health" if tenant == PADRAO else f"db-pool-health-{tenant}",
+        )
+    except KeyError as e:
+        _report_error(f"Configuração do banco incompleta: falta {e} em {secao} no secrets.toml.", e)
+        return None
+    except backend.Error as e:
+        if backend.name == "sqlite":
+            _report_error(f"Erro ao abrir o banco SQLite: {e}. Verifique o caminho em {secao} path no secrets.toml.", e)
+        else:
+            _report_error(f"Erro ao conectar ao MariaDB: {e}. Verifique se o serviço do MariaDB está rodando e se as credenciais em secrets.toml estão corretas.", e)
+        return None
+_pools = PorTenant(_criar_pool)
+def init_pool():
+    """Pool de conexões do tenant corrente, criado na primeira chamada a partir de [connections.<backend>].
+
+    Se o banco estiver fora do ar, devolve None e tenta de novo na próxima chamada.
+    """
+    return _pools.get()
+# --- FUNÇÕES AUXILIARES PARA INTERAÇÃO COM O BANCO ---
+_local = threading.local()
+# A transação presa à thread pertence a um tenant: escrever em outro tenant antes do
+# commit/rollback é um erro (a escrita iria para o banco errado).
+def _transacao_de_outro_tenant():
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.tenant != tenant_atual():
+        return f"Há uma transação aberta no tenant '{_local.tenant}'; conclua-a com commit_changes()/rollback_changes() antes de operar no tenant '{tenant_atual()}'."
+    return None
+# Tabelas alteradas por INSERT/UPDATE/DELETE são anotadas na transação corrente e,
+# no commit, repassadas aos ouvintes registrados (ex.: invalidação de cache).
+_WRITE_RE = re.compile(r"^\s*(?:INSERT\s+(?:IGNORE\s+)?INTO|REPLACE\s+INTO|UPDATE|DELETE\s+FROM)\s+`?(\w+)`?", re.IGNORECASE)
+_commit_listeners = []
+# Com algum ouvinte de escritas registrado (ex.: auditoria), cada escrita da transação
+# também é anotada como (instante, tabela, query, params, linhas, id gerado) e a lista
+# é entregue a eles no commit; escritas desfeitas por rollback não chegam a eles.
+_write_listeners = []
+def on_commit(listener):
+    """Registra uma função chamada com o conjunto de tabelas alteradas a cada commit."""
+    if listener not in _commit_listeners:
+        _commit_listeners.append(listener)
+    return listener
+def on_commit_writes(listener):
+    """Registra uma função chamada a cada commit com a lista das escritas da transação."""
+    if listener not in _write_listeners:
+        _write_listeners.append(listener)
+    return listener
+def written_table(query):
+    """Nome da tabela alterada por um INSERT/UPDATE/DELETE, ou None para consultas."""
+    match = _WRITE_RE.match(query)
+    return match.group(1).lower() if match else None
+def _is_connection_error(e):
+    return get_backend().is_connection_error(e)
+def execute_query(query, params=None, fetch=None):
+    """Função central para executar queries de forma segura.
+
+    Em leituras devolve a(s) linha(s); em escritas, o id gerado por um INSERT
+    (ou None). Erros vão para o tratador registrado e a função devolve None.
+    """
+    return _execute(query, params, fetch, strict=False)
+def execute_strict(query, params=None, fetch=None):
+    """Como execute_query, mas os erros são propagados em vez de irem para o tratador.
+
+    Para os comandos de uma transação com vários passos (troca + estoque + rollup):
+    com execute_query o tratador da interface só mostra o erro e os passos
+    seguintes rodariam e seriam confirmados; aqui a exceção interrompe a operação
+    e quem chamou desfaz tudo com rollback_changes().
+    """
+    return _execute(query, params, fetch, strict=True)
+def _falha(message, exc, strict):
+    if strict:
+        raise exc if exc is not None else RuntimeError(message)
+    _report_error(message, exc)
+    return None
+def _execute(query, params, fetch, strict):
+    pool = init_pool()
+    if not pool:
+        return _falha("Sem conexão com o banco de dados.", None, strict)
+    backend = get_backend()
+    conflito = _transacao_de_outro_tenant()
+    if conflito:
+        return _falha(conflito, None, strict)
+    conn = getattr(_local, "conn", None)
+    bound = conn is not None
+    if not bound:
+        try:
+            conn = pool.acquire()
+        except (PoolTimeoutError, backend.Error) as e:
+            return _falha(f"Erro ao obter conexão com o banco: {e}", e, strict)
+    broken = False
+    inicio = time.perf_counter()
+    try:
+        if fetch is None and not bound:
+            # Primeira escrita da sessão: abre a transação e prende a conexão à thread
+            # até commit_changes()/rollback_changes().
+            backend.begin(conn)
+            _local.conn, _local.tenant = conn, tenant_atual()
+            _local.tables, _local.writes = set(), []
+            bound = True
+        inicio = time.perf_counter()
+        with closing(backend.cursor(conn, dictionary=True)) as cur:
+            cur.execute(backend.translate(query), params or ())
+            table = written_table(query)
+            if table and bound:
+                _local.tables.add(table)
+            result = None
+            if fetch == "one":
+                result = cur.fetchone()
+                rows = 0 if result is None else 1
+            elif fetch == "all":
+                result = cur.fetchall()
+                rows = len(result)
+            else:
+                rows = cur.rowcount
+                result = cur.lastrowid or None
+            if table and bound and _write_listeners:
+                _local.writes.append((time.time(), table, query, params, rows, result if fetch is None else None))
+        metrics.record_query(query, (time.perf_counter() - inicio) * 1000, rows)
+        return result
+    except Exception as e:
+        broken = _is_connection_error(e)
+        metrics.record_query(query, (time.perf_counter() - inicio) * 1000, None, ok=False)
+        return _falha(f"Erro na query: {e}", e, strict)
+    finally:
+        if not bound:
+            pool.release(conn, discard=broken)
+def _abrir_transacao(pool, backend):
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = pool.acquire()
+        try:
+            backend.begin(conn)
+        except Exception as e:
+            pool.release(conn, discard=_is_connection_error(e))
+            raise
+        _local.conn, _local.tenant, _local.tables, _local.writes = conn, tenant_atual(), set(), []
+    return conn
+def begin_transaction():
+    """Abre a transação da sessão (se ainda não houver uma) e prende a conexão à thread.
+
+    Para leituras com FOR UPDATE que precisam rodar antes da primeira escrita: sem
+    transação aberta a leitura usaria uma conexão em autocommit e a trava seria
+    liberada logo em seguida. Erros são propagados, como em execute_strict.
+    """
+    pool = init_pool()
+    if not pool:
+        raise RuntimeError("Sem conexão com o banco de dados.")
+    conflito = _transacao_de_outro_tenant()
+    if conflito:
+        raise RuntimeError(conflito)
+    _abrir_transacao(pool, get_backend())
+def execute_many(query, seq_params, batch_size=1000):
+    """Executa um comando para várias linhas com executemany, em lotes, dentro da transação da sessão.
+
+    Diferente de execute_query, erros são propagados: cargas em lote devem ser
+    desfeitas inteiras com rollback_changes() por quem chamou.
+    """
+    pool = init_pool()
+    if not pool:
+        raise RuntimeError("Sem conexão com o banco de dados.")
+    backend = get_backend()
+    conflito = _transacao_de_outro_tenant()
+    if conflito:
+        raise RuntimeError(conflito)
+    conn = _abrir_transacao(pool, backend)
+    table = written_table(query)
+    if table:
+        _local.tables.add(table)
+    seq_params = list(seq_params)
+    if table and _write_listeners:
+        # Uma carga em lote vira uma única escrita anotada, sem os parâmetros de cada linha.
+        _local.writes.append((time.time(), table, query, None, len(seq_params), None))
+    inicio = time.perf_counter()
+    try:
+        sql = backend.translate(query)
+        with closing(backend.cursor(conn)) as cur:
+            for start in range(0, len(seq_params), batch_size):
+                cur.executemany(sql, seq_params[start:start + batch_size])
+    except Exception:
+        metrics.record_query(query, (time.perf_counter() - inicio) * 1000, None, ok=False)
+        raise
+    metrics.record_query(query, (time.perf_counter() - inicio) * 1000, len(seq_params))
+    return len(seq_params)
+def _finish_transaction(action):
+    conn = getattr(_local, "conn", None)
+    if conn is None: return
+    tenant, tables, writes = _local.tenant, _local.tables, getattr(_local, "writes", [])
+    _local.conn, _local.tables, _local.writes = None, set(), []
+    pool = _pools.get(tenant)
+    try:
+        getattr(conn, action)()
+    except Exception:
+        pool.release(conn, discard=True)
+        raise
+    pool.release(conn)
+    # Os ouvintes rodam no tenant da transação (ex.: invalidam o cache daquele tenant).
+    with usando_tenant(tenant):
+        if action == "commit" and tables:
+            for listener in list(_commit_listeners):
+                listener(tables)
+        if action == "commit" and writes:
+            for listener in list(_write_listeners):
+                listener(writes)
+def commit_changes():
+    """Função para aplicar (commit) as alterações no banco e devolver a conexão ao pool."""
+    _finish_transaction("commit")
+def rollback_changes():
+    """Função para reverter (rollback) as alterações em caso de erro e devolver a conexão ao pool."""
+    try:
+        _finish_transaction("rollback")
+    except Exception:
+        pass
+@contextmanager
+def connection():
+    """Empresta uma conexão do pool para tarefas administrativas (migrações, EXPLAIN).
+
+    Ao contrário de execute_query, erros são propagados para quem chamou.
+    """
+    pool = init_pool()
+    if not pool:
+        raise RuntimeError("Sem conexão com o banco de dados.")
+    conn = pool.acquire()
+    broken = False
+    try:
+        yield conn
+    except Exception as e:
+        broken = _is_connection_error(e)
+        raise
+    finally:
+        pool.release(conn, discard=broken)
+def iter_query(query, params=None, chunk_size=5000):
+    """Executa uma consulta e entrega o resultado em blocos de tuplas, sem carregá-lo inteiro.
+
+    Gera (nomes_das_colunas, linhas) a cada `chunk_size` linhas. Usa uma conexão
+    própria do pool com cursor não bufferizado, de modo que o banco envia as linhas
+    conforme são consumidas e a memória fica limitada ao tamanho do bloco.
+    """
+    pool = init_pool()
+    if not pool: return
+    backend = get_backend()
+    conn = pool.acquire()
+    broken = False
+    inicio = time.perf_counter()
+    total = 0
+    try:
+        cur = backend.cursor(conn, buffered=False)
+        try:
+            cur.execute(backend.translate(query), params or ())
+            columns = [desc[0] for desc in cur.description]
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                total += len(rows)
+                yield columns, rows
+            # O tempo inclui o consumo dos blocos por quem chamou.
+            metrics.record_query(query, (time.perf_counter() - inicio) * 1000, total)
+        finally:
+            try:
+                # Descarta linhas não lidas caso o consumidor pare antes do fim.
+                cur.close()
+            except Exception:
+                broken = True
+    except Exception as e:
+        broken = _is_connection_error(e)
+        raise
+    finally:
+        pool.release(conn, discard=broken)
+def get_pool_metrics():
+    """Métricas do pool do tenant corrente (conexões em uso, ociosas, espera) para exibição."""
+    pool = init_pool()
+    return pool.metrics() if pool else None
+def get_pools_metrics():
+    """Métricas dos pools de todos os tenants já em uso no processo, {tenant: métricas}."""
+    return {tenant: pool.metrics() for tenant, pool in _pools.itens().items()}
@@ -0,0 +1,56 @@
+import csv
+import gzip
+import io
+from datetime import datetime
+from db import iter_query
+from queries import export_query, COLUNAS_EXPORTACAO
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet é opcional: sem pyarrow, só CSV fica disponível.
+    pa = None
+# --- EXPORTAÇÃO DO HISTÓRICO EM FLUXO ---
+# As linhas vêm do banco em blocos (db.iter_query) e são gravadas direto no
+# arquivo de destino, então a memória usada não depende do tamanho da exportação
+# e nada fica guardado em cache por combinação de filtros.
+FORMATOS = {
+    "CSV": {"extensao": "csv", "mime": "text/csv"},
+    "CSV compactado (.csv.gz)": {"extensao": "csv.gz", "mime": "application/gzip"},
+}
+if pa is not None:
+    FORMATOS["Parquet"] = {"extensao": "parquet", "mime": "application/vnd.apache.parquet"}
+def _iter_rows(filtros, chunk_size):
+    query, params = export_query(**filtros)
+    for _, rows in iter_query(query, params or None, chunk_size=chunk_size):
+        yield rows
+def _write_csv(binary_file, filtros, chunk_size):
+    text = io.TextIOWrapper(binary_file, encoding='utf-8', newline='')
+    writer = csv.writer(text)
+    writer.writerow(COLUNAS_EXPORTACAO)
+    total = 0
+    for rows in _iter_rows(filtros, chunk_size):
+        writer.writerows((row[0].strftime('%d/%m/%Y'),) + tuple(row[1:]) for row in rows)
+        total += len(rows)
+    text.flush()
+    text.detach()  # Não fecha o arquivo de destino, que pertence a quem chamou.
+    return total
+def _write_parquet(binary_file, filtros, chunk_size):
+    schema = pa.schema([('Data', pa.date32())] + [(col, pa.string()) for col in COLUNAS_EXPORTACAO[1:]])
+    total = 0
+    with pq.ParquetWriter(binary_file, schema, compression='zstd') as writer:
+        for rows in _iter_rows(filtros, chunk_size):
+            columns = list(zip(*rows))
+            columns[0] = [d.date() if isinstance(d, datetime) else d for d in columns[0]]
+            writer.write_batch(pa.record_batch(columns, schema=schema))
+            total += len(rows)
+    return total
+def write_export(binary_file, formato="CSV", chunk_size=5000, **filtros):
+    """Grava as trocas filtradas no arquivo binário informado e devolve quantas linhas foram escritas."""
+    if formato == "CSV":
+        return _write_csv(binary_file, filtros, chunk_size)
+    if formato == "CSV compactado (.csv.gz)":
+        with gzip.GzipFile(fileobj=binary_file, mode='wb') as gz:
+            return _write_csv(gz, filtros, chunk_size)
+    if formato == "Parquet" and pa is not None:
+        return _write_parquet(binary_file, filtros, chunk_size)
+    raise ValueError(f"Formato de exportação não suportado: {formato}")
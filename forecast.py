@@ -0,0 +1,240 @@
+import math
+import threading
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+from db import iter_query
+from queries import get_rotulos
+from rollup import count_rollup_by_month_and_supply, versao_trocas
+from tenants import PorTenant
+# --- PREVISÃO DE CONSUMO E PONTO DE PEDIDO ---
+# Dois insumos, ambos mantidos de forma incremental:
+# * intervalos entre trocas por equipamento × suprimento, guardados como somas
+#   (nº de trocas, primeira/última data, soma e soma dos quadrados dos intervalos),
+#   atualizadas só com as trocas de id acima da marca d'água já processada;
+# * a série mensal por modelo de suprimento, lida do rollup trocas_mensais.
+# A previsão dos próximos meses é uma tendência linear (mínimos quadrados) sobre
+# a janela de meses completos, calculada de uma vez para todos os modelos. Uma
+# exclusão de troca ou uma troca com data anterior à última já vista do mesmo
+# par invalida as somas, e então tudo é recalculado do zero. As somas guardam só
+# ids; os nomes (setor, equipamento, modelo) vêm dos rótulos em cache e, quando um
+# cadastro é renomeado, só a série e os resultados memorizados são refeitos.
+DIAS_POR_MES = 365.25 / 12
+_CHAVE = ['equipamento_id', 'suprimento_id']
+_AGREGACAO = {'trocas': 'sum', 'primeira': 'min', 'ultima': 'max', 'n_intervalos': 'sum', 'soma_dias': 'sum', 'soma_dias2': 'sum'}
+def _ler_trocas(desde_id, ate_id, chunk_size=50000):
+    """Trocas com id em (desde_id, ate_id] como arrays (datas, equipamento, suprimento)."""
+    query = """
+        SELECT data_troca, COALESCE(equipamento_id, 0), COALESCE(suprimento_id, 0)
+        FROM trocas_cartucho
+        WHERE id > %s AND id <= %s
+        ORDER BY id;
+    """
+    datas, equipamentos, suprimentos = [], [], []
+    for _, rows in iter_query(query, (desde_id, ate_id), chunk_size=chunk_size):
+        col_data, col_equip, col_sup = zip(*rows)
+        datas.append(np.array(col_data, dtype='datetime64[ns]'))
+        equipamentos.append(np.array(col_equip, dtype=np.int64))
+        suprimentos.append(np.array(col_sup, dtype=np.int64))
+    if not datas:
+        return np.empty(0, dtype='datetime64[ns]'), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(datas), np.concatenate(equipamentos), np.concatenate(suprimentos)
+def _intervalos_vazios():
+    index = pd.MultiIndex.from_arrays([np.empty(0, dtype=np.int64)] * 2, names=_CHAVE)
+    return pd.DataFrame({
+        'trocas': np.empty(0, dtype=np.int64),
+        'primeira': np.empty(0, dtype='datetime64[ns]'),
+        'ultima': np.empty(0, dtype='datetime64[ns]'),
+        'n_intervalos': np.empty(0, dtype=np.int64),
+        'soma_dias': np.empty(0, dtype=float),
+        'soma_dias2': np.empty(0, dtype=float),
+    }, index=index)
+def _somar_intervalos(estado, datas, equipamentos, suprimentos):
+    """Acrescenta as novas trocas às somas por par; None se alguma for anterior à última do par."""
+    novas = pd.DataFrame({'equipamento_id': equipamentos, 'suprimento_id': suprimentos, 'data': datas})
+    novas = novas[(novas['equipamento_id'] > 0) & (novas['suprimento_id'] > 0)]
+    if novas.empty:
+        return estado
+    novas = novas.sort_values(_CHAVE + ['data'], kind='stable')
+    anterior = novas.groupby(_CHAVE, sort=False)['data'].shift()
+    # A primeira troca nova de cada par é medida a partir da última já somada.
+    ultima = estado['ultima'].reindex(pd.MultiIndex.from_frame(novas[_CHAVE])).to_numpy()
+    if (novas['data'].to_numpy() < ultima).any():
+        return None
+    anterior = anterior.fillna(pd.Series(ultima, index=novas.index))
+    dias = (novas['data'] - anterior).dt.days.astype(float)
+    novas = novas.assign(dias=dias, dias2=dias ** 2)
+    grupos = novas.groupby(_CHAVE)
+    parcial = pd.DataFrame({
+        'trocas': grupos.size(),
+        'primeira': grupos['data'].min(),
+        'ultima': grupos['data'].max(),
+        'n_intervalos': grupos['dias'].count(),
+        'soma_dias': grupos['dias'].sum(),
+        'soma_dias2': grupos['dias2'].sum(),
+    })
+    if estado.empty:
+        return parcial
+    return pd.concat([estado, parcial]).groupby(level=_CHAVE).agg(_AGREGACAO)
+def _serie_mensal(rows, rotulos):
+    """Matriz modelo de suprimento × mês (PeriodIndex) com o total de trocas."""
+    df = pd.DataFrame(rows, columns=['ano_mes', 'suprimento_id', 'total'])
+    df['modelo'] = df['suprimento_id'].map(rotulos['Suprimento'])
+    df = df.dropna(subset=['modelo'])
+    if df.empty:
+        return pd.DataFrame(dtype=np.int64)
+    df['mes'] = pd.PeriodIndex(df['ano_mes'], freq='M')
+    serie = df.pivot_table(index='modelo', columns='mes', values='total', aggfunc='sum', fill_value=0)
+    meses = pd.period_range(serie.columns.min(), serie.columns.max(), freq='M')
+    return serie.reindex(columns=meses, fill_value=0).astype(np.int64)
+def tendencia_linear(matriz, horizonte):
+    """Ajusta y = a + b·t em cada linha de `matriz` e projeta `horizonte` passos à frente.
+
+    Devolve (média, inclinação, desvio dos resíduos, previsão [linhas × horizonte]),
+    com a previsão limitada a zero.
+    """
+    matriz = np.asarray(matriz, dtype=float)
+    k = matriz.shape[1]
+    t = np.arange(k, dtype=float) - (k - 1) / 2
+    media = matriz.mean(axis=1)
+    inclinacao = matriz @ t / (t @ t) if k > 1 else np.zeros(len(matriz))
+    residuos = matriz - (media[:, None] + inclinacao[:, None] * t)
+    desvio = np.sqrt((residuos ** 2).sum(axis=1) / max(k - 2, 1))
+    futuro = (k - 1) / 2 + np.arange(1, horizonte + 1, dtype=float)
+    previsao = np.clip(media[:, None] + inclinacao[:, None] * futuro, 0, None)
+    return media, inclinacao, desvio, previsao
+class ForecastEngine:
+    """Estado incremental da previsão, compartilhado entre as sessões."""
+    def __init__(self):
+        self._lock = threading.RLock()  # previsao() reaproveita intervalos() sob o mesmo lock
+        self._versao = None
+        self._intervalos = _intervalos_vazios()
+        self._linhas = None
+        self._rotulos = None
+        self._serie = pd.DataFrame(dtype=np.int64)
+        self._resultados = {}
+        self.recalculos = 0
+        self.atualizacoes = 0
+    def refresh(self, force=False):
+        """Incorpora as trocas novas; recalcula tudo se houve exclusão, data retroativa ou `force`."""
+        with self._lock:
+            versao = versao_trocas()
+            rotulos = get_rotulos()
+            if versao is None or rotulos is None:
+                return self._versao
+            if versao == self._versao and not force:
+                # Os rótulos vêm do cache de cadastros: um objeto novo significa cadastro alterado.
+                if rotulos is not self._rotulos:
+                    self._serie = _serie_mensal(self._linhas, rotulos)
+                    self._rotulos = rotulos
+                    self._resultados = {}
+                return self._versao
+            rows = count_rollup_by_month_and_supply()
+            if rows is None:
+                return self._versao
+            max_id, total = versao
+            intervalos = None
+            if self._versao is not None and not force and max_id >= self._versao[0]:
+                novas = _ler_trocas(self._versao[0], max_id)
+                if self._versao[1] + len(novas[0]) == total:
+                    intervalos = _somar_intervalos(self._intervalos, *novas)
+            if intervalos is None:
+                intervalos = _somar_intervalos(_intervalos_vazios(), *_ler_trocas(0, max_id))
+                self.recalculos += 1
+            else:
+                self.atualizacoes += 1
+            self._intervalos = intervalos
+            self._linhas = rows
+            self._rotulos = rotulos
+            self._serie = _serie_mensal(rows, rotulos)
+            self._resultados = {}
+            self._versao = versao
+            return versao
+    def _memo(self, chave, calcular):
+        with self._lock:
+            chave = (self._versao,) + chave
+            if chave not in self._resultados:
+                self._resultados[chave] = calcular()
+            return self._resultados[chave]
+    def serie_mensal(self):
+        with self._lock:
+            return self._serie.copy()
+    def intervalos(self):
+        """Intervalos entre trocas por equipamento × suprimento, com rótulos e próxima troca prevista."""
+        return self._memo(("intervalos",), self._calcular_intervalos)
+    def _calcular_intervalos(self):
+        rotulos = self._rotulos or {}
+        df = self._intervalos.reset_index()
+        n = df['n_intervalos'].to_numpy(dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            media = np.where(n > 0, df['soma_dias'] / n, np.nan)
+            variancia = np.where(n > 1, (df['soma_dias2'] - n * media ** 2) / (n - 1), np.nan)
+            consumo = np.where(media > 0, DIAS_POR_MES / media, np.nan)
+        proxima = df['ultima'] + pd.to_timedelta(np.round(media), unit='D')
+        return pd.DataFrame({
+            'Setor': df['equipamento_id'].map(rotulos.get('Setor do Equipamento', {})).fillna('Setor Desconhecido'),
+            'Equipamento': df['equipamento_id'].map(rotulos.get('Equipamento', {})).fillna('Não especificado'),
+            'Suprimento': df['suprimento_id'].map(rotulos.get('Suprimento', {})).fillna('Não especificado'),
+            'Trocas': df['trocas'],
+            'Intervalo Médio (dias)': media,
+            'Desvio (dias)': np.sqrt(np.clip(variancia, 0, None)),
+            'Consumo Mensal': consumo,
+            'Última Troca': df['ultima'],
+            'Próxima Troca Prevista': proxima,
+            'ID Equipamento': df['equipamento_id'],
+            'ID Suprimento': df['suprimento_id'],
+        })
+    def previsao(self, horizonte=3, janela=12, prazo_entrega_dias=15, nivel_servico=0.95):
+        """Previsão por modelo de suprimento para os próximos `horizonte` meses e ponto de pedido.
+
+        A tendência é ajustada nos últimos `janela` meses completos (o mês corrente,
+        ainda parcial, fica de fora e é o primeiro mês previsto). O ponto de pedido é a
+        demanda esperada durante o prazo de entrega mais o estoque de segurança
+        z·σ·√prazo, com σ o desvio mensal dos resíduos e z do nível de serviço.
+        """
+        chave = ("previsao", horizonte, janela, prazo_entrega_dias, nivel_servico)
+        return self._memo(chave, lambda: self._calcular_previsao(horizonte, janela, prazo_entrega_dias, nivel_servico))
+    def _calcular_previsao(self, horizonte, janela, prazo_entrega_dias, nivel_servico):
+        mes_atual = pd.Period.now('M')
+        meses_futuros = pd.period_range(mes_atual, periods=horizonte, freq='M')
+        if self._serie.empty:
+            return pd.DataFrame(), meses_futuros
+        meses_janela = pd.period_range(end=mes_atual - 1, periods=janela, freq='M')
+        historico = self._serie.reindex(columns=meses_janela, fill_value=0)
+        media, inclinacao, desvio, previsao = tendencia_linear(historico.to_numpy(), horizonte)
+        prazo = prazo_entrega_dias / DIAS_POR_MES
+        z = NormalDist().inv_cdf(nivel_servico)
+        taxa_prazo = previsao[:, :max(1, math.ceil(prazo))].mean(axis=1)
+        seguranca = z * desvio * math.sqrt(prazo)
+        consumo_intervalos = self._consumo_por_intervalos().reindex(historico.index).fillna(0.0)
+        resultado = pd.DataFrame({
+            'Suprimento': historico.index,
+            'Média Mensal': media,
+            'Tendência (por mês)': inclinacao,
+            'Consumo Mensal (intervalos)': consumo_intervalos.to_numpy(),
+            **{f"Previsão {mes.strftime('%m/%Y')}": previsao[:, i] for i, mes in enumerate(meses_futuros)},
+            'Total Previsto': previsao.sum(axis=1),
+            'Estoque de Segurança': np.ceil(seguranca),
+            'Ponto de Pedido': np.ceil(taxa_prazo * prazo + seguranca),
+        })
+        return resultado.sort_values('Total Previsto', ascending=False, ignore_index=True), meses_futuros
+    def _consumo_por_intervalos(self):
+        """Consumo mensal somado por modelo, só dos pares ainda ativos (trocados há menos de 3 intervalos)."""
+        df = self.intervalos()
+        hoje = pd.Timestamp.now().normalize()
+        ativos = df[df['Intervalo Médio (dias)'] > 0]
+        ativos = ativos[(hoje - ativos['Última Troca']).dt.days <= 3 * ativos['Intervalo Médio (dias)']]
+        return ativos.groupby('Suprimento')['Consumo Mensal'].sum()
+    def stats(self):
+        with self._lock:
+            return {
+                "versao": self._versao,
+                "pares": len(self._intervalos),
+                "modelos": len(self._serie),
+                "recalculos": self.recalculos,
+                "atualizacoes": self.atualizacoes,
+            }
+_engines = PorTenant(ForecastEngine)
+def get_forecast_engine():
+    """Motor de previsão do tenant corrente (um por tenant no processo), atualizado sob demanda por refresh()."""
+    return _engines.get()
@@ -0,0 +1,165 @@
+import atexit
+import json
+import queue
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+# --- INSTRUMENTAÇÃO (TEMPOS DE QUERY E DE RENDERIZAÇÃO) ---
+# Guarda em memória, com tamanho limitado, a latência e o número de linhas de
+# cada query executada por db.py e a duração de cada fase de renderização das
+# páginas. A página "Diagnóstico" resume esses dados em percentis e mostra o log
+# de queries lentas; opcionalmente tudo é também gravado num arquivo JSONL. As
+# linhas do arquivo vão para uma fila limitada e uma thread as grava em lotes: as
+# queries nunca esperam pelo disco (com a fila cheia a linha é descartada e contada).
+_WS_RE = re.compile(r"\s+")
+def _percentile(ordenados, p):
+    """Percentil por interpolação linear sobre uma lista já ordenada."""
+    if not ordenados:
+        return 0.0
+    k = (len(ordenados) - 1) * p / 100
+    baixo = int(k)
+    alto = min(baixo + 1, len(ordenados) - 1)
+    return ordenados[baixo] + (ordenados[alto] - ordenados[baixo]) * (k - baixo)
+def _resumo(valores):
+    ordenados = sorted(valores)
+    return {
+        "n": len(ordenados),
+        "p50_ms": _percentile(ordenados, 50),
+        "p95_ms": _percentile(ordenados, 95),
+        "p99_ms": _percentile(ordenados, 99),
+        "max_ms": ordenados[-1] if ordenados else 0.0,
+        "total_ms": sum(ordenados),
+    }
+class Metrics:
+    """Buffers circulares e thread-safe com as medições mais recentes."""
+    def __init__(self, max_records=5000, slow_query_ms=500.0, log_file=None):
+        self.slow_query_ms = slow_query_ms
+        self.log_file = log_file
+        self._lock = threading.Lock()
+        self._queries = deque(maxlen=max_records)
+        self._slow = deque(maxlen=200)
+        self._phases = deque(maxlen=max_records)
+        self._local = threading.local()
+        self._fila_log = queue.Queue(maxsize=10000)
+        self._io_lock = threading.Lock()
+        self._escritor = None
+        self.log_descartados = 0
+    def configure(self, slow_query_ms=None, log_file=None):
+        if slow_query_ms is not None:
+            self.slow_query_ms = float(slow_query_ms)
+        self.log_file = log_file or None
+    # Página em execução na thread atual, para atribuir as queries a ela.
+    def set_page(self, page):
+        self._local.page = page
+    def current_page(self):
+        return getattr(self._local, "page", None)
+    def record_query(self, sql, elapsed_ms, rows=None, ok=True):
+        registro = {
+            "ts": datetime.now().isoformat(timespec="seconds"),
+            "page": self.current_page(),
+            "sql": _WS_RE.sub(" ", sql).strip()[:500],
+            "elapsed_ms": round(elapsed_ms, 3),
+            "rows": rows,
+            "ok": ok,
+        }
+        with self._lock:
+            self._queries.append(registro)
+            if elapsed_ms >= self.slow_query_ms:
+                self._slow.append(registro)
+        self._write({"kind": "query", **registro})
+    def record_phase(self, page, phase, elapsed_ms):
+        registro = {
+            "ts": datetime.now().isoformat(timespec="seconds"),
+            "page": page,
+            "phase": phase,
+            "elapsed_ms": round(elapsed_ms, 3),
+        }
+        with self._lock:
+            self._phases.append(registro)
+        self._write({"kind": "phase", **registro})
+    def _write(self, registro):
+        log_file = self.log_file
+        if not log_file:
+            return
+        linha = json.dumps(registro, ensure_ascii=False, default=str) + "\n"
+        try:
+            self._fila_log.put_nowait((log_file, linha))
+        except queue.Full:
+            with self._lock:
+                self.log_descartados += 1
+            return
+        if self._escritor is None:
+            with self._lock:
+                if self._escritor is None:
+                    self._escritor = threading.Thread(target=self._loop_log, name="metrics-log", daemon=True)
+                    self._escritor.start()
+                    atexit.register(self._gravar_log)
+    def _gravar_log(self, primeira=None):
+        """Grava as linhas enfileiradas (e `primeira`, já retirada da fila), agrupadas por arquivo."""
+        pendentes = [primeira] if primeira else []
+        while True:
+            try:
+                pendentes.append(self._fila_log.get_nowait())
+            except queue.Empty:
+                break
+        por_arquivo = {}
+        for log_file, linha in pendentes:
+            por_arquivo.setdefault(log_file, []).append(linha)
+        with self._io_lock:
+            for log_file, linhas in por_arquivo.items():
+                try:
+                    with open(log_file, "a", encoding="utf-8") as f:
+                        f.writelines(linhas)
+                except OSError:
+                    pass
+    def _loop_log(self):
+        while True:
+            self._gravar_log(self._fila_log.get())
+    def query_summary(self):
+        """Percentis de latência por texto de query, das mais custosas no total para as menos."""
+        with self._lock:
+            queries = list(self._queries)
+        grupos = {}
+        for q in queries:
+            grupos.setdefault(q["sql"], []).append(q)
+        resumo = []
+        for sql, registros in grupos.items():
+            linhas = [r["rows"] for r in registros if r["rows"] is not None]
+            item = {"sql": sql, **_resumo([r["elapsed_ms"] for r in registros])}
+            item["avg_rows"] = sum(linhas) / len(linhas) if linhas else None
+            item["errors"] = sum(1 for r in registros if not r["ok"])
+            resumo.append(item)
+        return sorted(resumo, key=lambda item: item["total_ms"], reverse=True)
+    def phase_summary(self):
+        """Percentis de duração por página e fase de renderização."""
+        with self._lock:
+            phases = list(self._phases)
+        grupos = {}
+        for ph in phases:
+            grupos.setdefault((ph["page"], ph["phase"]), []).append(ph["elapsed_ms"])
+        return [{"page": page, "phase": phase, **_resumo(valores)} for (page, phase), valores in sorted(grupos.items(), key=lambda kv: (str(kv[0][0]), kv[0][1]))]
+    def slow_queries(self):
+        with self._lock:
+            return list(reversed(self._slow))
+    def export_jsonl(self):
+        """Todas as medições em memória, uma por linha, para análise offline."""
+        with self._lock:
+            registros = [{"kind": "query", **q} for q in self._queries] + [{"kind": "phase", **p} for p in self._phases]
+        return "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in registros)
+    def clear(self):
+        with self._lock:
+            self._queries.clear()
+            self._slow.clear()
+            self._phases.clear()
+metrics = Metrics()
+@contextmanager
+def timed_phase(phase, page=None):
+    """Mede a duração de um trecho de renderização: `with timed_phase("graficos"): ...`."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.record_phase(page or metrics.current_page(), phase, (time.perf_counter() - inicio) * 1000)
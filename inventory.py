@@ -0,0 +1,106 @@
+from cache import cached
+from db import begin_transaction, execute_query, execute_strict
+# --- CONTROLE DE ESTOQUE ---
+# Cada movimento soma (ou subtrai) a quantidade direto no saldo com um UPDATE
+# relativo (quantidade = quantidade + delta), que trava só a linha do suprimento
+# até o commit: trocas simultâneas do mesmo item esperam umas pelas outras em vez
+# de sobrescrever o saldo. O lançamento no livro-razão copia o saldo resultante
+# na mesma transação. As tabelas são criadas pela migração 0005_estoque.sql.
+# Como nas demais escritas, quem chama faz commit_changes() ou rollback_changes();
+# os comandos usam execute_strict para que um passo que falha interrompa a transação.
+TIPOS_MOVIMENTO = {'entrada': 'Entrada (compra)', 'troca': 'Saída por troca', 'estorno': 'Estorno de troca', 'ajuste': 'Ajuste de inventário'}
+def _movimentar(suprimento_id, tipo, delta, observacao=None, troca_id=None):
+    """Aplica `delta` ao saldo e lança o movimento com o saldo resultante."""
+    execute_strict(
+        """
+        INSERT INTO estoque_saldos (suprimento_id, quantidade) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE quantidade = quantidade + VALUES(quantidade);
+        """,
+        (suprimento_id, delta),
+    )
+    execute_strict(
+        """
+        INSERT INTO estoque_movimentos (suprimento_id, tipo, quantidade, saldo_apos, troca_id, observacao)
+        SELECT suprimento_id, %s, %s, quantidade, %s, %s
+        FROM estoque_saldos WHERE suprimento_id = %s;
+        """,
+        (tipo, delta, troca_id, observacao, suprimento_id),
+    )
+def registrar_saida_troca(suprimento_id, troca_id):
+    """Baixa uma unidade pela troca `troca_id`. Deve rodar na transação do INSERT da troca."""
+    if troca_id is None:
+        raise ValueError("A saída por troca precisa do id da troca.")
+    _movimentar(suprimento_id, 'troca', -1, troca_id=troca_id)
+def estornar_troca(log_id):
+    """Devolve ao estoque o que a troca baixou. Deve rodar na transação, antes do DELETE da troca."""
+    # FOR UPDATE: duas exclusões simultâneas da mesma troca não estornam duas vezes.
+    begin_transaction()
+    movimentos = execute_strict("SELECT suprimento_id, quantidade FROM estoque_movimentos WHERE troca_id = %s FOR UPDATE;", (log_id,), fetch="all") or []
+    liquido = {}
+    for mov in movimentos:
+        liquido[mov['suprimento_id']] = liquido.get(mov['suprimento_id'], 0) + mov['quantidade']
+    for suprimento_id, total in liquido.items():
+        if total:
+            _movimentar(suprimento_id, 'estorno', -total, observacao=f"Troca #{log_id} apagada", troca_id=log_id)
+def registrar_entrada(suprimento_id, quantidade, observacao=None):
+    """Entrada de unidades compradas."""
+    if quantidade <= 0:
+        raise ValueError("A quantidade da entrada deve ser positiva.")
+    _movimentar(suprimento_id, 'entrada', int(quantidade), observacao or None)
+def ajustar_estoque(suprimento_id, contagem, observacao=None):
+    """Corrige o saldo para a contagem física, lançando a diferença como ajuste."""
+    execute_strict("INSERT IGNORE INTO estoque_saldos (suprimento_id) VALUES (%s);", (suprimento_id,))
+    atual = execute_strict("SELECT quantidade FROM estoque_saldos WHERE suprimento_id = %s FOR UPDATE;", (suprimento_id,), fetch="one")
+    if atual is None:
+        raise RuntimeError("Não foi possível ler o saldo atual.")
+    delta = int(contagem) - atual['quantidade']
+    if delta:
+        _movimentar(suprimento_id, 'ajuste', delta, observacao or None)
+    return delta
+def definir_minimo(suprimento_id, minimo):
+    """Estoque mínimo que dispara o alerta (0 desliga o alerta)."""
+    execute_strict(
+        """
+        INSERT INTO estoque_saldos (suprimento_id, estoque_minimo) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE estoque_minimo = VALUES(estoque_minimo);
+        """,
+        (suprimento_id, max(int(minimo), 0)),
+    )
+# --- CONSULTAS ---
+def get_saldo(suprimento_id):
+    result = execute_query("SELECT quantidade, estoque_minimo, em_alerta FROM estoque_saldos WHERE suprimento_id = %s;", (suprimento_id,), fetch="one")
+    return result or {'quantidade': 0, 'estoque_minimo': 0, 'em_alerta': 0}
+def get_saldos():
+    """Saldo de todos os suprimentos do catálogo (0 para os que nunca tiveram movimento)."""
+    return execute_query("""
+        SELECT s.id, s.modelo, s.categoria, s.tipo,
+               COALESCE(e.quantidade, 0) AS quantidade,
+               COALESCE(e.estoque_minimo, 0) AS estoque_minimo,
+               COALESCE(e.em_alerta, 0) AS em_alerta
+        FROM suprimentos s
+        LEFT JOIN estoque_saldos e ON e.suprimento_id = s.id
+        ORDER BY s.categoria, s.modelo, s.tipo;
+    """, fetch="all") or []
+def _load_alertas():
+    return execute_query("""
+        SELECT s.id, s.modelo, s.tipo, e.quantidade, e.estoque_minimo
+        FROM estoque_saldos e
+        JOIN suprimentos s ON s.id = e.suprimento_id
+        WHERE e.em_alerta = 1
+        ORDER BY e.quantidade - e.estoque_minimo, s.modelo;
+    """, fetch="all")
+def get_alertas_estoque():
+    """Suprimentos no estoque mínimo ou abaixo dele; em cache até o próximo commit que mexa no saldo."""
+    return cached(("estoque_alertas",), {"estoque_saldos", "suprimentos"}, _load_alertas) or []
+def get_movimentos(suprimento_id=None, limit=100):
+    """Últimos lançamentos do livro-razão, do mais recente para o mais antigo."""
+    where, params = ("WHERE m.suprimento_id = %s", (suprimento_id,)) if suprimento_id else ("", ())
+    return execute_query(f"""
+        SELECT m.criado_em AS `Data`, s.modelo AS `Suprimento`, s.tipo AS `Tipo`, m.tipo AS `Movimento`,
+               m.quantidade AS `Quantidade`, m.saldo_apos AS `Saldo`, m.troca_id AS `Troca`, m.observacao AS `Observação`
+        FROM estoque_movimentos m
+        JOIN suprimentos s ON s.id = m.suprimento_id
+        {where}
+        ORDER BY m.id DESC
+        LIMIT %s;
+    """, params + (int(limit),), fetch="all") or []
@@ -0,0 +1,156 @@
+import argparse
+import sys
+from pathlib import Path
+import threading
+from contextlib import closing
+from db import connection, get_backend
+from settings import section, tenants
+from tenants import PADRAO, tenant_atual, usando_tenant
+from queries import change_logs_page_query, equipamentos_query, suprimentos_query
+# --- MIGRAÇÕES DE ESQUEMA ---
+# Cada arquivo NNNN_descricao.sql em migrations/<backend>/ é aplicado uma única
+# vez, em ordem, e registrado em schema_migrations. Os dois backends têm a mesma
+# sequência de versões, cada uma no dialeto do seu banco. No MariaDB comandos DDL
+# fazem commit implícito, então as migrações são escritas para poder rodar de novo
+# com segurança (IF NOT EXISTS) caso uma delas seja interrompida no meio.
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+_TABELA_MIGRACOES = {
+    "mariadb": """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(255) PRIMARY KEY,
+            aplicada_em DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """,
+    "sqlite": """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(255) PRIMARY KEY,
+            aplicada_em DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+    """,
+}
+def list_migrations():
+    """Migrações do backend configurado como [(versão, caminho)], em ordem."""
+    return [(path.stem, path) for path in sorted((MIGRATIONS_DIR / get_backend().name).glob("*.sql"))]
+def split_statements(sql):
+    """Separa um arquivo .sql em comandos (';' no fim da linha), ignorando comentários '--'."""
+    linhas = [linha for linha in sql.splitlines() if not linha.strip().startswith("--")]
+    comandos, atual = [], []
+    for linha in linhas:
+        atual.append(linha)
+        if linha.rstrip().endswith(";"):
+            comandos.append("\n".join(atual).strip())
+            atual = []
+    resto = "\n".join(atual).strip()
+    if resto:
+        comandos.append(resto)
+    return [c for c in comandos if c.strip(";").strip()]
+def _applied_versions(conn):
+    backend = get_backend()
+    with closing(backend.cursor(conn)) as cur:
+        cur.execute(_TABELA_MIGRACOES[backend.name])
+        cur.execute("SELECT version FROM schema_migrations;")
+        return {row[0] for row in cur.fetchall()}
+def pending_migrations():
+    with connection() as conn:
+        aplicadas = _applied_versions(conn)
+    return [(versao, path) for versao, path in list_migrations() if versao not in aplicadas]
+def apply_migrations():
+    """Aplica as migrações pendentes e devolve as versões aplicadas."""
+    aplicadas_agora = []
+    backend = get_backend()
+    with connection() as conn:
+        aplicadas = _applied_versions(conn)
+        for versao, path in list_migrations():
+            if versao in aplicadas:
+                continue
+            with closing(backend.cursor(conn)) as cur:
+                for comando in split_statements(path.read_text(encoding="utf-8")):
+                    cur.execute(comando)
+                cur.execute(backend.translate("INSERT INTO schema_migrations (version) VALUES (%s);"), (versao,))
+            conn.commit()
+            aplicadas_agora.append(versao)
+    return aplicadas_agora
+_schema_lock = threading.Lock()
+_schema_applied = {}  # tenant -> migrações aplicadas por este processo
+def ensure_schema():
+    """Aplica as migrações pendentes do banco do tenant corrente uma vez por processo, a menos que [database] auto_migrate = false."""
+    tenant = tenant_atual()
+    with _schema_lock:
+        if tenant not in _schema_applied:
+            _schema_applied[tenant] = apply_migrations() if section("database").get("auto_migrate", True) else []
+        return _schema_applied[tenant]
+# --- VERIFICAÇÃO DOS PLANOS DE EXECUÇÃO (EXPLAIN) ---
+def _valores_exemplo(conn):
+    """Valores reais do banco para montar as consultas verificadas."""
+    with closing(get_backend().cursor(conn, dictionary=True)) as cur:
+        cur.execute("SELECT id, name FROM usuarios ORDER BY id LIMIT 1;")
+        usuario = cur.fetchone() or {'id': 0, 'name': ''}
+        cur.execute("SELECT categoria FROM suprimentos ORDER BY id LIMIT 1;")
+        suprimento = cur.fetchone() or {'categoria': ''}
+        cur.execute("SELECT id FROM equipamentos ORDER BY id LIMIT 1;")
+        equipamento = cur.fetchone() or {'id': 0}
+        cur.execute("SELECT DATE_FORMAT(MAX(data_troca), '%Y-%m') AS mes FROM trocas_cartucho;")
+        mes = (cur.fetchone() or {}).get('mes') or '2000-01'
+    return usuario, suprimento['categoria'], equipamento['id'], mes
+def _checks(usuario, categoria, equipamento_id, mes):
+    """(descrição, consulta, params, alias da tabela, índices aceitos) das consultas mais frequentes."""
+    return [
+        ("Histórico sem filtros (ORDER BY data)", *change_logs_page_query(), "t", {"idx_trocas_data"}),
+        ("Histórico filtrado por mês", *change_logs_page_query(mes=mes), "t", {"idx_trocas_data"}),
+        ("Histórico filtrado por setor", *change_logs_page_query(setor=usuario['name']), "t", {"idx_trocas_usuario_data"}),
+        ("Histórico filtrado por categoria", *change_logs_page_query(categoria=categoria), "t", {"idx_trocas_suprimento_data", "idx_trocas_data"}),
+        ("Setor pelo nome (filtro do dashboard)", *change_logs_page_query(setor=usuario['name']), "u", {"idx_usuarios_name", "PRIMARY"}),
+        ("Equipamentos do setor (Registrar Troca)", *equipamentos_query(usuario['id'] or 1), "e", {"idx_equipamentos_setor_modelo"}),
+        ("Suprimentos da categoria (Registrar Troca)", *suprimentos_query(categoria or 'Suprimento Laser'), "suprimentos", {"idx_suprimentos_categoria_modelo"}),
+        ("Trocas de um equipamento (Gerenciar)", "SELECT count(*) as total FROM trocas_cartucho WHERE equipamento_id = %s;", (equipamento_id,), "trocas_cartucho", {"idx_trocas_equipamento_data"}),
+    ]
+def check_indexes():
+    """Roda EXPLAIN nas consultas do dashboard e confere se usam os índices esperados."""
+    resultados = []
+    backend = get_backend()
+    with connection() as conn:
+        checks = _checks(*_valores_exemplo(conn))
+        with closing(backend.cursor(conn, dictionary=True)) as cur:
+            for descricao, query, params, alias, indices in checks:
+                chave, tipo, linhas = backend.explain(cur, query, params, alias)
+                resultados.append({
+                    "consulta": descricao,
+                    "tabela": alias,
+                    "tipo": tipo,
+                    "indice": chave,
+                    "linhas": linhas,
+                    "ok": chave in indices and tipo != "ALL",
+                })
+    return resultados
+def _executar(comando):
+    if comando == "status":
+        pendentes = {versao for versao, _ in pending_migrations()}
+        for versao, _ in list_migrations():
+            print(f"{'pendente ' if versao in pendentes else 'aplicada '} {versao}")
+        return 0
+    if comando == "up":
+        aplicadas = apply_migrations()
+        print("\n".join(f"aplicada  {v}" for v in aplicadas) or "Nenhuma migração pendente.")
+        return 0
+    resultados = check_indexes()
+    for r in resultados:
+        print(f"{'OK   ' if r['ok'] else 'FALHA'} {r['consulta']}: tabela={r['tabela']} tipo={r['tipo']} indice={r['indice']} linhas={r['linhas']}")
+    return 0 if all(r["ok"] for r in resultados) else 1
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrações de esquema do Gerenciador de Suprimentos.")
+    parser.add_argument("comando", choices=["status", "up", "explain"], help="status: lista pendentes; up: aplica; explain: confere os índices")
+    parser.add_argument("--tenant", default=PADRAO, help="Tenant cujo banco é usado ([tenants.<id>] nas secrets).")
+    parser.add_argument("--todos", action="store_true", help="Executa o comando no banco de cada tenant configurado.")
+    args = parser.parse_args(argv)
+    if args.tenant not in tenants():
+        parser.error(f"tenant desconhecido: {args.tenant}")
+    alvos = list(tenants()) if args.todos else [args.tenant]
+    codigo = 0
+    for tenant in alvos:
+        if len(alvos) > 1:
+            print(f"== {tenant} ==")
+        with usando_tenant(tenant):
+            codigo = max(codigo, _executar(args.comando))
+    return codigo
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,29 @@
+-- Tabelas usadas pela aplicação. Em bancos que já existiam antes das migrações,
+-- os CREATE TABLE IF NOT EXISTS não alteram nada.
+CREATE TABLE IF NOT EXISTS usuarios (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(255) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS equipamentos (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    modelo VARCHAR(255) NOT NULL,
+    categoria VARCHAR(50) NULL,
+    setor_id INT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS suprimentos (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    modelo VARCHAR(255) NOT NULL,
+    categoria VARCHAR(50) NOT NULL,
+    tipo VARCHAR(50) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS trocas_cartucho (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    usuario_id INT NULL,
+    equipamento_id INT NULL,
+    suprimento_id INT NULL,
+    data_troca DATE NOT NULL,
+    observacao TEXT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,18 @@
+-- Índices para os caminhos quentes da aplicação. São criados antes das chaves
+-- estrangeiras (0003) para que o InnoDB os reaproveite em vez de criar outros.
+-- Histórico do dashboard: ORDER BY data_troca DESC, id DESC com LIMIT, e filtro
+-- de mês como intervalo de datas.
+CREATE INDEX IF NOT EXISTS idx_trocas_data ON trocas_cartucho (data_troca, id);
+
+-- Filtro por setor e contagens/exclusões por setor, equipamento e suprimento,
+-- já ordenados por data.
+CREATE INDEX IF NOT EXISTS idx_trocas_usuario_data ON trocas_cartucho (usuario_id, data_troca);
+CREATE INDEX IF NOT EXISTS idx_trocas_equipamento_data ON trocas_cartucho (equipamento_id, data_troca);
+CREATE INDEX IF NOT EXISTS idx_trocas_suprimento_data ON trocas_cartucho (suprimento_id, data_troca);
+
+-- "Registrar Troca": equipamentos do setor por modelo, suprimentos da categoria por modelo.
+CREATE INDEX IF NOT EXISTS idx_equipamentos_setor_modelo ON equipamentos (setor_id, modelo);
+CREATE INDEX IF NOT EXISTS idx_suprimentos_categoria_modelo ON suprimentos (categoria, modelo);
+
+-- Filtro de setor do dashboard (u.name = %s) e listagem ordenada por nome.
+CREATE INDEX IF NOT EXISTS idx_usuarios_name ON usuarios (name);
@@ -0,0 +1,32 @@
+-- Integridade referencial com exclusão em cascata: apagar um setor, equipamento
+-- ou suprimento apaga também as trocas que dependem dele. Equipamentos de um setor
+-- apagado continuam cadastrados, sem setor, como a aplicação sempre fez.
+-- Registros órfãos (que apontam para ids inexistentes) impediriam a criação das
+-- chaves; eles são desvinculados antes.
+UPDATE equipamentos e LEFT JOIN usuarios u ON e.setor_id = u.id
+SET e.setor_id = NULL WHERE e.setor_id IS NOT NULL AND u.id IS NULL;
+
+UPDATE trocas_cartucho t LEFT JOIN usuarios u ON t.usuario_id = u.id
+SET t.usuario_id = NULL WHERE t.usuario_id IS NOT NULL AND u.id IS NULL;
+
+UPDATE trocas_cartucho t LEFT JOIN equipamentos e ON t.equipamento_id = e.id
+SET t.equipamento_id = NULL WHERE t.equipamento_id IS NOT NULL AND e.id IS NULL;
+
+UPDATE trocas_cartucho t LEFT JOIN suprimentos s ON t.suprimento_id = s.id
+SET t.suprimento_id = NULL WHERE t.suprimento_id IS NOT NULL AND s.id IS NULL;
+
+ALTER TABLE equipamentos
+    ADD CONSTRAINT fk_equipamentos_setor FOREIGN KEY IF NOT EXISTS (setor_id)
+    REFERENCES usuarios (id) ON DELETE SET NULL;
+
+ALTER TABLE trocas_cartucho
+    ADD CONSTRAINT fk_trocas_usuario FOREIGN KEY IF NOT EXISTS (usuario_id)
+    REFERENCES usuarios (id) ON DELETE CASCADE;
+
+ALTER TABLE trocas_cartucho
+    ADD CONSTRAINT fk_trocas_equipamento FOREIGN KEY IF NOT EXISTS (equipamento_id)
+    REFERENCES equipamentos (id) ON DELETE CASCADE;
+
+ALTER TABLE trocas_cartucho
+    ADD CONSTRAINT fk_trocas_suprimento FOREIGN KEY IF NOT EXISTS (suprimento_id)
+    REFERENCES suprimentos (id) ON DELETE CASCADE;
@@ -0,0 +1,14 @@
+-- Agregado mensal usado pelos gráficos do dashboard (ver rollup.py). Setor,
+-- equipamento ou suprimento ausentes são gravados como 0, por isso não há chaves
+-- estrangeiras; as exclusões em cascata são feitas pela aplicação.
+CREATE TABLE IF NOT EXISTS trocas_mensais (
+    ano_mes CHAR(7) NOT NULL,
+    usuario_id INT NOT NULL DEFAULT 0,
+    equipamento_id INT NOT NULL DEFAULT 0,
+    suprimento_id INT NOT NULL DEFAULT 0,
+    total INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (ano_mes, usuario_id, equipamento_id, suprimento_id),
+    KEY idx_trocas_mensais_usuario (usuario_id),
+    KEY idx_trocas_mensais_equipamento (equipamento_id),
+    KEY idx_trocas_mensais_suprimento (suprimento_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
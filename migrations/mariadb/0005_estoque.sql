@@ -0,0 +1,33 @@
+-- Controle de estoque (ver inventory.py). estoque_movimentos é o livro-razão com
+-- cada entrada, saída por troca, estorno e ajuste; estoque_saldos guarda o saldo
+-- atual de cada suprimento, atualizado na mesma transação de cada movimento, para
+-- que as consultas de saldo não precisem somar o livro-razão.
+CREATE TABLE IF NOT EXISTS estoque_saldos (
+    suprimento_id INT NOT NULL PRIMARY KEY,
+    quantidade INT NOT NULL DEFAULT 0,
+    estoque_minimo INT NOT NULL DEFAULT 0,
+    -- Coluna calculada e indexada: o alerta de estoque baixo de cada página lê só
+    -- as linhas em alerta, sem comparar todas as linhas.
+    em_alerta TINYINT(1) AS (estoque_minimo > 0 AND quantidade <= estoque_minimo) PERSISTENT,
+    atualizado_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    KEY idx_estoque_saldos_alerta (em_alerta),
+    CONSTRAINT fk_estoque_saldos_suprimento FOREIGN KEY (suprimento_id)
+        REFERENCES suprimentos (id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS estoque_movimentos (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    suprimento_id INT NOT NULL,
+    tipo ENUM('entrada', 'troca', 'estorno', 'ajuste') NOT NULL,
+    quantidade INT NOT NULL,
+    saldo_apos INT NOT NULL,
+    troca_id INT NULL,
+    observacao VARCHAR(255) NULL,
+    criado_em DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    KEY idx_estoque_movimentos_suprimento (suprimento_id, id),
+    KEY idx_estoque_movimentos_troca (troca_id),
+    CONSTRAINT fk_estoque_movimentos_suprimento FOREIGN KEY (suprimento_id)
+        REFERENCES suprimentos (id) ON DELETE CASCADE,
+    CONSTRAINT fk_estoque_movimentos_troca FOREIGN KEY (troca_id)
+        REFERENCES trocas_cartucho (id) ON DELETE SET NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,17 @@
+-- Índice de busca textual do histórico (ver search.py): observação, modelos do
+-- equipamento e do suprimento, tipo, categoria e setor de cada troca.
+CREATE TABLE IF NOT EXISTS trocas_busca (
+    troca_id INT NOT NULL PRIMARY KEY,
+    texto TEXT NOT NULL,
+    FULLTEXT KEY ft_trocas_busca_texto (texto),
+    CONSTRAINT fk_trocas_busca_troca FOREIGN KEY (troca_id)
+        REFERENCES trocas_cartucho (id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Trocas que já existiam.
+INSERT IGNORE INTO trocas_busca (troca_id, texto)
+SELECT t.id, CONCAT_WS(' ', t.observacao, e.modelo, s.modelo, s.tipo, s.categoria, u.name)
+FROM trocas_cartucho t
+LEFT JOIN usuarios u ON t.usuario_id = u.id
+LEFT JOIN equipamentos e ON t.equipamento_id = e.id
+LEFT JOIN suprimentos s ON t.suprimento_id = s.id;
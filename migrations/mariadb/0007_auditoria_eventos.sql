@@ -0,0 +1,23 @@
+-- Trilha de auditoria (ver audit.py): um evento por INSERT/UPDATE/DELETE
+-- confirmado, gravado em lotes por uma thread da aplicação. A tabela é somente
+-- inclusão: os gatilhos recusam qualquer UPDATE ou DELETE nas linhas gravadas.
+CREATE TABLE IF NOT EXISTS auditoria_eventos (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    criado_em DATETIME(6) NOT NULL,
+    transacao CHAR(32) NOT NULL,
+    ator VARCHAR(100) NULL,
+    pagina VARCHAR(100) NULL,
+    operacao VARCHAR(10) NOT NULL,
+    tabela VARCHAR(64) NOT NULL,
+    linhas INT NULL,
+    registro_id BIGINT NULL,
+    comando TEXT NOT NULL,
+    parametros TEXT NULL,
+    KEY idx_auditoria_eventos_criado_em (criado_em),
+    KEY idx_auditoria_eventos_tabela (tabela, id),
+    KEY idx_auditoria_eventos_transacao (transacao)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TRIGGER IF NOT EXISTS trg_auditoria_eventos_sem_update BEFORE UPDATE ON auditoria_eventos FOR EACH ROW SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'auditoria_eventos aceita apenas inclusões';
+
+CREATE TRIGGER IF NOT EXISTS trg_auditoria_eventos_sem_delete BEFORE DELETE ON auditoria_eventos FOR EACH ROW SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'auditoria_eventos aceita apenas inclusões';
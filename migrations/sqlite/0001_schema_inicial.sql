@@ -0,0 +1,40 @@
+-- Mesmas tabelas de migrations/mariadb, no dialeto do SQLite. As chaves
+-- estrangeiras fazem parte do CREATE TABLE, porque o SQLite não adiciona
+-- constraints com ALTER TABLE; elas só valem com PRAGMA foreign_keys=ON, que o
+-- backend liga em cada conexão. AUTOINCREMENT evita reaproveitar ids apagados,
+-- como o AUTO_INCREMENT do InnoDB.
+CREATE TABLE IF NOT EXISTS usuarios (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(255) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS equipamentos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    modelo VARCHAR(255) NOT NULL,
+    categoria VARCHAR(50) NULL,
+    setor_id INT NULL,
+    CONSTRAINT fk_equipamentos_setor FOREIGN KEY (setor_id)
+        REFERENCES usuarios (id) ON DELETE SET NULL
+);
+
+CREATE TABLE IF NOT EXISTS suprimentos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    modelo VARCHAR(255) NOT NULL,
+    categoria VARCHAR(50) NOT NULL,
+    tipo VARCHAR(50) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS trocas_cartucho (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    usuario_id INT NULL,
+    equipamento_id INT NULL,
+    suprimento_id INT NULL,
+    data_troca DATE NOT NULL,
+    observacao TEXT NULL,
+    CONSTRAINT fk_trocas_usuario FOREIGN KEY (usuario_id)
+        REFERENCES usuarios (id) ON DELETE CASCADE,
+    CONSTRAINT fk_trocas_equipamento FOREIGN KEY (equipamento_id)
+        REFERENCES equipamentos (id) ON DELETE CASCADE,
+    CONSTRAINT fk_trocas_suprimento FOREIGN KEY (suprimento_id)
+        REFERENCES suprimentos (id) ON DELETE CASCADE
+);
@@ -0,0 +1,2 @@
+-- No SQLite as chaves estrangeiras já foram criadas com as tabelas (0001). Esta
+-- versão existe só para manter a mesma numeração das migrações do MariaDB.
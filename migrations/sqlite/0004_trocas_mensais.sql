@@ -0,0 +1,14 @@
+-- Agregado mensal usado pelos gráficos do dashboard (ver rollup.py), igual ao do
+-- MariaDB: sem chaves estrangeiras, ausentes gravados como 0.
+CREATE TABLE IF NOT EXISTS trocas_mensais (
+    ano_mes CHAR(7) NOT NULL,
+    usuario_id INT NOT NULL DEFAULT 0,
+    equipamento_id INT NOT NULL DEFAULT 0,
+    suprimento_id INT NOT NULL DEFAULT 0,
+    total INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (ano_mes, usuario_id, equipamento_id, suprimento_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_trocas_mensais_usuario ON trocas_mensais (usuario_id);
+CREATE INDEX IF NOT EXISTS idx_trocas_mensais_equipamento ON trocas_mensais (equipamento_id);
+CREATE INDEX IF NOT EXISTS idx_trocas_mensais_suprimento ON trocas_mensais (suprimento_id);
@@ -0,0 +1,36 @@
+-- Controle de estoque (ver inventory.py), igual ao do MariaDB. O tipo do
+-- movimento é validado por CHECK em vez de ENUM, e atualizado_em é mantido por
+-- um gatilho em vez de ON UPDATE CURRENT_TIMESTAMP.
+CREATE TABLE IF NOT EXISTS estoque_saldos (
+    suprimento_id INT NOT NULL PRIMARY KEY,
+    quantidade INT NOT NULL DEFAULT 0,
+    estoque_minimo INT NOT NULL DEFAULT 0,
+    em_alerta INT GENERATED ALWAYS AS (estoque_minimo > 0 AND quantidade <= estoque_minimo) STORED,
+    atualizado_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT fk_estoque_saldos_suprimento FOREIGN KEY (suprimento_id)
+        REFERENCES suprimentos (id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_estoque_saldos_alerta ON estoque_saldos (em_alerta);
+
+CREATE TRIGGER IF NOT EXISTS trg_estoque_saldos_atualizado_em
+AFTER UPDATE OF quantidade, estoque_minimo ON estoque_saldos
+BEGIN UPDATE estoque_saldos SET atualizado_em = CURRENT_TIMESTAMP WHERE suprimento_id = NEW.suprimento_id; END;
+
+CREATE TABLE IF NOT EXISTS estoque_movimentos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    suprimento_id INT NOT NULL,
+    tipo VARCHAR(10) NOT NULL CHECK (tipo IN ('entrada', 'troca', 'estorno', 'ajuste')),
+    quantidade INT NOT NULL,
+    saldo_apos INT NOT NULL,
+    troca_id INT NULL,
+    observacao VARCHAR(255) NULL,
+    criado_em DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT fk_estoque_movimentos_suprimento FOREIGN KEY (suprimento_id)
+        REFERENCES suprimentos (id) ON DELETE CASCADE,
+    CONSTRAINT fk_estoque_movimentos_troca FOREIGN KEY (troca_id)
+        REFERENCES trocas_cartucho (id) ON DELETE SET NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_estoque_movimentos_suprimento ON estoque_movimentos (suprimento_id, id);
+CREATE INDEX IF NOT EXISTS idx_estoque_movimentos_troca ON estoque_movimentos (troca_id);
@@ -0,0 +1,17 @@
+-- Índice de busca textual do histórico (ver search.py), como tabela virtual FTS5
+-- cujo rowid é o id da troca. remove_diacritics faz "manutencao" achar
+-- "manutenção"; os índices de prefixo aceleram as buscas por partes de modelos.
+CREATE VIRTUAL TABLE IF NOT EXISTS trocas_busca USING fts5(
+    texto,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+
+-- Trocas que já existiam.
+INSERT INTO trocas_busca (rowid, texto)
+SELECT t.id, CONCAT_WS(' ', t.observacao, e.modelo, s.modelo, s.tipo, s.categoria, u.name)
+FROM trocas_cartucho t
+LEFT JOIN usuarios u ON t.usuario_id = u.id
+LEFT JOIN equipamentos e ON t.equipamento_id = e.id
+LEFT JOIN suprimentos s ON t.suprimento_id = s.id
+WHERE t.id NOT IN (SELECT rowid FROM trocas_busca);
@@ -0,0 +1,25 @@
+-- Trilha de auditoria (ver audit.py), igual à do MariaDB. A tabela é somente
+-- inclusão: os gatilhos recusam qualquer UPDATE ou DELETE nas linhas gravadas.
+CREATE TABLE IF NOT EXISTS auditoria_eventos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    criado_em DATETIME NOT NULL,
+    transacao CHAR(32) NOT NULL,
+    ator VARCHAR(100) NULL,
+    pagina VARCHAR(100) NULL,
+    operacao VARCHAR(10) NOT NULL,
+    tabela VARCHAR(64) NOT NULL,
+    linhas INT NULL,
+    registro_id BIGINT NULL,
+    comando TEXT NOT NULL,
+    parametros TEXT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_auditoria_eventos_criado_em ON auditoria_eventos (criado_em);
+CREATE INDEX IF NOT EXISTS idx_auditoria_eventos_tabela ON auditoria_eventos (tabela, id);
+CREATE INDEX IF NOT EXISTS idx_auditoria_eventos_transacao ON auditoria_eventos (transacao);
+
+CREATE TRIGGER IF NOT EXISTS trg_auditoria_eventos_sem_update BEFORE UPDATE ON auditoria_eventos
+BEGIN SELECT RAISE(ABORT, 'auditoria_eventos aceita apenas inclusões'); END;
+
+CREATE TRIGGER IF NOT EXISTS trg_auditoria_eventos_sem_delete BEFORE DELETE ON auditoria_eventos
+BEGIN SELECT RAISE(ABORT, 'auditoria_eventos aceita apenas inclusões'); END;
@@ -0,0 +1,24 @@
+import importlib
+# --- PÁGINAS DA APLICAÇÃO ---
+# Cada página é um módulo de paginas/ com uma função render(), importado só quando
+# a página é aberta pela primeira vez no processo: pandas, plotly e pyarrow são
+# carregados apenas pelas páginas que os usam, e os reruns seguintes reaproveitam
+# o módulo já importado. (O nome não é pages/ para que o Streamlit não monte a
+# navegação multipágina automática.)
+PAGINAS = {
+    "Registrar Troca": "paginas.registrar_troca",
+    "Dashboard de Análise": "paginas.dashboard",
+    "Previsão de Consumo": "paginas.previsao",
+    "Anomalias": "paginas.anomalias",
+    "Gerenciar Setores": "paginas.setores",
+    "Gerenciar Equipamentos": "paginas.equipamentos",
+    "Gerenciar Suprimentos": "paginas.suprimentos",
+    "Estoque": "paginas.estoque",
+    "Relatórios": "paginas.relatorios",
+    "Importar em Lote": "paginas.importacao",
+    "Diagnóstico": "paginas.diagnostico",
+    "Auditoria": "paginas.auditoria",
+}
+def carregar_pagina(page):
+    """Módulo da página (importado na primeira vez que é aberta)."""
+    return importlib.import_module(PAGINAS[page])
@@ -0,0 +1,83 @@
+import pandas as pd
+import streamlit as st
+from db import commit_changes, rollback_changes
+from queries import CadastroEmUsoError, get_uso_cadastros, apagar_cadastros
+from settings import section
+# --- LISTAS DE CADASTRO COM USO E EXCLUSÃO EM LOTE ---
+# Usado pelas páginas "Gerenciar Setores/Equipamentos/Suprimentos". A lista traz,
+# para cada item, quantas trocas ele tem e a data da última, vindas de uma única
+# consulta agrupada. As linhas marcadas na tabela são apagadas juntas, com as suas
+# trocas, numa única transação (ver queries.apagar_cadastros).
+def tabela_de_uso(tabela, itens, colunas, chave):
+    """Mostra os itens com as colunas de uso e devolve as linhas selecionadas.
+
+    `itens` é uma lista de dicts com 'id' e as `colunas` visíveis, nesta ordem.
+    """
+    uso = get_uso_cadastros(tabela) or {}
+    df = pd.DataFrame(itens, columns=['id'] + colunas)
+    df['Trocas'] = [uso.get(item_id, {}).get('total', 0) for item_id in df['id']]
+    df['Última troca'] = pd.to_datetime([uso.get(item_id, {}).get('ultima') for item_id in df['id']])
+    event = st.dataframe(
+        df,
+        key=chave,
+        hide_index=True,
+        use_container_width=True,
+        column_order=colunas + ['Trocas', 'Última troca'],
+        column_config={'Última troca': st.column_config.DateColumn('Última troca', format='DD/MM/YYYY')},
+        on_select="rerun",
+        selection_mode="multi-row",
+    )
+    st.caption(f"{len(df)} cadastrados. Marque uma ou mais linhas para removê-las.")
+    return df.iloc[event.selection.rows]
+def _apagar(tabela, ids, descricao, sem_trocas=False):
+    try:
+        apagar_cadastros(tabela, ids, sem_trocas=sem_trocas)
+        commit_changes()
+        st.success(f"{descricao} removido(s) com sucesso!")
+        return True
+    except CadastroEmUsoError:
+        rollback_changes()
+        raise
+    except Exception as e:
+        rollback_changes()
+        st.error(f"Ocorreu um erro durante a exclusão: {e}")
+        return False
+def pedir_exclusao(tabela, selecionados, coluna_nome, estado):
+    """Apaga na hora os itens sem trocas; se algum tiver trocas, guarda o pedido em `estado` para confirmação."""
+    ids = [int(i) for i in selecionados['id']]
+    nomes = list(selecionados[coluna_nome])
+    trocas = int(selecionados['Trocas'].sum())
+    if trocas == 0:
+        # A contagem da lista vem do cache: a exclusão sem senha confere de novo no banco, na transação.
+        try:
+            if _apagar(tabela, ids, ", ".join(f"'{nome}'" for nome in nomes), sem_trocas=True):
+                st.rerun()
+            return
+        except CadastroEmUsoError as e:
+            trocas = e.trocas
+    st.session_state[estado] = {'ids': ids, 'nomes': nomes, 'trocas': trocas}
+    st.rerun()
+def confirmar_exclusao(tabela, entidade, estado):
+    """Formulário de senha para o pedido pendente em `estado`. Devolve True enquanto houver um pedido."""
+    pedido = st.session_state.get(estado)
+    if not pedido:
+        return False
+    nomes = ", ".join(f"'{nome}'" for nome in pedido['nomes'][:10]) + (f" e mais {len(pedido['nomes']) - 10}" if len(pedido['nomes']) > 10 else "")
+    st.warning(f"⚠️ **ATENÇÃO:** Você está prestes a apagar {len(pedido['ids'])} {entidade} (**{nomes}**) e todos os seus **{pedido['trocas']}** registros. Esta ação é irreversível.")
+    with st.form(f"confirm_{estado}_form"):
+        password = st.text_input("Para confirmar, digite a senha de exclusão:", type="password")
+        col_confirm, col_cancel = st.columns(2)
+        with col_confirm:
+            if st.form_submit_button("Confirmar Exclusão Permanente", type="primary"):
+                delete_password = section("auth").get("delete_password", section("auth").get("password", "default_pass"))
+                if password == delete_password:
+                    if _apagar(tabela, pedido['ids'], f"{len(pedido['ids'])} {entidade} e seus registros"):
+                        st.session_state[estado] = None
+                        st.rerun()
+                else:
+                    st.error("Senha de exclusão incorreta.")
+        with col_cancel:
+            if st.form_submit_button("Cancelar"):
+                st.session_state[estado] = None
+                st.rerun()
+    return True
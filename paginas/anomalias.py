@@ -0,0 +1,47 @@
+import plotly.express as px
+import streamlit as st
+from anomalias import Z_PADRAO, MINIMO_INTERVALOS, MINIMO_PARES, get_anomalias, classificar, anomalias_stats
+from instrumentation import timed_phase
+# --- PÁGINA: ANOMALIAS DE CONSUMO ---
+def render():
+    st.header("Anomalias de Consumo por Equipamento")
+    st.caption("Cada equipamento × suprimento é comparado com os do mesmo modelo de equipamento e suprimento (ou, com poucos pares, com a mesma categoria e tipo) pelo intervalo médio entre trocas. Z robusto negativo: troca mais rápido que a base.")
+    col_limiar, col_intervalos, col_pares, col_todos = st.columns(4)
+    limiar = col_limiar.number_input("Limiar do |z| robusto:", min_value=1.0, max_value=10.0, value=Z_PADRAO, step=0.5)
+    minimo_intervalos = col_intervalos.number_input("Mínimo de intervalos:", min_value=1, max_value=50, value=MINIMO_INTERVALOS)
+    minimo_pares = col_pares.number_input("Mínimo de pares no modelo:", min_value=2, max_value=50, value=MINIMO_PARES)
+    mostrar_todos = col_todos.toggle("Mostrar também os normais")
+    with timed_phase("anomalias"):
+        with st.spinner("Atualizando os intervalos..."):
+            df = get_anomalias(int(minimo_intervalos), int(minimo_pares))
+    if df.empty:
+        st.info("Ainda não há equipamentos com trocas suficientes para comparar.")
+        return
+    situacao = classificar(df, limiar)
+    acima, abaixo = int((situacao == 'Consumo acima da base').sum()), int((situacao == 'Consumo abaixo da base').sum())
+    col_acima, col_abaixo, col_total = st.columns(3)
+    col_acima.metric("Consumo acima da base", acima)
+    col_abaixo.metric("Consumo abaixo da base", abaixo)
+    col_total.metric("Pares analisados", len(df))
+    tabela = df.assign(Situação=situacao)
+    if not mostrar_todos:
+        tabela = tabela[tabela['Situação'] != 'Normal']
+    if tabela.empty:
+        st.success("Nenhum equipamento fora do padrão com o limiar escolhido.")
+    else:
+        st.dataframe(
+            tabela.drop(columns=['ID Equipamento', 'ID Suprimento']).round(2),
+            hide_index=True,
+            use_container_width=True,
+            column_order=['Situação', 'Setor', 'Equipamento', 'Suprimento', 'Trocas', 'Intervalo Médio (dias)', 'Intervalo da Base (dias)', 'Ritmo vs. Base', 'Z Robusto', 'Consumo Mensal', 'Base', 'Pares na Base', 'Última Troca'],
+            column_config={'Última Troca': st.column_config.DateColumn(format="DD/MM/YYYY")},
+        )
+    bases = df['Base'][situacao != 'Normal'].unique().tolist() or df['Base'].unique().tolist()
+    base = st.selectbox("Distribuição da base:", bases)
+    with timed_phase("grafico"):
+        grupo = df[df['Base'] == base].assign(Situação=situacao[df['Base'] == base])
+        fig = px.strip(grupo, x='Intervalo Médio (dias)', color='Situação', hover_data=['Setor', 'Equipamento', 'Suprimento', 'Trocas', 'Z Robusto'], log_x=True, title=f"Intervalo médio entre trocas: {base}")
+        fig.add_vline(x=float(grupo['Intervalo da Base (dias)'].iloc[0]), line_dash="dash", annotation_text="mediana da base")
+        st.plotly_chart(fig, use_container_width=True)
+    stats = anomalias_stats()
+    st.caption(f"Versão dos dados: {stats['versao']} | Cálculos: {stats['calculos']} | Leituras do cache: {stats['acertos']}")
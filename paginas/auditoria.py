@@ -0,0 +1,63 @@
+from datetime import date, timedelta
+import pandas as pd
+import streamlit as st
+from audit import get_audit_writer, get_eventos, count_eventos, get_tabelas_auditadas
+from settings import section
+# --- PÁGINA: AUDITORIA ---
+OPERACOES = ["INSERT", "UPDATE", "DELETE"]
+def reset_audit_page():
+    st.session_state.audit_page = 1
+def render():
+    st.header("Trilha de Auditoria")
+    if not st.session_state.get('diagnostics_unlocked'):
+        with st.form("audit_login_form"):
+            password = st.text_input("Senha de administração:", type="password")
+            if st.form_submit_button("Entrar"):
+                admin_password = section("auth").get("delete_password", section("auth").get("password", "default_pass"))
+                if password == admin_password:
+                    st.session_state.diagnostics_unlocked = True
+                    st.rerun()
+                else:
+                    st.error("Senha incorreta.")
+        return
+    writer = get_audit_writer()
+    if writer is None:
+        st.warning("A auditoria está desligada ([audit] enabled = false nas secrets). Os eventos abaixo são de quando estava ligada.")
+    else:
+        stats = writer.stats()
+        col_info, col_flush = st.columns([4, 1])
+        col_info.caption(f"Fila: {stats['pendentes']}/{stats['capacidade']} aguardando gravação | Gravados: {stats['gravados']} | Descartados (fila cheia): {stats['descartados']} | Falhas: {stats['falhas']} | Espera máxima no commit: {stats['espera_max'] * 1000:.1f} ms")
+        if col_flush.button("Gravar fila agora"):
+            writer.esvaziar()
+            st.rerun()
+    col_tabela, col_operacao, col_ator, col_periodo = st.columns([2, 2, 2, 3])
+    tabela = col_tabela.selectbox("Tabela:", ["Todas"] + get_tabelas_auditadas(), key='audit_tabela', on_change=reset_audit_page)
+    operacao = col_operacao.selectbox("Operação:", ["Todas"] + OPERACOES, key='audit_operacao', on_change=reset_audit_page)
+    ator = col_ator.text_input("Ator contém:", key='audit_ator', on_change=reset_audit_page)
+    periodo = col_periodo.date_input("Período:", value=(date.today() - timedelta(days=30), date.today()), format="DD/MM/YYYY", key='audit_periodo', on_change=reset_audit_page)
+    desde = periodo[0] if len(periodo) > 0 else None
+    ate = periodo[1] + timedelta(days=1) if len(periodo) > 1 else None
+    filtros = {
+        'tabela': None if tabela == "Todas" else tabela,
+        'operacao': None if operacao == "Todas" else operacao,
+        'ator': ator.strip() or None,
+        'desde': desde,
+        'ate': ate,
+    }
+    total = count_eventos(**filtros)
+    if not total:
+        st.info("Nenhum evento encontrado com os filtros selecionados.")
+        return
+    page_size = 100
+    total_pages = max(1, -(-total // page_size))
+    st.session_state.audit_page = min(st.session_state.get('audit_page', 1), total_pages)
+    st.number_input(f"Página (de {total_pages}):", min_value=1, max_value=total_pages, step=1, key='audit_page')
+    eventos = pd.DataFrame(get_eventos(**filtros, limit=page_size, offset=(st.session_state.audit_page - 1) * page_size))
+    eventos = eventos.rename(columns={'criado_em': 'Quando', 'ator': 'Ator', 'pagina': 'Página', 'operacao': 'Operação', 'tabela': 'Tabela', 'linhas': 'Linhas', 'registro_id': 'Id gerado', 'comando': 'Comando', 'parametros': 'Parâmetros', 'transacao': 'Transação'})
+    st.dataframe(
+        eventos.drop(columns=['id']),
+        hide_index=True,
+        use_container_width=True,
+        column_config={'Quando': st.column_config.DatetimeColumn('Quando', format='DD/MM/YYYY HH:mm:ss')},
+    )
+    st.caption(f"Página {st.session_state.audit_page} de {total_pages} ({total} eventos). Eventos de uma mesma transação têm a mesma Transação.")
@@ -0,0 +1,198 @@
+import tempfile
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+from db import commit_changes, rollback_changes
+from export import FORMATOS, write_export
+from instrumentation import timed_phase
+from queries import get_change_logs_page, get_change_log, count_change_logs, apagar_troca, get_change_logs_snapshot, filtrar_historico, opcoes_filtros, contagens_por, contagens_por_mes, pagina_historico
+from search import palavras
+from settings import section
+# --- PÁGINA: DASHBOARD DE ANÁLISE ---
+def render():
+    st.header("Dashboard de Análise de Trocas")
+    if 'sort_by' not in st.session_state:
+        st.session_state.sort_by = 'Data'
+        st.session_state.sort_ascending = False
+    if 'deleting_log_id' not in st.session_state:
+        st.session_state.deleting_log_id = None
+    if 'history_page' not in st.session_state:
+        st.session_state.history_page = 1
+        st.session_state.history_page_size = 50
+
+    with timed_phase("filtros"):
+        # Uma consulta à versão dos dados quando nada mudou desde o último rerun;
+        # filtros, gráficos e a página do histórico saem do retrato em memória.
+        historico = get_change_logs_snapshot()
+        if historico is None:
+            return
+        opcoes = opcoes_filtros(historico)
+
+    if not opcoes['meses']:
+        st.info("Ainda não há registros de troca para exibir.")
+    else:
+        st.sidebar.markdown("---")
+        st.sidebar.header("Filtros do Dashboard")
+        # Filtro de Categoria
+        categorias_filtro = ["Todas"] + [c for c in opcoes['categorias'] if c != 'Não definida']
+        categoria_filtrada = st.sidebar.selectbox("Filtrar por Categoria:", categorias_filtro)
+        # Filtro de Setor
+        setores_filtro = ["Todos"] + opcoes['setores']
+        setor_filtrado = st.sidebar.selectbox("Filtrar por Setor:", setores_filtro)
+
+        # Filtro de Mês/Ano
+        lista_meses = ["Todos"] + opcoes['meses']
+        mes_selecionado = st.sidebar.selectbox("Filtrar por Mês/Ano:", options=lista_meses)
+        # None significa "sem filtro".
+        filtros = {
+            'categoria': None if categoria_filtrada == "Todas" else categoria_filtrada,
+            'setor': None if setor_filtrado == "Todos" else setor_filtrado,
+            'mes': None if mes_selecionado == "Todos" else mes_selecionado,
+        }
+        if st.session_state.get('history_filters') != filtros:
+            st.session_state.history_filters = filtros
+            st.session_state.history_page = 1
+            st.session_state.deleting_log_id = None
+        filtrado = filtrar_historico(historico, **filtros)
+        total_filtrado = len(filtrado)
+        with timed_phase("graficos"):
+            st.markdown("### Gráficos de Análise")
+            if total_filtrado == 0:
+                st.warning("Nenhum registro encontrado para os filtros selecionados.")
+            else:
+                col1, col2 = st.columns(2)
+                with col1:
+                    if setor_filtrado != "Todos":
+                        st.subheader("Total de Trocas por Equipamento")
+                        counts = pd.DataFrame(contagens_por(filtrado, 'Equipamento'))
+                        counts.columns = ['Equipamento', 'Total de Trocas']
+                        x_axis, label_x = 'Equipamento', 'Equipamento'
+                    else:
+                        st.subheader("Total de Trocas por Setor")
+                        counts = pd.DataFrame(contagens_por(filtrado, 'Setor'))
+                        counts.columns = ['Setor', 'Total de Trocas']
+                        x_axis, label_x = 'Setor', 'Nome do Setor'
+
+                    titulo_grafico_bar = f"Filtros: ({setor_filtrado}, {categoria_filtrada}, {mes_selecionado})"
+                    fig_bar = px.bar(counts, x=x_axis, y='Total de Trocas', title=titulo_grafico_bar, labels={x_axis: label_x, 'Total de Trocas': 'Quantidade'}, text='Total de Trocas')
+                    fig_bar.update_traces(textposition='outside')
+                    st.plotly_chart(fig_bar, use_container_width=True)
+
+                with col2:
+                    st.subheader("Proporção por Tipo de Suprimento")
+                    type_counts = pd.DataFrame(contagens_por(filtrado, 'Tipo'))
+                    type_counts.columns = ['Tipo', 'Quantidade']
+                    titulo_grafico_pie = f"Filtros: ({setor_filtrado}, {categoria_filtrada}, {mes_selecionado})"
+                    fig_pie = px.pie(type_counts, names='Tipo', values='Quantidade', title=titulo_grafico_pie, hole=.3)
+                    st.plotly_chart(fig_pie, use_container_width=True)
+
+                st.subheader("Trocas ao Longo do Tempo")
+                if setor_filtrado != "Todos":
+                    monthly_changes = pd.DataFrame(contagens_por_mes(filtrado))
+                else:
+                    monthly_changes = pd.DataFrame(contagens_por_mes(historico))
+                monthly_changes.columns = ['AnoMês', 'Quantidade']
+                titulo_grafico_linha = f"Volume de Trocas por Mês ({setor_filtrado}, {categoria_filtrada})"
+                fig_line = px.line(monthly_changes, x='AnoMês', y='Quantidade', title=titulo_grafico_linha, markers=True, labels={'AnoMês': 'Mês/Ano', 'Quantidade': 'Nº de Trocas'})
+                st.plotly_chart(fig_line, use_container_width=True)
+
+        st.markdown("---")
+        col_titulo, col_download = st.columns([3, 1])
+        with col_titulo:
+            titulo_historico = f"Histórico de Trocas ({setor_filtrado}, {categoria_filtrada}, {mes_selecionado})"
+            st.subheader(titulo_historico)
+        with col_download:
+            # O arquivo só é gerado quando pedido, em blocos vindos do banco direto para
+            # um arquivo temporário em disco (nada de DataFrame inteiro nem st.cache_data).
+            formato_export = st.selectbox("Formato:", list(FORMATOS.keys()), label_visibility="collapsed")
+            if st.button("📥 Exportar histórico"):
+                info_formato = FORMATOS[formato_export]
+                with tempfile.TemporaryFile() as arquivo_export:
+                    with st.spinner("Gerando arquivo..."):
+                        write_export(arquivo_export, formato_export, **filtros, busca=st.session_state.get('history_search'))
+                    arquivo_export.seek(0)
+                    st.download_button(
+                        label=f"💾 Baixar {info_formato['extensao'].upper()}",
+                        data=arquivo_export,
+                        file_name=f"historico_trocas_{setor_filtrado}_{categoria_filtrada}_{mes_selecionado}.{info_formato['extensao']}",
+                        mime=info_formato['mime'],
+                    )
+        log_details = None
+        if st.session_state.deleting_log_id is not None:
+            log_details = get_change_log(st.session_state.deleting_log_id)
+            if not log_details:
+                st.session_state.deleting_log_id = None
+        if log_details:
+            st.warning(f"Você tem certeza que deseja apagar o registro abaixo?")
+            st.write(f"**Data:** {log_details['Data'].strftime('%d/%m/%Y')}, **Setor:** {log_details['Setor']}, **Equipamento:** {log_details['Equipamento']}, **Suprimento:** {log_details['Suprimento']}")
+            with st.form("confirm_delete_log_form"):
+                password = st.text_input("Para confirmar, digite a senha de exclusão:", type="password")
+                col_confirm, col_cancel = st.columns(2)
+                with col_confirm:
+                    if st.form_submit_button("Sim, apagar registro", type="primary"):
+                        delete_password = section("auth").get("delete_password", section("auth").get("password", "default_pass"))
+                        if password == delete_password:
+                            try:
+                                apagar_troca(st.session_state.deleting_log_id)
+                                commit_changes()
+                                st.success("Registro apagado com sucesso!")
+                                st.session_state.deleting_log_id = None
+                                st.rerun()
+                            except Exception as e:
+                                rollback_changes()
+                                st.error(f"Ocorreu um erro ao apagar o registro: {e}")
+                        else:
+                            st.error("Senha de exclusão incorreta.")
+                with col_cancel:
+                    if st.form_submit_button("Cancelar"):
+                        st.session_state.deleting_log_id = None
+                        st.rerun()
+        with timed_phase("historico"):
+            # A ordenação é feita sobre todo o resultado filtrado (no retrato, ou no banco
+            # quando há busca) e a tabela exibe apenas uma página: o custo de renderização
+            # não depende de quantas trocas atendem aos filtros.
+            def reset_history_page():
+                st.session_state.history_page = 1
+                st.session_state.deleting_log_id = None
+            # A busca textual é combinada no banco com os filtros da barra lateral; os
+            # gráficos acima continuam mostrando o total dos filtros, sem a busca.
+            busca = st.text_input("🔎 Buscar no histórico:", key='history_search', placeholder="Palavras da observação, partes do modelo, setor...", on_change=reset_history_page)
+            total_historico = count_change_logs(**filtros, busca=busca) if palavras(busca) else total_filtrado
+            colunas_ordenaveis = ['Data', 'Setor', 'Equipamento', 'Suprimento', 'Categoria', 'Tipo']
+            col_sort, col_dir, col_size, col_page = st.columns([2, 2, 1, 1])
+            col_sort.selectbox("Ordenar por:", colunas_ordenaveis, key='sort_by', on_change=reset_history_page)
+            col_dir.radio("Ordem:", [False, True], format_func=lambda asc: "Crescente" if asc else "Decrescente", key='sort_ascending', horizontal=True, on_change=reset_history_page)
+            page_size = col_size.selectbox("Linhas por página:", [25, 50, 100, 250], key='history_page_size', on_change=reset_history_page)
+            total_pages = max(1, -(-total_historico // page_size))
+            st.session_state.history_page = min(st.session_state.history_page, total_pages)
+            col_page.number_input(f"Página (de {total_pages}):", min_value=1, max_value=total_pages, step=1, key='history_page')
+            offset = (st.session_state.history_page - 1) * page_size
+            if palavras(busca):
+                logs_page = get_change_logs_page(**filtros, sort_by=st.session_state.sort_by, ascending=st.session_state.sort_ascending, limit=page_size, offset=offset, busca=busca)
+            else:
+                logs_page = pagina_historico(filtrado, st.session_state.sort_by, st.session_state.sort_ascending, limit=page_size, offset=offset)
+            df_page = pd.DataFrame(logs_page, columns=['ID Troca', 'Data', 'Setor', 'Equipamento', 'Suprimento', 'Categoria', 'Tipo', 'Observação'])
+            df_page['Data'] = pd.to_datetime(df_page['Data'])
+            event = st.dataframe(
+                df_page,
+                key='history_table',
+                hide_index=True,
+                use_container_width=True,
+                column_order=['Data', 'Setor', 'Equipamento', 'Suprimento', 'Categoria', 'Tipo', 'Observação'],
+                column_config={'Data': st.column_config.DateColumn('Data', format='DD/MM/YYYY')},
+                on_select="rerun",
+                selection_mode="single-row",
+            )
+            st.caption(f"Página {st.session_state.history_page} de {total_pages} ({total_historico} registros). Selecione uma linha para ver a observação ou remover o registro.")
+            if event.selection.rows:
+                row = df_page.iloc[event.selection.rows[0]]
+                with st.container(border=True):
+                    st.markdown(f"**{row['Data'].strftime('%d/%m/%Y')}** | {row['Setor']} | {row['Equipamento']} | {row['Suprimento']} ({row['Tipo']})")
+                    obs_text = row['Observação']
+                    if obs_text and obs_text.strip():
+                        st.info(obs_text)
+                    else:
+                        st.caption("Sem observações.")
+                    if st.button("🗑️ Remover este registro", key=f"del_log_{row['ID Troca']}"):
+                        st.session_state.deleting_log_id = int(row['ID Troca'])
+                        st.rerun()
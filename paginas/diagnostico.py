@@ -0,0 +1,67 @@
+from datetime import datetime
+import pandas as pd
+import streamlit as st
+from cache import get_reference_cache
+from db import get_pool_metrics, get_pools_metrics
+from instrumentation import metrics
+from migrate import check_indexes
+from queries import get_change_log_snapshot
+from settings import section
+# --- PÁGINA: DIAGNÓSTICO ---
+def render():
+    st.header("Diagnóstico de Desempenho")
+    if not st.session_state.get('diagnostics_unlocked'):
+        with st.form("diagnostics_login_form"):
+            password = st.text_input("Senha de administração:", type="password")
+            if st.form_submit_button("Entrar"):
+                admin_password = section("auth").get("delete_password", section("auth").get("password", "default_pass"))
+                if password == admin_password:
+                    st.session_state.diagnostics_unlocked = True
+                    st.rerun()
+                else:
+                    st.error("Senha incorreta.")
+    else:
+        st.caption(f"Medições desta instância do servidor (últimos registros em memória). Queries com {metrics.slow_query_ms:.0f} ms ou mais entram no log de lentas.")
+        col_pool, col_cache, col_snapshot = st.columns(3)
+        with col_pool:
+            st.subheader("Pool de conexões")
+            st.json(get_pool_metrics() or {})
+        with col_cache:
+            st.subheader("Cache de cadastros")
+            st.json(get_reference_cache().stats())
+        with col_snapshot:
+            st.subheader("Histórico em memória")
+            st.json(get_change_log_snapshot().stats())
+        pools = get_pools_metrics()
+        if len(pools) > 1:
+            st.subheader("Pools por tenant")
+            st.dataframe(pd.DataFrame([{'Tenant': tenant, 'Conexões': m['size'], 'Em uso': m['in_use'], 'Ociosas': m['idle'], 'Aguardando': m['waiters'], 'Timeouts': m['timeouts'], 'Espera média (ms)': m['wait_avg'] * 1000} for tenant, m in pools.items()]).round(2), hide_index=True, use_container_width=True)
+        st.subheader("Queries por latência total")
+        query_summary = pd.DataFrame(metrics.query_summary())
+        if query_summary.empty:
+            st.info("Nenhuma query registrada ainda.")
+        else:
+            st.dataframe(query_summary.round(2), hide_index=True, use_container_width=True)
+        st.subheader("Fases de renderização por página")
+        phase_summary = pd.DataFrame(metrics.phase_summary())
+        if phase_summary.empty:
+            st.info("Nenhuma fase registrada ainda.")
+        else:
+            st.dataframe(phase_summary.round(2), hide_index=True, use_container_width=True)
+        st.subheader("Log de queries lentas")
+        slow = pd.DataFrame(metrics.slow_queries())
+        if slow.empty:
+            st.info("Nenhuma query lenta registrada.")
+        else:
+            st.dataframe(slow, hide_index=True, use_container_width=True)
+        st.subheader("Uso de índices nas consultas principais")
+        if st.button("🔍 Verificar planos de execução (EXPLAIN)"):
+            try:
+                st.dataframe(pd.DataFrame(check_indexes()), hide_index=True, use_container_width=True)
+            except Exception as e:
+                st.error(f"Não foi possível executar o EXPLAIN: {e}")
+        col_export, col_clear = st.columns(2)
+        col_export.download_button("📥 Exportar medições (JSONL)", data=metrics.export_jsonl(), file_name=f"diagnostico_{datetime.now():%Y%m%d_%H%M%S}.jsonl", mime="application/x-ndjson")
+        if col_clear.button("🧹 Limpar medições"):
+            metrics.clear()
+            st.rerun()
@@ -0,0 +1,42 @@
+import streamlit as st
+from db import execute_query, commit_changes, rollback_changes
+from queries import TIPOS_POR_CATEGORIA, get_users, get_equipamentos
+from paginas._cadastros import tabela_de_uso, pedir_exclusao, confirmar_exclusao
+# --- PÁGINA: GERENCIAR EQUIPAMENTOS ---
+def render():
+    st.header("Gerenciar Equipamentos")
+    if confirmar_exclusao("equipamentos", "equipamento(s)", "deleting_equips"):
+        return
+    with st.expander("Adicionar Novo Equipamento"):
+        users_data = get_users()
+        if not users_data:
+            st.warning("Cadastre um setor antes de adicionar um equipamento.")
+        else:
+            setor_map = {user['name']: user['id'] for user in users_data}
+            with st.form("novo_equipamento_form", clear_on_submit=True):
+                modelo = st.text_input("Modelo do Equipamento:")
+                categoria = st.selectbox("Categoria do Suprimento:", list(TIPOS_POR_CATEGORIA))
+                setor_nome = st.selectbox("Associar ao Setor:", options=setor_map.keys())
+                if st.form_submit_button("Adicionar Equipamento"):
+                    if modelo and setor_nome and categoria:
+                        setor_id = setor_map[setor_nome]
+                        try:
+                            query = "INSERT INTO equipamentos (modelo, setor_id, categoria) VALUES (%s, %s, %s);"
+                            execute_query(query, (modelo, setor_id, categoria))
+                            commit_changes()
+                            st.success(f"Equipamento '{modelo}' adicionado!")
+                            st.rerun()
+                        except Exception as e:
+                            rollback_changes()
+                            st.error(f"Erro ao adicionar equipamento: {e}")
+                    else:
+                        st.error("Preencha todos os campos.")
+    st.markdown("---")
+    st.subheader("Lista de Equipamentos Cadastrados")
+    equipamentos_data = get_equipamentos()
+    if not equipamentos_data:
+        st.info("Nenhum equipamento cadastrado.")
+        return
+    selecionados = tabela_de_uso("equipamentos", [{'id': item['id'], 'Modelo': item['modelo'], 'Categoria': item.get('categoria') or 'N/A', 'Setor': item['usuarios']['name'] or 'N/A'} for item in equipamentos_data], ['Modelo', 'Categoria', 'Setor'], "lista_equipamentos")
+    if not selecionados.empty and st.button(f"🗑️ Apagar {len(selecionados)} selecionado(s)", key="delete_lista_equipamentos"):
+        pedir_exclusao("equipamentos", selecionados, 'Modelo', "deleting_equips")
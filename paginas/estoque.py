@@ -0,0 +1,71 @@
+import pandas as pd
+import streamlit as st
+from db import commit_changes, rollback_changes
+from inventory import TIPOS_MOVIMENTO, get_saldos, get_movimentos, registrar_entrada, ajustar_estoque, definir_minimo
+# --- PÁGINA: ESTOQUE ---
+def render():
+    st.header("Estoque de Suprimentos")
+    saldos = get_saldos()
+    if not saldos:
+        st.info("Nenhum suprimento cadastrado.")
+    else:
+        suprimento_map = {f"{s['modelo']} ({s['tipo']})": s['id'] for s in saldos}
+        df_saldos = pd.DataFrame(saldos)
+        df_saldos['Situação'] = ['⚠️ Abaixo do mínimo' if alerta else ('Sem estoque' if qtd <= 0 else 'OK') for alerta, qtd in zip(df_saldos['em_alerta'], df_saldos['quantidade'])]
+        df_saldos = df_saldos.drop(columns=['id', 'em_alerta']).rename(columns={'modelo': 'Suprimento', 'categoria': 'Categoria', 'tipo': 'Tipo', 'quantidade': 'Em Estoque', 'estoque_minimo': 'Mínimo'})
+        st.dataframe(df_saldos, hide_index=True, use_container_width=True)
+        col_entrada, col_ajuste, col_minimo = st.columns(3)
+        with col_entrada:
+            with st.form("entrada_estoque_form", clear_on_submit=True):
+                st.subheader("Entrada (compra)")
+                sup_entrada = st.selectbox("Suprimento:", options=suprimento_map.keys(), key="sup_entrada")
+                quantidade = st.number_input("Quantidade recebida:", min_value=1, value=1, step=1)
+                obs_entrada = st.text_input("Observação (nota fiscal, fornecedor...):")
+                if st.form_submit_button("Registrar Entrada"):
+                    try:
+                        registrar_entrada(suprimento_map[sup_entrada], quantidade, obs_entrada)
+                        commit_changes()
+                        st.success(f"Entrada de {quantidade} unidade(s) de '{sup_entrada}' registrada!")
+                        st.rerun()
+                    except Exception as e:
+                        rollback_changes()
+                        st.error(f"Erro ao registrar a entrada: {e}")
+        with col_ajuste:
+            with st.form("ajuste_estoque_form", clear_on_submit=True):
+                st.subheader("Ajuste de inventário")
+                sup_ajuste = st.selectbox("Suprimento:", options=suprimento_map.keys(), key="sup_ajuste")
+                contagem = st.number_input("Quantidade contada na prateleira:", min_value=0, value=0, step=1)
+                obs_ajuste = st.text_input("Motivo do ajuste:")
+                if st.form_submit_button("Ajustar Saldo"):
+                    try:
+                        delta = ajustar_estoque(suprimento_map[sup_ajuste], contagem, obs_ajuste)
+                        commit_changes()
+                        st.success(f"Saldo de '{sup_ajuste}' ajustado ({delta:+d})." if delta else f"O saldo de '{sup_ajuste}' já estava correto.")
+                        st.rerun()
+                    except Exception as e:
+                        rollback_changes()
+                        st.error(f"Erro ao ajustar o saldo: {e}")
+        with col_minimo:
+            with st.form("minimo_estoque_form", clear_on_submit=True):
+                st.subheader("Estoque mínimo")
+                sup_minimo = st.selectbox("Suprimento:", options=suprimento_map.keys(), key="sup_minimo")
+                minimo = st.number_input("Alertar quando o estoque chegar a:", min_value=0, value=0, step=1, help="0 desliga o alerta.")
+                if st.form_submit_button("Salvar Mínimo"):
+                    try:
+                        definir_minimo(suprimento_map[sup_minimo], minimo)
+                        commit_changes()
+                        st.success(f"Estoque mínimo de '{sup_minimo}' definido como {minimo}.")
+                        st.rerun()
+                    except Exception as e:
+                        rollback_changes()
+                        st.error(f"Erro ao salvar o mínimo: {e}")
+        st.markdown("---")
+        st.subheader("Movimentações")
+        filtro_mov = st.selectbox("Filtrar por suprimento:", ["Todos"] + list(suprimento_map.keys()))
+        movimentos = get_movimentos(suprimento_map.get(filtro_mov))
+        if not movimentos:
+            st.info("Nenhuma movimentação registrada.")
+        else:
+            df_mov = pd.DataFrame(movimentos)
+            df_mov['Movimento'] = df_mov['Movimento'].map(TIPOS_MOVIMENTO)
+            st.dataframe(df_mov, hide_index=True, use_container_width=True)
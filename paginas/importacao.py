@@ -0,0 +1,36 @@
+import pandas as pd
+import streamlit as st
+from bulk_import import COLUNAS_IMPORTACAO, COLUNAS_OBRIGATORIAS, read_table, import_rows
+# --- PÁGINA: IMPORTAR EM LOTE ---
+def render():
+    st.header("Importar Registros em Lote")
+    st.markdown("Envie um arquivo **CSV** ou **XLSX** com uma linha por registro. Nomes de setor, equipamento e suprimento devem ser iguais aos cadastrados (maiúsculas e acentos são ignorados).")
+    tipo_importacao = st.radio("O que será importado?", ["trocas", "equipamentos", "suprimentos"], format_func=lambda t: {"trocas": "Trocas de suprimento", "equipamentos": "Equipamentos", "suprimentos": "Suprimentos (catálogo)"}[t], horizontal=True)
+    st.caption(f"Colunas: {', '.join(COLUNAS_IMPORTACAO[tipo_importacao])} (obrigatórias: {', '.join(COLUNAS_OBRIGATORIAS[tipo_importacao])})")
+    arquivo = st.file_uploader("Arquivo:", type=["csv", "xlsx"])
+    if arquivo is not None:
+        try:
+            df_import = read_table(arquivo, arquivo.name)
+        except Exception as e:
+            st.error(f"Não foi possível ler o arquivo: {e}")
+            df_import = None
+        if df_import is not None:
+            st.dataframe(df_import.head(20), hide_index=True, use_container_width=True)
+            col_validar, col_importar = st.columns(2)
+            validar = col_validar.button("🔎 Validar (simulação)")
+            importar = col_importar.button("📤 Importar", type="primary")
+            if validar or importar:
+                try:
+                    with st.spinner("Processando..."):
+                        relatorio = import_rows(tipo_importacao, df_import, dry_run=not importar)
+                except Exception as e:
+                    st.error(f"Falha na importação; nada foi gravado: {e}")
+                else:
+                    st.info(f"Linhas lidas: {relatorio['total']} | Válidas: {relatorio['validos']} | Com erro: {len(relatorio['erros'])}")
+                    if relatorio['erros']:
+                        st.warning("Corrija as linhas abaixo e envie o arquivo novamente. Nenhum registro é gravado enquanto houver erros.")
+                        st.dataframe(pd.DataFrame(relatorio['erros'], columns=['Linha', 'Erro']), hide_index=True, use_container_width=True)
+                    if relatorio['gravado']:
+                        st.success(f"{relatorio['validos']} registros importados com sucesso!")
+                    elif not relatorio['erros']:
+                        st.success("Arquivo válido. Clique em 'Importar' para gravar os registros.")
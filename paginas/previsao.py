@@ -0,0 +1,55 @@
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+from forecast import get_forecast_engine
+from instrumentation import timed_phase
+# --- PÁGINA: PREVISÃO DE CONSUMO ---
+def render():
+    st.header("Previsão de Consumo e Ponto de Pedido")
+    engine = get_forecast_engine()
+    col_horizonte, col_janela, col_prazo, col_servico = st.columns(4)
+    horizonte = col_horizonte.slider("Meses a prever:", 1, 12, 3)
+    janela = col_janela.slider("Meses de histórico usados:", 3, 36, 12)
+    prazo_entrega = col_prazo.number_input("Prazo de entrega (dias):", min_value=1, max_value=180, value=15)
+    nivel_servico = col_servico.selectbox("Nível de serviço:", [0.90, 0.95, 0.98, 0.99], index=1, format_func=lambda v: f"{v:.0%}")
+    with timed_phase("atualizacao"):
+        with st.spinner("Atualizando a previsão..."):
+            engine.refresh()
+    with timed_phase("previsao"):
+        previsao, meses_futuros = engine.previsao(horizonte, janela, prazo_entrega, nivel_servico)
+        if previsao.empty:
+            st.info("Ainda não há trocas suficientes para calcular a previsão.")
+        else:
+            st.caption("Previsão por tendência linear sobre os meses completos da janela; o mês corrente é o primeiro previsto. Ponto de pedido = demanda no prazo de entrega + estoque de segurança.")
+            st.dataframe(previsao.round(2), hide_index=True, use_container_width=True)
+            modelo = st.selectbox("Histórico e previsão do suprimento:", previsao['Suprimento'].tolist())
+            serie = engine.serie_mensal().loc[modelo]
+            linha = previsao[previsao['Suprimento'] == modelo].iloc[0]
+            grafico = pd.concat([
+                pd.DataFrame({'Mês': serie.index.strftime('%Y-%m'), 'Quantidade': serie.to_numpy(), 'Série': 'Histórico'}),
+                pd.DataFrame({'Mês': meses_futuros.strftime('%Y-%m'), 'Quantidade': [linha[f"Previsão {mes.strftime('%m/%Y')}"] for mes in meses_futuros], 'Série': 'Previsão'}),
+            ])
+            fig_previsao = px.line(grafico, x='Mês', y='Quantidade', color='Série', markers=True, title=f"Trocas por mês: {modelo}", labels={'Quantidade': 'Nº de Trocas', 'Mês': 'Mês/Ano'})
+            st.plotly_chart(fig_previsao, use_container_width=True)
+    with timed_phase("intervalos"):
+        st.subheader("Intervalos entre Trocas por Equipamento")
+        intervalos = engine.intervalos()
+        if intervalos.empty:
+            st.info("Nenhum equipamento com trocas registradas.")
+        else:
+            intervalos = intervalos.drop(columns=['ID Equipamento', 'ID Suprimento']).sort_values('Próxima Troca Prevista', na_position='last')
+            st.dataframe(
+                intervalos.round(1),
+                hide_index=True,
+                use_container_width=True,
+                column_config={
+                    'Última Troca': st.column_config.DateColumn(format="DD/MM/YYYY"),
+                    'Próxima Troca Prevista': st.column_config.DateColumn(format="DD/MM/YYYY"),
+                },
+            )
+    stats = engine.stats()
+    col_stats, col_recalcular = st.columns([3, 1])
+    col_stats.caption(f"{stats['pares']} pares equipamento × suprimento, {stats['modelos']} modelos | Atualizações incrementais: {stats['atualizacoes']} | Recálculos completos: {stats['recalculos']}")
+    if col_recalcular.button("🔄 Recalcular do zero"):
+        engine.refresh(force=True)
+        st.rerun()
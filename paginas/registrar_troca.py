@@ -0,0 +1,57 @@
+from datetime import datetime
+import streamlit as st
+from db import commit_changes, rollback_changes
+from inventory import get_saldo
+from queries import get_users, get_equipamentos, get_suprimentos, registrar_troca
+# --- PÁGINA: REGISTRAR TROCA ---
+def render():
+    st.header("Registrar uma Nova Troca de Suprimento")
+    users = get_users()
+    if not users:
+        st.warning("Nenhum setor cadastrado.")
+    else:
+        user_map = {user['name']: user['id'] for user in users}
+        selected_user_name = st.selectbox("1. Selecione o Setor:", options=user_map.keys(), index=None, placeholder="Escolha um setor...")
+        if selected_user_name:
+            selected_user_id = user_map[selected_user_name]
+            equipamentos_no_setor = get_equipamentos(setor_id=selected_user_id)
+            if not equipamentos_no_setor:
+                st.warning(f"O setor '{selected_user_name}' não possui equipamentos cadastrados.")
+            else:
+                equipamento_map = {eq['modelo']: {'id': eq['id'], 'categoria': eq['categoria']} for eq in equipamentos_no_setor}
+                selected_equipamento_modelo = st.selectbox("2. Selecione o Equipamento:", options=equipamento_map.keys(), index=None, placeholder="Escolha um equipamento...")
+                if selected_equipamento_modelo:
+                    selected_equipamento_id = equipamento_map[selected_equipamento_modelo]['id']
+                    categoria_do_equipamento = equipamento_map[selected_equipamento_modelo]['categoria']
+                    if not categoria_do_equipamento:
+                        st.error(f"O equipamento '{selected_equipamento_modelo}' não tem uma categoria definida.")
+                    else:
+                        suprimentos_disponiveis = get_suprimentos(categoria=categoria_do_equipamento)
+                        if not suprimentos_disponiveis:
+                            st.warning(f"Nenhum suprimento da categoria '{categoria_do_equipamento}' cadastrado.")
+                        else:
+                            suprimento_map = {f"{sup['modelo']} ({sup['tipo']})": sup['id'] for sup in suprimentos_disponiveis}
+                            st.markdown("---")
+                            with st.form("registro_troca_form"):
+                                st.info(f"Registrando para: **{selected_user_name}** | **{selected_equipamento_modelo}**")
+                                suprimento_selecionado_modelo = st.selectbox("3. Selecione o Suprimento Trocado:", options=suprimento_map.keys())
+                                change_date = st.date_input("4. Data da Troca:", datetime.now())
+                                observacao = st.text_area("5. Observações (opcional):")
+                                if st.form_submit_button("Registrar Troca"):
+                                    if not suprimento_selecionado_modelo:
+                                        st.error("Por favor, selecione um suprimento.")
+                                    else:
+                                        suprimento_id = suprimento_map[suprimento_selecionado_modelo]
+                                        try:
+                                            registrar_troca(selected_user_id, selected_equipamento_id, suprimento_id, change_date, observacao)
+                                            commit_changes()
+                                            st.success("Registro de troca criado com sucesso!")
+                                            saldo = get_saldo(suprimento_id)
+                                            if saldo['quantidade'] < 0:
+                                                st.warning(f"Estoque de '{suprimento_selecionado_modelo}' está negativo ({saldo['quantidade']}). Registre a entrada das unidades na página Estoque.")
+                                            elif saldo['em_alerta']:
+                                                st.warning(f"Restam {saldo['quantidade']} unidade(s) de '{suprimento_selecionado_modelo}' (mínimo {saldo['estoque_minimo']}).")
+                                            # Limpar campos seria uma boa adição aqui, mas st.rerun() já resolve.
+                                        except Exception as e:
+                                            rollback_changes()
+                                            st.error(f"Falha ao registrar: {e}")
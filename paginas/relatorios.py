@@ -0,0 +1,39 @@
+from datetime import datetime
+import pandas as pd
+import streamlit as st
+from reports import FORMATOS_RELATORIO, listar_relatorios, caminho_relatorio, get_agendador
+# --- PÁGINA: RELATÓRIOS ---
+# Só lista e baixa: os arquivos são gerados pelo agendador em segundo plano (reports.py).
+def render():
+    st.header("Relatórios Mensais de Consumo")
+    agendador = get_agendador()
+    if agendador is None:
+        st.caption("O agendador está desligado neste servidor ([reports] enabled = false); são listados os relatórios já gerados.")
+    else:
+        estado = agendador.estado()
+        situacao = f"gerando {estado['gerando']}" if estado['gerando'] else f"última verificação: {estado['ultima_verificacao'] or 'ainda não feita'}"
+        st.caption(f"Gerados automaticamente para cada mês fechado ({situacao}). Formatos: {', '.join(estado['formatos']) or 'nenhum (instale openpyxl e/ou kaleido)'}.")
+        if estado['ultimo_erro']:
+            st.warning(f"Último erro do agendador: {estado['ultimo_erro']}")
+    manifestos = listar_relatorios()
+    if not manifestos:
+        st.info("Nenhum relatório gerado ainda.")
+        return
+    por_mes = {m['mes']: m for m in manifestos}
+    mes = st.selectbox("Mês:", list(por_mes), format_func=lambda m: datetime.strptime(m, "%Y-%m").strftime("%m/%Y"))
+    manifesto = por_mes[mes]
+    st.caption(f"{len(manifesto['relatorios'])} relatórios, {manifesto['total']} trocas no mês. Gerados em {datetime.fromisoformat(manifesto['gerado_em']):%d/%m/%Y %H:%M}.")
+    setores = [item['setor'] or "Todos os setores" for item in manifesto['relatorios']]
+    escolhido = st.selectbox("Setor:", setores)
+    item = manifesto['relatorios'][setores.index(escolhido)]
+    st.dataframe(pd.DataFrame([{'Setor': s, 'Trocas': i['total'], 'Arquivos': ", ".join(i['arquivos']) or "-"} for s, i in zip(setores, manifesto['relatorios'])]), hide_index=True, use_container_width=True, height=240)
+    colunas = st.columns(len(FORMATOS_RELATORIO))
+    for coluna, (formato, info) in zip(colunas, FORMATOS_RELATORIO.items()):
+        arquivo = item['arquivos'].get(formato)
+        caminho = caminho_relatorio(mes, arquivo) if arquivo else None
+        with coluna:
+            if caminho:
+                with open(caminho, "rb") as f:
+                    st.download_button(f"💾 Baixar {formato}", data=f.read(), file_name=f"consumo_{mes}_{arquivo}", mime=info['mime'], key=f"baixar_{mes}_{arquivo}")
+            elif formato in item.get('erros', {}):
+                st.error(f"{formato} não pôde ser gerado: {item['erros'][formato][:200]}")
@@ -0,0 +1,50 @@
+import streamlit as st
+from db import execute_query, commit_changes, rollback_changes
+from queries import get_users
+from search import reindexar
+from paginas._cadastros import tabela_de_uso, pedir_exclusao, confirmar_exclusao
+# --- PÁGINA: GERENCIAR SETORES ---
+def render():
+    st.header("Gerenciar Setores")
+    if confirmar_exclusao("usuarios", "setor(es)", "deleting_sectors"):
+        return
+    with st.expander("Adicionar Novo Setor", expanded=True):
+        with st.form("novo_setor_form", clear_on_submit=True):
+            new_user_name = st.text_input("Nome do Novo Setor:")
+            if st.form_submit_button("Adicionar Setor"):
+                if new_user_name:
+                    try:
+                        execute_query("INSERT INTO usuarios (name) VALUES (%s);", (new_user_name,))
+                        commit_changes()
+                        st.success(f"Setor '{new_user_name}' adicionado!")
+                        st.rerun()
+                    except Exception as e:
+                        rollback_changes()
+                        st.error(f"Ocorreu um erro: {e}")
+    st.markdown("---")
+    st.subheader("Lista de Setores Cadastrados")
+    users_data = get_users()
+    if not users_data:
+        st.info("Nenhum setor cadastrado.")
+        return
+    selecionados = tabela_de_uso("usuarios", [{'id': user['id'], 'Setor': user['name']} for user in users_data], ['Setor'], "lista_setores")
+    if selecionados.empty:
+        return
+    col_rename, col_delete = st.columns([3, 1])
+    with col_rename:
+        if len(selecionados) == 1:
+            user_id, user_name = int(selecionados['id'].iloc[0]), selecionados['Setor'].iloc[0]
+            new_name = st.text_input("Novo nome:", value=user_name, key=f"edit_input_{user_id}")
+            if st.button("✔️ Salvar", key=f"save_{user_id}") and new_name and new_name != user_name:
+                try:
+                    execute_query("UPDATE usuarios SET name = %s WHERE id = %s;", (new_name, user_id))
+                    reindexar('usuario_id', [user_id])
+                    commit_changes()
+                    st.success(f"Setor renomeado para '{new_name}'!")
+                    st.rerun()
+                except Exception as e:
+                    rollback_changes()
+                    st.error(f"Erro ao atualizar: {e}")
+    with col_delete:
+        if st.button(f"🗑️ Apagar {len(selecionados)} selecionado(s)", key="delete_sectors"):
+            pedir_exclusao("usuarios", selecionados, 'Setor', "deleting_sectors")
@@ -0,0 +1,38 @@
+import streamlit as st
+from db import execute_query, commit_changes, rollback_changes
+from queries import TIPOS_POR_CATEGORIA, get_suprimentos
+from paginas._cadastros import tabela_de_uso, pedir_exclusao, confirmar_exclusao
+# --- PÁGINA: GERENCIAR SUPRIMENTOS ---
+def render():
+    st.header("Gerenciar Suprimentos (Catálogo)")
+    if confirmar_exclusao("suprimentos", "suprimento(s)", "deleting_sups"):
+        return
+    with st.expander("Adicionar Novo Suprimento ao Catálogo"):
+        with st.form("novo_suprimento_form", clear_on_submit=True):
+            modelo = st.text_input("Modelo (ex: HP 664)")
+            categoria = st.selectbox("Categoria", list(TIPOS_POR_CATEGORIA))
+            tipo = None
+            if categoria in TIPOS_POR_CATEGORIA:
+                tipo = st.selectbox("Tipo", TIPOS_POR_CATEGORIA[categoria])
+            if st.form_submit_button("Adicionar Suprimento"):
+                if modelo and categoria and tipo:
+                    try:
+                        query = "INSERT INTO suprimentos (modelo, categoria, tipo) VALUES (%s, %s, %s);"
+                        execute_query(query, (modelo, categoria, tipo))
+                        commit_changes()
+                        st.success(f"Suprimento '{modelo}' adicionado!")
+                        st.rerun()
+                    except Exception as e:
+                        rollback_changes()
+                        st.error(f"Erro ao adicionar suprimento: {e}")
+                else:
+                    st.error("Preencha todos os campos.")
+    st.markdown("---")
+    st.subheader("Catálogo de Suprimentos Cadastrados")
+    suprimentos_data = get_suprimentos()
+    if not suprimentos_data:
+        st.info("Nenhum suprimento cadastrado.")
+        return
+    selecionados = tabela_de_uso("suprimentos", [{'id': item['id'], 'Modelo': item['modelo'], 'Categoria': item.get('categoria', 'N/A'), 'Tipo': item.get('tipo', 'N/A')} for item in suprimentos_data], ['Modelo', 'Categoria', 'Tipo'], "lista_suprimentos")
+    if not selecionados.empty and st.button(f"🗑️ Apagar {len(selecionados)} selecionado(s)", key="delete_lista_suprimentos"):
+        pedir_exclusao("suprimentos", selecionados, 'Modelo', "deleting_sups")
@@ -0,0 +1,430 @@
+import threading
+from datetime import date, datetime
+from db import execute_query, execute_strict, iter_query
+from cache import cached
+from rollup import increment_rollup, decrement_rollup_for_log, delete_rollup_for, versao_trocas
+from inventory import registrar_saida_troca, estornar_troca
+from search import palavras, busca_clause, indexar_trocas, remover_da_busca
+from tenants import PorTenant
+# --- CAMADA DE CONSULTAS ---
+# Filtros e paginação do histórico são resolvidos no banco: a API, os relatórios e
+# a busca textual transferem apenas a página pedida, nunca a tabela de trocas
+# inteira. O dashboard trabalha sobre o retrato incremental em memória (ver
+# "DASHBOARD SOBRE O RETRATO").
+_FROM_TROCAS = """
+        FROM trocas_cartucho t
+        LEFT JOIN usuarios u ON t.usuario_id = u.id
+        LEFT JOIN equipamentos e ON t.equipamento_id = e.id
+        LEFT JOIN suprimentos s ON t.suprimento_id = s.id"""
+# Regras de catálogo: categorias de suprimento e os tipos válidos em cada uma.
+# Um equipamento só aceita suprimentos da mesma categoria (ver "Registrar Troca").
+TIPOS_POR_CATEGORIA = {
+    "Cartucho de Tinta": ["Preto", "Colorido"],
+    "Suprimento Laser": ["Toner", "Cilindro"],
+}
+# Colunas exibidas no dashboard -> expressão SQL correspondente.
+COLUNAS_HISTORICO = {
+    'ID Troca': "t.id",
+    'Data': "t.data_troca",
+    'Setor': "COALESCE(u.name, 'Setor Desconhecido')",
+    'Equipamento': "COALESCE(e.modelo, 'Não especificado')",
+    'Suprimento': "COALESCE(s.modelo, 'Não especificado')",
+    'Categoria': "COALESCE(s.categoria, 'Não definida')",
+    'Tipo': "COALESCE(s.tipo, 'Não definido')",
+    'Observação': "COALESCE(t.observacao, '')",
+}
+_SELECT_HISTORICO = ",\n            ".join(f"{expr} AS `{col}`" for col, expr in COLUNAS_HISTORICO.items())
+def get_users():
+    return cached(("usuarios",), {"usuarios"}, lambda: execute_query("SELECT id, name FROM usuarios ORDER BY name;", fetch="all"))
+def get_equipamentos(setor_id=None):
+    return cached(("equipamentos", setor_id), {"equipamentos", "usuarios"}, lambda: _load_equipamentos(setor_id))
+def equipamentos_query(setor_id=None):
+    """Consulta (sql, params) dos equipamentos, opcionalmente de um setor."""
+    base_query = 'SELECT e.id, e.modelo, e.categoria, u.name as setor_name FROM equipamentos e LEFT JOIN usuarios u ON e.setor_id = u.id'
+    params = None
+    if setor_id:
+        base_query += " WHERE e.setor_id = %s"
+        params = (setor_id,)
+    base_query += " ORDER BY e.modelo;"
+    return base_query, params
+def _load_equipamentos(setor_id):
+    equipamentos = execute_query(*equipamentos_query(setor_id), fetch="all")
+    if equipamentos is None: return None
+    if not equipamentos: return []
+    return [{'id': eq['id'], 'modelo': eq['modelo'], 'categoria': eq['categoria'], 'usuarios': {'name': eq.get('setor_name', 'N/A')}} for eq in equipamentos]
+def get_suprimentos(categoria=None):
+    return cached(("suprimentos", categoria), {"suprimentos"}, lambda: _load_suprimentos(categoria))
+def suprimentos_query(categoria=None):
+    """Consulta (sql, params) do catálogo de suprimentos, opcionalmente de uma categoria."""
+    query = "SELECT * FROM suprimentos"
+    params = None
+    if categoria:
+        query += " WHERE categoria = %s"
+        params = (categoria,)
+    query += " ORDER BY modelo;"
+    return query, params
+def _load_suprimentos(categoria):
+    return execute_query(*suprimentos_query(categoria), fetch="all")
+# Cadastro -> coluna de trocas_cartucho que aponta para ele.
+CADASTROS = {'usuarios': 'usuario_id', 'equipamentos': 'equipamento_id', 'suprimentos': 'suprimento_id'}
+def get_uso_cadastros(tabela):
+    """Trocas de cada setor/equipamento/suprimento: {id: {'total': n, 'ultima': date}}, numa única consulta agrupada."""
+    return cached(("uso", tabela), {"trocas_cartucho"}, lambda: _load_uso(CADASTROS[tabela]))
+def _load_uso(coluna):
+    # Agrupa só o índice (coluna, data_troca): a contagem e a última data saem dele
+    # sem ler as linhas da tabela.
+    rows = execute_query(f"SELECT {coluna} AS id, COUNT(*) AS total, MAX(data_troca) AS ultima FROM trocas_cartucho WHERE {coluna} IS NOT NULL GROUP BY {coluna};", fetch="all")
+    if rows is None: return None
+    return {row['id']: {'total': int(row['total']), 'ultima': date.fromisoformat(str(row['ultima'])[:10])} for row in rows}
+# --- CONSULTAS DO DASHBOARD ---
+def month_range(ano_mes):
+    """Converte 'AAAA-MM' no intervalo [primeiro dia do mês, primeiro dia do mês seguinte)."""
+    inicio = datetime.strptime(ano_mes, "%Y-%m").date()
+    fim = date(inicio.year + 1, 1, 1) if inicio.month == 12 else date(inicio.year, inicio.month + 1, 1)
+    return inicio, fim
+def _where_filtros(categoria=None, setor=None, mes=None, busca=None):
+    """Monta a cláusula WHERE dos filtros do dashboard (None significa 'Todos')."""
+    clauses, params = [], []
+    if categoria:
+        clauses.append("s.categoria = %s")
+        params.append(categoria)
+    if setor:
+        clauses.append("u.name = %s")
+        params.append(setor)
+    if mes:
+        # Intervalo de datas em vez de DATE_FORMAT(t.data_troca) = %s, para que o
+        # índice em data_troca possa ser usado.
+        clauses.append("t.data_troca >= %s AND t.data_troca < %s")
+        params.extend(month_range(mes))
+    if palavras(busca):
+        clause, busca_params = busca_clause(busca)
+        clauses.append(clause)
+        params.extend(busca_params)
+    where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+    return where, tuple(params)
+def change_logs_page_query(categoria=None, setor=None, mes=None, sort_by='Data', ascending=False, limit=50, offset=0, busca=None):
+    """Consulta (sql, params) de uma página do histórico, filtrada e ordenada."""
+    if sort_by not in COLUNAS_HISTORICO:
+        sort_by = 'Data'
+    direction = "ASC" if ascending else "DESC"
+    where, params = _where_filtros(categoria, setor, mes, busca)
+    # t.id desempata registros com o mesmo valor, para que a paginação seja estável.
+    query = f"""
+        SELECT
+            {_SELECT_HISTORICO}
+        {_FROM_TROCAS}{where}
+        ORDER BY {COLUNAS_HISTORICO[sort_by]} {direction}, t.id {direction}
+        LIMIT %s OFFSET %s;
+    """
+    return query, params + (int(limit), int(offset))
+def get_change_logs_page(categoria=None, setor=None, mes=None, sort_by='Data', ascending=False, limit=50, offset=0, busca=None):
+    """Uma página do histórico já filtrada e ordenada pelo banco."""
+    query, params = change_logs_page_query(categoria, setor, mes, sort_by, ascending, limit, offset, busca)
+    return execute_query(query, params, fetch="all") or []
+def count_change_logs(categoria=None, setor=None, mes=None, busca=None):
+    """Quantidade de trocas que atendem aos filtros e à busca (sem busca, prefira rollup.count_rollup)."""
+    where, params = _where_filtros(categoria, setor, mes, busca)
+    result = execute_query(f"SELECT COUNT(*) AS total {_FROM_TROCAS}{where};", params or None, fetch="one")
+    return int(result['total']) if result else 0
+def get_change_log(log_id):
+    """Um único registro do histórico, com os mesmos rótulos da tabela do dashboard."""
+    query = f"SELECT {_SELECT_HISTORICO} {_FROM_TROCAS} WHERE t.id = %s;"
+    return execute_query(query, (log_id,), fetch="one")
+# --- HISTÓRICO COMO DATAFRAME ---
+# As trocas chegam do banco como tuplas de ids, em blocos, e cada coluna é montada
+# direto como array NumPy. Os rótulos (setor, equipamento, suprimento, categoria,
+# tipo) vêm das tabelas de cadastro, que são pequenas, e viram colunas categóricas
+# por códigos: nenhuma string é criada por linha, exceto a observação.
+_ROTULOS_PADRAO = {
+    'Setor': 'Setor Desconhecido',
+    'Equipamento': 'Não especificado',
+    'Suprimento': 'Não especificado',
+    'Categoria': 'Não definida',
+    'Tipo': 'Não definido',
+}
+def _load_rotulos():
+    usuarios = execute_query("SELECT id, name FROM usuarios;", fetch="all")
+    equipamentos = execute_query("SELECT id, modelo, setor_id FROM equipamentos;", fetch="all")
+    suprimentos = execute_query("SELECT id, modelo, categoria, tipo FROM suprimentos;", fetch="all")
+    if usuarios is None or equipamentos is None or suprimentos is None:
+        return None
+    setores = {u['id']: u['name'] for u in usuarios}
+    return {
+        'Setor': setores,
+        'Equipamento': {e['id']: e['modelo'] for e in equipamentos},
+        'Setor do Equipamento': {e['id']: setores.get(e['setor_id']) for e in equipamentos},
+        'Suprimento': {s['id']: s['modelo'] for s in suprimentos},
+        'Categoria': {s['id']: s['categoria'] for s in suprimentos},
+        'Tipo': {s['id']: s['tipo'] for s in suprimentos},
+    }
+def get_rotulos():
+    """Rótulos das tabelas de cadastro por id ({'Setor': {id: nome}, ...}), em cache."""
+    return cached(("rotulos",), {"usuarios", "equipamentos", "suprimentos"}, _load_rotulos)
+def _categorical_from_ids(ids, rotulos, padrao):
+    """Converte um array de ids em pd.Categorical usando um vetor de consulta id -> código."""
+    import numpy as np
+    import pandas as pd
+    categorias = sorted({r for r in rotulos.values() if r} | {padrao})
+    codigo = {r: i for i, r in enumerate(categorias)}
+    maior_id = max(max(rotulos, default=0), int(ids.max(initial=0)))
+    lookup = np.full(maior_id + 1, codigo[padrao], dtype=np.int32)
+    for id_, rotulo in rotulos.items():
+        if rotulo:
+            lookup[id_] = codigo[rotulo]
+    return pd.Categorical.from_codes(lookup[ids], categories=categorias)
+def _ler_historico(where="", params=(), chunk_size=20000):
+    """Trocas filtradas como arrays (ids, datas, setores, equipamentos, suprimentos, observações), do mais recente para o mais antigo."""
+    import numpy as np
+    query = f"""
+        SELECT t.id, t.data_troca, COALESCE(t.usuario_id, 0), COALESCE(t.equipamento_id, 0), COALESCE(t.suprimento_id, 0), t.observacao
+        {_FROM_TROCAS}{where}
+        ORDER BY t.data_troca DESC, t.id DESC;
+    """
+    ids, datas, usuarios, equipamentos, suprimentos, observacoes = [], [], [], [], [], []
+    for _, rows in iter_query(query, params or None, chunk_size=chunk_size):
+        col_id, col_data, col_usuario, col_equip, col_sup, col_obs = zip(*rows)
+        ids.append(np.array(col_id, dtype=np.int64))
+        datas.append(np.array(col_data, dtype='datetime64[ns]'))
+        usuarios.append(np.array(col_usuario, dtype=np.int64))
+        equipamentos.append(np.array(col_equip, dtype=np.int64))
+        suprimentos.append(np.array(col_sup, dtype=np.int64))
+        observacoes.append(np.array([obs or '' for obs in col_obs], dtype=object))
+    def juntar(partes, dtype):
+        return np.concatenate(partes) if partes else np.empty(0, dtype=dtype)
+    return (juntar(ids, np.int64), juntar(datas, 'datetime64[ns]'), juntar(usuarios, np.int64), juntar(equipamentos, np.int64), juntar(suprimentos, np.int64), juntar(observacoes, object))
+def _frame_historico(colunas, rotulos):
+    """DataFrame do histórico a partir dos arrays de _ler_historico e dos rótulos dos cadastros."""
+    import numpy as np
+    import pandas as pd
+    ids, datas, usuarios, equipamentos, suprimentos, observacoes = colunas
+    return pd.DataFrame({
+        'ID Troca': ids,
+        'Data': datas,
+        'Setor': _categorical_from_ids(usuarios, rotulos['Setor'], _ROTULOS_PADRAO['Setor']),
+        'Equipamento': _categorical_from_ids(equipamentos, rotulos['Equipamento'], _ROTULOS_PADRAO['Equipamento']),
+        'Suprimento': _categorical_from_ids(suprimentos, rotulos['Suprimento'], _ROTULOS_PADRAO['Suprimento']),
+        'Categoria': _categorical_from_ids(suprimentos, rotulos['Categoria'], _ROTULOS_PADRAO['Categoria']),
+        'Tipo': _categorical_from_ids(suprimentos, rotulos['Tipo'], _ROTULOS_PADRAO['Tipo']),
+        'Observação': observacoes,
+        'ID Setor': usuarios.astype(np.int32),
+        'ID Equipamento': equipamentos.astype(np.int32),
+        'ID Suprimento': suprimentos.astype(np.int32),
+    })
+def get_change_logs(categoria=None, setor=None, mes=None, chunk_size=20000):
+    """Histórico de trocas (filtrado) como DataFrame tipado, do mais recente para o mais antigo.
+
+    Colunas: 'ID Troca', 'Data' (datetime64), 'Setor', 'Equipamento', 'Suprimento',
+    'Categoria', 'Tipo' (categóricas), 'Observação' e os ids 'ID Setor',
+    'ID Equipamento' e 'ID Suprimento' (0 quando ausentes). Sempre lê do banco; para
+    leituras repetidas prefira get_change_logs_snapshot().
+    """
+    rotulos = get_rotulos()
+    if rotulos is None:
+        return None
+    where, params = _where_filtros(categoria, setor, mes)
+    return _frame_historico(_ler_historico(where, params, chunk_size), rotulos)
+# --- HISTÓRICO INCREMENTAL EM MEMÓRIA ---
+# Um retrato do histórico inteiro fica em memória no processo, junto com a marca
+# d'água (maior id já lido) e a versão dos dados (rollup.versao_trocas). A cada
+# leitura só a versão é consultada; se ela mudou, apenas as trocas com id acima da
+# marca são lidas e juntadas ao retrato. Quando a contagem não fecha (houve
+# exclusões), os ids ainda existentes até a marca são lidos, sem junções, e as
+# trocas apagadas saem do retrato. Os rótulos vêm do cache de cadastros, então
+# renomear um setor só remonta as colunas categóricas, sem voltar ao banco.
+class ChangeLogSnapshot:
+    """Retrato incremental do histórico de trocas, compartilhado entre as sessões do processo."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._colunas = None
+        self._versao = None
+        self._marca = 0
+        self._frame = None
+        self._rotulos = None
+        self.recargas = 0
+        self.atualizacoes = 0
+        self.exclusoes = 0
+    def refresh(self, force=False):
+        """Sincroniza o retrato com o banco e devolve o DataFrame do histórico inteiro (None se o banco falhar)."""
+        import numpy as np
+        with self._lock:
+            versao = versao_trocas()
+            rotulos = get_rotulos()
+            if versao is None or rotulos is None:
+                return self._frame
+            max_id, total = versao
+            # As leituras param em max_id: trocas gravadas depois da consulta à versão
+            # ficam para a próxima atualização, e a marca d'água não pula nenhuma.
+            if self._colunas is None or force:
+                self._colunas = _ler_historico(" WHERE t.id <= %s", (max_id,))
+                self._marca = max_id
+                self.recargas += 1
+            elif versao != self._versao:
+                novas = _ler_historico(" WHERE t.id > %s AND t.id <= %s", (self._marca, max_id)) if max_id > self._marca else None
+                if novas is not None and len(novas[0]):
+                    self._colunas = _juntar_historico(novas, self._colunas)
+                    self.atualizacoes += 1
+                if len(self._colunas[0]) != total:
+                    # Tombstones: ids do retrato que já não existem no banco.
+                    vivos = [np.array([row[0] for row in rows], dtype=np.int64) for _, rows in iter_query("SELECT id FROM trocas_cartucho WHERE id <= %s;", (max_id,), chunk_size=100000)]
+                    manter = np.isin(self._colunas[0], np.concatenate(vivos) if vivos else np.empty(0, dtype=np.int64))
+                    self._colunas = tuple(coluna[manter] for coluna in self._colunas)
+                    self.exclusoes += int((~manter).sum())
+                # Ids acima do maior existente podem ser reaproveitados pelo banco depois de exclusões.
+                self._marca = max_id
+                if len(self._colunas[0]) != total:
+                    self._colunas = _ler_historico(" WHERE t.id <= %s", (max_id,))
+                    self.recargas += 1
+            if self._frame is None or versao != self._versao or rotulos is not self._rotulos:
+                self._frame = _frame_historico(self._colunas, rotulos)
+                self._rotulos = rotulos
+            self._versao = versao
+            return self._frame
+    def stats(self):
+        with self._lock:
+            return {
+                "versao": self._versao,
+                "trocas": 0 if self._colunas is None else len(self._colunas[0]),
+                "marca_dagua": self._marca,
+                "recargas": self.recargas,
+                "atualizacoes": self.atualizacoes,
+                "exclusoes": self.exclusoes,
+            }
+def _juntar_historico(novas, atuais):
+    """Junta trocas novas ao retrato mantendo a ordem (data desc, id desc)."""
+    import numpy as np
+    if not len(atuais[0]) or (novas[1][-1], novas[0][-1]) >= (atuais[1][0], atuais[0][0]):
+        # Caso comum: as trocas novas são todas mais recentes que o retrato.
+        return tuple(np.concatenate([n, a]) for n, a in zip(novas, atuais))
+    juntas = tuple(np.concatenate([a, n]) for n, a in zip(novas, atuais))
+    ordem = np.lexsort((juntas[0], juntas[1]))[::-1]
+    return tuple(coluna[ordem] for coluna in juntas)
+_snapshots = PorTenant(ChangeLogSnapshot)
+def get_change_log_snapshot():
+    """Retrato do histórico do tenant corrente (um por tenant no processo)."""
+    return _snapshots.get()
+def get_change_logs_snapshot(categoria=None, setor=None, mes=None):
+    """Mesmo resultado de get_change_logs, filtrado em memória sobre o retrato incremental.
+
+    Sem mudanças no banco desde a última leitura, o custo é uma única consulta
+    à versão dos dados. O DataFrame devolvido é compartilhado: não o altere.
+    """
+    df = get_change_log_snapshot().refresh()
+    if df is None:
+        return None
+    return filtrar_historico(df, categoria, setor, mes)
+def filtrar_historico(df, categoria=None, setor=None, mes=None):
+    """Aplica os filtros do dashboard (None significa 'Todos') a um DataFrame do histórico."""
+    condicoes = []
+    if categoria:
+        condicoes.append(df['Categoria'] == categoria)
+    if setor:
+        condicoes.append(df['Setor'] == setor)
+    if mes:
+        import pandas as pd
+        inicio, fim = month_range(mes)
+        condicoes.append((df['Data'] >= pd.Timestamp(inicio)) & (df['Data'] < pd.Timestamp(fim)))
+    if not condicoes:
+        return df
+    mascara = condicoes[0]
+    for condicao in condicoes[1:]:
+        mascara &= condicao
+    return df[mascara].reset_index(drop=True)
+# --- DASHBOARD SOBRE O RETRATO ---
+# A cada rerun o dashboard pede o retrato uma única vez (uma consulta à versão dos
+# dados quando nada mudou) e monta filtros, contagens, gráficos e a página do
+# histórico em memória, com os mesmos formatos das consultas do rollup e de
+# get_change_logs_page. Só a busca textual continua indo ao banco (índice trocas_busca).
+def opcoes_filtros(df):
+    """Categorias, setores e meses ('AAAA-MM', do mais recente) presentes no histórico."""
+    import numpy as np
+    meses = np.unique(df['Data'].to_numpy().astype('datetime64[M]'))[::-1]
+    return {
+        'categorias': sorted(df.loc[df['ID Suprimento'] > 0, 'Categoria'].unique()),
+        'setores': sorted(df.loc[df['ID Setor'] > 0, 'Setor'].unique()),
+        'meses': [str(mes) for mes in meses],
+    }
+def contagens_por(df, coluna):
+    """Total de trocas por Setor/Equipamento/Suprimento/Categoria/Tipo, do maior para o menor."""
+    contagem = df[coluna].value_counts()
+    return [{coluna: rotulo, 'total': int(total)} for rotulo, total in contagem.items() if total > 0]
+def contagens_por_mes(df):
+    """Total de trocas por mês ('AnoMês'), em ordem cronológica."""
+    import numpy as np
+    meses, totais = np.unique(df['Data'].to_numpy().astype('datetime64[M]'), return_counts=True)
+    return [{'AnoMês': str(mes), 'total': int(total)} for mes, total in zip(meses, totais)]
+def pagina_historico(df, sort_by='Data', ascending=False, limit=50, offset=0):
+    """Uma página do histórico ordenada como em get_change_logs_page (o id desempata)."""
+    import numpy as np
+    if sort_by not in COLUNAS_HISTORICO:
+        sort_by = 'Data'
+    if sort_by == 'Data':
+        # O retrato já vem em (data desc, id desc).
+        posicoes = np.arange(len(df))
+    else:
+        coluna = df[sort_by]
+        chave = coluna.cat.codes.to_numpy() if coluna.dtype == 'category' else coluna.to_numpy()
+        posicoes = np.lexsort((df['ID Troca'].to_numpy(), chave))[::-1]
+    if ascending:
+        posicoes = posicoes[::-1]
+    return df.iloc[posicoes[int(offset):int(offset) + int(limit)]][list(COLUNAS_HISTORICO)].reset_index(drop=True)
+COLUNAS_EXPORTACAO = ['Data', 'Setor', 'Equipamento', 'Suprimento', 'Categoria', 'Tipo', 'Observação']
+def export_query(categoria=None, setor=None, mes=None, busca=None):
+    """Consulta (sql, params) com todas as trocas filtradas, nas colunas da exportação."""
+    where, params = _where_filtros(categoria, setor, mes, busca)
+    select = ", ".join(f"{COLUNAS_HISTORICO[col]} AS `{col}`" for col in COLUNAS_EXPORTACAO)
+    return f"SELECT {select} {_FROM_TROCAS}{where} ORDER BY t.data_troca DESC, t.id DESC;", params
+# --- REGISTRO E EXCLUSÃO DE TROCAS ---
+# As operações só executam os comandos; quem chama faz commit_changes() ou
+# rollback_changes(), como nas demais escritas da aplicação. Os comandos usam
+# execute_strict: um passo que falha levanta a exceção e nenhum dos seguintes roda.
+def registrar_troca(usuario_id, equipamento_id, suprimento_id, data_troca, observacao):
+    """Insere uma troca, baixa o suprimento do estoque e atualiza o rollup mensal e a busca na mesma transação.
+
+    Devolve o id da troca inserida.
+    """
+    query = "INSERT INTO trocas_cartucho (usuario_id, equipamento_id, data_troca, suprimento_id, observacao) VALUES (%s, %s, %s, %s, %s);"
+    log_id = execute_strict(query, (usuario_id, equipamento_id, data_troca, suprimento_id, observacao))
+    if log_id is None:
+        # Sem o id os passos seguintes (estoque, rollup, busca) ficariam sem a troca.
+        raise RuntimeError("A troca não foi gravada.")
+    if suprimento_id:
+        registrar_saida_troca(suprimento_id, log_id)
+    increment_rollup(usuario_id, equipamento_id, suprimento_id, data_troca)
+    indexar_trocas('id', [log_id])
+    return log_id
+class CadastroEmUsoError(Exception):
+    """Exclusão sem trocas pedida, mas os itens têm trocas (`trocas`) no banco."""
+    def __init__(self, trocas):
+        super().__init__(f"Os itens selecionados têm {trocas} troca(s) registrada(s).")
+        self.trocas = trocas
+def apagar_cadastros(tabela, ids, sem_trocas=False):
+    """Remove setores/equipamentos/suprimentos e todas as suas trocas, com um comando por tabela.
+
+    O rollup e a busca perdem as trocas apagadas. O estoque não é estornado: o
+    consumo aconteceu. Ao apagar setores ou equipamentos, os movimentos das suas
+    trocas ficam no livro-razão sem a troca (troca_id NULL); ao apagar suprimentos,
+    o saldo e todo o livro-razão do item saem junto (ON DELETE CASCADE em
+    estoque_saldos e estoque_movimentos).
+    Com `sem_trocas`, levanta CadastroEmUsoError se os itens tiverem alguma troca,
+    contada na própria transação (a contagem das listas vem do cache e não vê trocas
+    gravadas pela API, pela importação em lote ou por outro processo).
+    """
+    coluna = CADASTROS[tabela]
+    ids = tuple(int(i) for i in ids)
+    if not ids: return
+    marcadores = ", ".join(["%s"] * len(ids))
+    delete_rollup_for(coluna, ids)
+    if sem_trocas:
+        # A escrita acima já abriu a transação: a contagem roda nela e trava as trocas desses itens até o commit.
+        row = execute_strict(f"SELECT COUNT(*) AS total FROM trocas_cartucho WHERE {coluna} IN ({marcadores}) FOR UPDATE;", ids, fetch="one")
+        if row and row['total']:
+            raise CadastroEmUsoError(int(row['total']))
+    remover_da_busca(coluna, ids)
+    execute_strict(f"DELETE FROM trocas_cartucho WHERE {coluna} IN ({marcadores});", ids)
+    execute_strict(f"DELETE FROM {tabela} WHERE id IN ({marcadores});", ids)
+def apagar_troca(log_id):
+    """Remove uma troca, a desconta do rollup mensal e da busca e devolve o suprimento ao estoque na mesma transação."""
+    decrement_rollup_for_log(log_id)
+    estornar_troca(log_id)
+    remover_da_busca('id', [log_id])
+    execute_strict("DELETE FROM trocas_cartucho WHERE id = %s;", (log_id,))
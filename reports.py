@@ -0,0 +1,362 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from pathlib import Path
+from rollup import count_rollup, count_rollup_by, count_rollup_by_month
+from settings import section, tenants
+from tenants import PADRAO, PorTenant, definir_tenant, tenant_atual, usando_tenant
+# --- RELATÓRIOS MENSAIS DE CONSUMO POR SETOR ---
+# Para cada mês fechado é gerado um relatório por setor com trocas no mês e um
+# geral, com os mesmos gráficos do dashboard (barras, pizza e linha). Os dados
+# vêm do rollup e são lidos por uma thread do agendador; a montagem dos arquivos
+# (openpyxl para XLSX, Plotly + kaleido para PDF) roda num pool de processos, fora
+# das threads que atendem as sessões. Os arquivos ficam em [reports] dir/AAAA-MM/,
+# com um manifesto.json por mês, e só os [reports] meses meses fechados mais
+# recentes são mantidos. Um mês é refeito quando o seu total de trocas no rollup
+# muda (ex.: trocas registradas com data retroativa).
+# A página "Relatórios" apenas lista e baixa os arquivos.
+# Cada tenant tem o seu agendador e a sua pasta (por padrão relatorios/<tenant>/;
+# a do tenant padrão continua sendo relatorios/).
+# Geração manual: python reports.py [--mes AAAA-MM] [--forcar] [--tenant ID | --todos]
+_logger = logging.getLogger(__name__)
+FORMATOS_RELATORIO = {
+    "XLSX": {"extensao": "xlsx", "mime": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "modulo": "openpyxl"},
+    "PDF": {"extensao": "pdf", "mime": "application/pdf", "modulo": "kaleido"},
+}
+MANIFESTO = "manifesto.json"
+_TRAVA = ".gerando"
+_MES_RE = re.compile(r"^\d{4}-\d{2}$")
+def _config():
+    cfg = section("reports")
+    tenant = tenant_atual()
+    return {
+        "dir": Path(cfg.get("dir", "relatorios" if tenant == PADRAO else f"relatorios/{tenant}")),
+        "meses": int(cfg.get("meses", 6)),
+        "workers": int(cfg.get("workers", 2)),
+        "intervalo": float(cfg.get("intervalo", 3600)),
+        "atraso_inicial": float(cfg.get("atraso_inicial", 60)),
+        "formatos": list(cfg.get("formatos", list(FORMATOS_RELATORIO))),
+    }
+def formatos_disponiveis(formatos=None):
+    """Formatos pedidos cujas bibliotecas estão instaladas."""
+    import importlib.util
+    return [f for f in (formatos or FORMATOS_RELATORIO) if f in FORMATOS_RELATORIO and importlib.util.find_spec(FORMATOS_RELATORIO[f]["modulo"])]
+def _slug(texto):
+    texto = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", "-", texto.lower()).strip("-") or "setor"
+def _mes_anterior(ano_mes):
+    ano, mes = map(int, ano_mes.split("-"))
+    return f"{ano - 1}-12" if mes == 1 else f"{ano}-{mes - 1:02d}"
+def meses_fechados(quantidade, hoje=None):
+    """Os `quantidade` meses completos mais recentes, do mais novo para o mais antigo."""
+    mes = _mes_anterior((hoje or date.today()).strftime("%Y-%m"))
+    meses = []
+    for _ in range(quantidade):
+        meses.append(mes)
+        mes = _mes_anterior(mes)
+    return meses
+# --- DADOS (PROCESSO PRINCIPAL) ---
+def _pares(rows, coluna):
+    return [(row[coluna], int(row['total'])) for row in rows]
+def dados_relatorio(mes, setor=None, meses_tendencia=12):
+    """Tudo o que um relatório precisa, lido do rollup, em tipos simples (vai para outro processo)."""
+    grupo = 'Equipamento' if setor else 'Setor'
+    mensal = [(row['AnoMês'], int(row['total'])) for row in count_rollup_by_month(setor=setor) if row['AnoMês'] <= mes]
+    return {
+        "mes": mes,
+        "setor": setor,
+        "titulo": f"Consumo de suprimentos - {setor or 'Todos os setores'} - {datetime.strptime(mes, '%Y-%m'):%m/%Y}",
+        "total": count_rollup(setor=setor, mes=mes),
+        "grupo": grupo,
+        "por_grupo": _pares(count_rollup_by(grupo, setor=setor, mes=mes), grupo),
+        "por_tipo": _pares(count_rollup_by('Tipo', setor=setor, mes=mes), 'Tipo'),
+        "por_suprimento": _pares(count_rollup_by('Suprimento', setor=setor, mes=mes), 'Suprimento'),
+        "mensal": mensal[-meses_tendencia:],
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+    }
+# --- MONTAGEM DOS ARQUIVOS (PROCESSOS DO POOL) ---
+# Funções de módulo, sem acesso ao banco: recebem os dados prontos e gravam o arquivo.
+def _figuras(dados):
+    """Os gráficos do dashboard (px.bar, px.pie e px.line) com os dados do relatório."""
+    import pandas as pd
+    import plotly.express as px
+    grupo = dados["grupo"]
+    counts = pd.DataFrame(dados["por_grupo"], columns=[grupo, 'Total de Trocas'])
+    fig_bar = px.bar(counts, x=grupo, y='Total de Trocas', title=f"Total de Trocas por {grupo}", text='Total de Trocas')
+    fig_bar.update_traces(textposition='outside')
+    type_counts = pd.DataFrame(dados["por_tipo"], columns=['Tipo', 'Quantidade'])
+    fig_pie = px.pie(type_counts, names='Tipo', values='Quantidade', title="Proporção por Tipo de Suprimento", hole=.3)
+    monthly = pd.DataFrame(dados["mensal"], columns=['AnoMês', 'Quantidade'])
+    fig_line = px.line(monthly, x='AnoMês', y='Quantidade', title="Volume de Trocas por Mês", markers=True, labels={'AnoMês': 'Mês/Ano', 'Quantidade': 'Nº de Trocas'})
+    return fig_bar, fig_pie, fig_line
+def _gravar_pdf(dados, caminho):
+    from plotly.subplots import make_subplots
+    fig_bar, fig_pie, fig_line = _figuras(dados)
+    # Uma página (A4 paisagem) com os três gráficos: os traços de cada figura do px
+    # vão para o seu quadro.
+    fig = make_subplots(
+        rows=2, cols=2,
+        specs=[[{"type": "xy"}, {"type": "domain"}], [{"type": "xy", "colspan": 2}, None]],
+        subplot_titles=[fig_bar.layout.title.text, fig_pie.layout.title.text, fig_line.layout.title.text],
+        vertical_spacing=0.15,
+    )
+    for trace in fig_bar.data:
+        fig.add_trace(trace, row=1, col=1)
+    for trace in fig_pie.data:
+        fig.add_trace(trace, row=1, col=2)
+    for trace in fig_line.data:
+        fig.add_trace(trace, row=2, col=1)
+    fig.update_layout(title=f"{dados['titulo']} ({dados['total']} trocas)", showlegend=False, width=1123, height=794, margin={"t": 90})
+    fig.write_image(caminho, format="pdf")
+def _gravar_xlsx(dados, caminho):
+    from openpyxl import Workbook
+    from openpyxl.chart import BarChart, LineChart, PieChart, Reference
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Resumo"
+    ws.append([dados["titulo"]])
+    ws.append(["Total de trocas", dados["total"]])
+    ws.append(["Gerado em", dados["gerado_em"]])
+    # Cada tabela fica em colunas próprias e o gráfico correspondente ao lado.
+    tabelas = [
+        ("A", (dados["grupo"], "Total de Trocas"), dados["por_grupo"]),
+        ("D", ("Tipo", "Quantidade"), dados["por_tipo"]),
+        ("G", ("Mês/Ano", "Nº de Trocas"), dados["mensal"]),
+    ]
+    for coluna, cabecalho, linhas in tabelas:
+        inicio = ord(coluna) - ord("A") + 1
+        for i, valores in enumerate([cabecalho] + list(linhas), start=5):
+            for j, valor in enumerate(valores):
+                ws.cell(row=i, column=inicio + j, value=valor)
+    def referencias(coluna, n):
+        inicio = ord(coluna) - ord("A") + 1
+        return Reference(ws, min_col=inicio + 1, min_row=5, max_row=5 + n), Reference(ws, min_col=inicio, min_row=6, max_row=5 + n)
+    graficos = [
+        (BarChart(), f"Total de Trocas por {dados['grupo']}", "A", len(dados["por_grupo"])),
+        (PieChart(), "Proporção por Tipo de Suprimento", "D", len(dados["por_tipo"])),
+        (LineChart(), "Volume de Trocas por Mês", "G", len(dados["mensal"])),
+    ]
+    for posicao, (grafico, titulo, coluna, n) in enumerate(graficos):
+        if not n:
+            continue
+        valores, rotulos = referencias(coluna, n)
+        grafico.title = titulo
+        grafico.add_data(valores, titles_from_data=True)
+        grafico.set_categories(rotulos)
+        grafico.width, grafico.height = 16, 8
+        ws.add_chart(grafico, f"K{5 + posicao * 17}")
+    sup = wb.create_sheet("Suprimentos")
+    sup.append(["Suprimento", "Trocas"])
+    for linha in dados["por_suprimento"]:
+        sup.append(list(linha))
+    wb.save(caminho)
+_GRAVADORES = {"PDF": _gravar_pdf, "XLSX": _gravar_xlsx}
+def renderizar(dados, formato, caminho):
+    """Grava um relatório (roda num processo do pool). O arquivo só aparece completo no caminho final."""
+    temporario = f"{caminho}.tmp"
+    try:
+        _GRAVADORES[formato](dados, temporario)
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+    return os.path.getsize(caminho)
+# --- ARQUIVOS EM DISCO ---
+def ler_manifesto(pasta):
+    try:
+        with open(Path(pasta) / MANIFESTO, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+def _gravar_manifesto(pasta, manifesto):
+    temporario = Path(pasta) / f"{MANIFESTO}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, Path(pasta) / MANIFESTO)
+def listar_relatorios(base=None):
+    """Manifestos dos meses gerados, do mais recente para o mais antigo."""
+    base = Path(base or _config()["dir"])
+    if not base.is_dir():
+        return []
+    manifestos = [ler_manifesto(pasta) for pasta in sorted(base.iterdir(), reverse=True) if pasta.is_dir() and _MES_RE.match(pasta.name)]
+    return [m for m in manifestos if m]
+def caminho_relatorio(mes, arquivo, base=None):
+    """Caminho de um arquivo listado no manifesto (sem sair da pasta do mês)."""
+    pasta = Path(base or _config()["dir"]) / mes
+    caminho = pasta / Path(arquivo).name
+    return caminho if _MES_RE.match(mes) and caminho.is_file() else None
+def aplicar_retencao(manter, base=None):
+    """Apaga as pastas de meses fora da lista `manter`; devolve os meses apagados."""
+    base = Path(base or _config()["dir"])
+    if not base.is_dir():
+        return []
+    apagados = []
+    for pasta in base.iterdir():
+        if pasta.is_dir() and _MES_RE.match(pasta.name) and pasta.name not in manter:
+            shutil.rmtree(pasta, ignore_errors=True)
+            apagados.append(pasta.name)
+    return apagados
+def _travar(pasta, validade=3600):
+    """Trava da pasta do mês entre processos (arquivo criado com O_EXCL); False se outro já está gerando."""
+    trava = pasta / _TRAVA
+    try:
+        if time.time() - trava.stat().st_mtime > validade:
+            trava.unlink()  # trava de uma geração interrompida
+    except FileNotFoundError:
+        pass
+    try:
+        os.close(os.open(trava, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        return False
+# --- GERAÇÃO ---
+def precisa_gerar(mes, base=None):
+    """True se o mês tem trocas e ainda não tem relatório, ou se o total dele mudou."""
+    total = count_rollup(mes=mes)
+    if not total:
+        return False
+    manifesto = ler_manifesto(Path(base or _config()["dir"]) / mes)
+    return manifesto is None or manifesto.get("total") != total
+def gerar_mes(mes, executor, formatos, base=None):
+    """Gera os relatórios do mês (geral + um por setor) no pool `executor`; devolve o manifesto ou None se outro processo está gerando."""
+    pasta = Path(base or _config()["dir"]) / mes
+    pasta.mkdir(parents=True, exist_ok=True)
+    if not _travar(pasta):
+        return None
+    try:
+        setores = [row['Setor'] for row in count_rollup_by('Setor', mes=mes)]
+        itens, usados = [], set()
+        for setor in [None] + setores:
+            slug = "geral" if setor is None else _slug(setor)
+            while slug in usados:
+                slug += "-1"
+            usados.add(slug)
+            dados = dados_relatorio(mes, setor)
+            futuros = {f: executor.submit(renderizar, dados, f, str(pasta / f"{slug}.{FORMATOS_RELATORIO[f]['extensao']}")) for f in formatos}
+            itens.append(({"setor": setor, "total": dados["total"], "arquivos": {}, "erros": {}}, slug, futuros))
+        for item, slug, futuros in itens:
+            for formato, futuro in futuros.items():
+                try:
+                    futuro.result()
+                    item["arquivos"][formato] = f"{slug}.{FORMATOS_RELATORIO[formato]['extensao']}"
+                except Exception as e:
+                    item["erros"][formato] = " ".join(str(e).split())[:500]
+                    _logger.error("Relatório %s/%s (%s) falhou: %s", mes, slug, formato, e)
+        # O total do manifesto é o do mês inteiro (o do relatório geral).
+        manifesto = {
+            "mes": mes,
+            "total": itens[0][0]["total"],
+            "gerado_em": datetime.now().isoformat(timespec="seconds"),
+            "relatorios": [item for item, _, _ in itens],
+        }
+        validos = {arquivo for item, _, _ in itens for arquivo in item["arquivos"].values()}
+        for arquivo in pasta.iterdir():
+            if arquivo.is_file() and arquivo.name not in validos and arquivo.name not in (MANIFESTO, _TRAVA):
+                arquivo.unlink()  # relatórios de setores que já não têm trocas no mês
+        _gravar_manifesto(pasta, manifesto)
+        return manifesto
+    finally:
+        (pasta / _TRAVA).unlink(missing_ok=True)
+def _novo_executor(workers):
+    # spawn: os processos não herdam as threads nem as conexões do servidor.
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+class ReportScheduler:
+    """Thread que, a cada `intervalo` segundos, gera os meses pendentes e aplica a retenção."""
+    def __init__(self, cfg, tenant=PADRAO):
+        self.cfg = cfg
+        self.tenant = tenant
+        self.formatos = formatos_disponiveis(cfg["formatos"])
+        self._lock = threading.Lock()
+        self._estado = {"ultima_verificacao": None, "gerando": None, "meses_gerados": 0, "ultimo_erro": None, "formatos": self.formatos}
+        self._acordar = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="report-scheduler" if tenant == PADRAO else f"report-scheduler-{tenant}", daemon=True)
+        self._thread.start()
+    def _definir(self, **valores):
+        with self._lock:
+            self._estado.update(valores)
+    def estado(self):
+        with self._lock:
+            return dict(self._estado)
+    def verificar(self):
+        """Gera os meses fechados pendentes dentro da janela de retenção."""
+        meses = meses_fechados(self.cfg["meses"])
+        aplicar_retencao(meses, self.cfg["dir"])
+        pendentes = [mes for mes in meses if precisa_gerar(mes, self.cfg["dir"])]
+        if pendentes and self.formatos:
+            with _novo_executor(self.cfg["workers"]) as executor:
+                for mes in pendentes:
+                    self._definir(gerando=mes)
+                    if gerar_mes(mes, executor, self.formatos, self.cfg["dir"]):
+                        with self._lock:
+                            self._estado["meses_gerados"] += 1
+        self._definir(gerando=None, ultima_verificacao=datetime.now().isoformat(timespec="seconds"))
+    def _loop(self):
+        definir_tenant(self.tenant)
+        self._acordar.wait(self.cfg["atraso_inicial"])
+        while True:
+            self._acordar.clear()
+            try:
+                self.verificar()
+            except Exception as e:
+                _logger.exception("Falha no agendador de relatórios")
+                self._definir(gerando=None, ultimo_erro=f"{datetime.now():%d/%m/%Y %H:%M} {e}")
+            self._acordar.wait(self.cfg["intervalo"])
+def _criar_agendador():
+    if not section("reports").get("enabled", True):
+        return None
+    return ReportScheduler(_config(), tenant_atual())
+_schedulers = PorTenant(_criar_agendador)
+def iniciar_agendador():
+    """Liga o agendador de relatórios do tenant corrente a partir de [reports]; None se desligado."""
+    return _schedulers.get()
+def get_agendador():
+    return _schedulers.existente()
+def _gerar_pendentes(mes=None, forcar=False):
+    cfg = _config()
+    formatos = formatos_disponiveis(cfg["formatos"])
+    if not formatos:
+        print("Nenhum formato disponível: instale openpyxl (XLSX) e/ou kaleido (PDF).", file=sys.stderr)
+        return 1
+    meses = [mes] if mes else meses_fechados(cfg["meses"])
+    with _novo_executor(cfg["workers"]) as executor:
+        for mes_atual in meses:
+            if forcar or precisa_gerar(mes_atual, cfg["dir"]):
+                manifesto = gerar_mes(mes_atual, executor, formatos, cfg["dir"])
+                if manifesto is None:
+                    print(f"{mes_atual}: já está sendo gerado por outro processo.")
+                    continue
+                erros = sum(len(item["erros"]) for item in manifesto["relatorios"])
+                print(f"{mes_atual}: {len(manifesto['relatorios'])} relatórios ({manifesto['total']} trocas)" + (f", {erros} arquivo(s) com erro" if erros else "") + ".")
+    if not mes:
+        aplicar_retencao(meses, cfg["dir"])
+    return 0
+def main(argv=None):
+    from db import init_pool
+    parser = argparse.ArgumentParser(description="Gera os relatórios mensais de consumo por setor.")
+    parser.add_argument("--mes", help="Mês AAAA-MM (padrão: os meses fechados pendentes da janela de retenção).")
+    parser.add_argument("--forcar", action="store_true", help="Gera mesmo que o mês já tenha relatórios atualizados.")
+    parser.add_argument("--tenant", default=PADRAO, help="Tenant cujos relatórios são gerados ([tenants.<id>] nas secrets).")
+    parser.add_argument("--todos", action="store_true", help="Gera os relatórios de cada tenant configurado.")
+    args = parser.parse_args(argv)
+    if args.tenant not in tenants():
+        parser.error(f"tenant desconhecido: {args.tenant}")
+    alvos = list(tenants()) if args.todos else [args.tenant]
+    codigo = 0
+    for tenant in alvos:
+        if len(alvos) > 1:
+            print(f"== {tenant} ==")
+        with usando_tenant(tenant):
+            codigo = max(codigo, _gerar_pendentes(args.mes, args.forcar) if init_pool() else 1)
+    return codigo
+if __name__ == "__main__":
+    sys.exit(main())
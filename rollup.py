@@ -0,0 +1,161 @@
+import threading
+from db import begin_transaction, execute_query, execute_strict, execute_many, commit_changes, rollback_changes
+from tenants import tenant_atual
+# --- AGREGADO MENSAL DE TROCAS (ROLLUP) ---
+# Os gráficos do dashboard leem desta tabela, que guarda a contagem de trocas por
+# mês × setor × equipamento × suprimento (tipo e categoria vêm do suprimento).
+# O custo dos gráficos passa a depender do número de meses e combinações, não do
+# número de trocas. A tabela é mantida junto com cada INSERT/DELETE em
+# trocas_cartucho (na mesma transação) e pode ser reconstruída com rebuild_rollup().
+# A tabela é criada pela migração 0004_trocas_mensais.sql.
+# Setor/equipamento/suprimento ausentes na troca são gravados como 0.
+_FROM_ROLLUP = """
+        FROM trocas_mensais r
+        LEFT JOIN usuarios u ON r.usuario_id = u.id
+        LEFT JOIN equipamentos e ON r.equipamento_id = e.id
+        LEFT JOIN suprimentos s ON r.suprimento_id = s.id"""
+# Mesmos rótulos usados na tabela de histórico do dashboard.
+COLUNAS_ROLLUP = {
+    'Setor': "COALESCE(u.name, 'Setor Desconhecido')",
+    'Equipamento': "COALESCE(e.modelo, 'Não especificado')",
+    'Suprimento': "COALESCE(s.modelo, 'Não especificado')",
+    'Categoria': "COALESCE(s.categoria, 'Não definida')",
+    'Tipo': "COALESCE(s.tipo, 'Não definido')",
+}
+# Colunas de trocas_cartucho que podem originar exclusões em cascata no rollup.
+_CHAVES_ROLLUP = ('usuario_id', 'equipamento_id', 'suprimento_id')
+_rollup_lock = threading.Lock()
+_rollup_ok = set()  # tenants cujo rollup já foi conferido
+def ensure_rollup():
+    """Popula o rollup do tenant corrente na primeira execução, quando já existem trocas mas nenhum agregado."""
+    tenant = tenant_atual()
+    with _rollup_lock:
+        if tenant not in _rollup_ok and _ensure_rollup():
+            _rollup_ok.add(tenant)
+    return tenant in _rollup_ok
+def _ensure_rollup():
+    has_rollup = execute_query("SELECT EXISTS(SELECT 1 FROM trocas_mensais) AS ok;", fetch="one")
+    has_logs = execute_query("SELECT EXISTS(SELECT 1 FROM trocas_cartucho) AS ok;", fetch="one")
+    if has_rollup and has_logs and not has_rollup['ok'] and has_logs['ok']:
+        rebuild_rollup()
+    return True
+def versao_trocas():
+    """(maior id de troca, total de trocas no rollup): muda a cada inclusão ou exclusão.
+
+    Leitura barata (índice do id e a tabela pequena do rollup) para quem mantém
+    estado incremental sobre trocas_cartucho decidir se há algo novo.
+    """
+    row = execute_query("""
+        SELECT (SELECT COALESCE(MAX(id), 0) FROM trocas_cartucho) AS max_id,
+               (SELECT COALESCE(SUM(total), 0) FROM trocas_mensais) AS total;
+    """, fetch="one")
+    return (int(row['max_id']), int(row['total'])) if row else None
+def rebuild_rollup():
+    """Recalcula o rollup inteiro a partir de trocas_cartucho, numa única transação."""
+    try:
+        execute_strict("DELETE FROM trocas_mensais;")
+        execute_strict("""
+            INSERT INTO trocas_mensais (ano_mes, usuario_id, equipamento_id, suprimento_id, total)
+            SELECT DATE_FORMAT(data_troca, '%Y-%m'), COALESCE(usuario_id, 0), COALESCE(equipamento_id, 0), COALESCE(suprimento_id, 0), COUNT(*)
+            FROM trocas_cartucho
+            GROUP BY 1, 2, 3, 4;
+        """)
+        commit_changes()
+    except Exception:
+        rollback_changes()
+        raise
+def increment_rollup(usuario_id, equipamento_id, suprimento_id, data_troca, delta=1):
+    """Soma `delta` à contagem do mês da troca. Deve rodar na transação do INSERT."""
+    execute_strict(
+        """
+        INSERT INTO trocas_mensais (ano_mes, usuario_id, equipamento_id, suprimento_id, total)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE total = total + VALUES(total);
+        """,
+        (data_troca.strftime('%Y-%m'), usuario_id or 0, equipamento_id or 0, suprimento_id or 0, delta),
+    )
+def increment_rollup_many(contagens):
+    """Versão em lote de increment_rollup: {(ano_mes, usuario_id, equipamento_id, suprimento_id): quantidade}."""
+    execute_many(
+        """
+        INSERT INTO trocas_mensais (ano_mes, usuario_id, equipamento_id, suprimento_id, total)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE total = total + VALUES(total);
+        """,
+        [(ano_mes, u or 0, e or 0, s or 0, qtd) for (ano_mes, u, e, s), qtd in contagens.items()],
+    )
+def decrement_rollup_for_log(log_id):
+    """Desconta uma troca do rollup. Deve rodar na transação, antes do DELETE da troca."""
+    # FOR UPDATE: duas exclusões simultâneas da mesma troca não descontam duas vezes.
+    # É o primeiro comando de apagar_troca, então a transação é aberta antes: em
+    # autocommit a trava acabaria junto com a leitura.
+    begin_transaction()
+    troca = execute_strict("SELECT usuario_id, equipamento_id, suprimento_id, data_troca FROM trocas_cartucho WHERE id = %s FOR UPDATE;", (log_id,), fetch="one")
+    if not troca:
+        return
+    chave = (troca['data_troca'].strftime('%Y-%m'), troca['usuario_id'] or 0, troca['equipamento_id'] or 0, troca['suprimento_id'] or 0)
+    execute_strict("UPDATE trocas_mensais SET total = total - 1 WHERE ano_mes = %s AND usuario_id = %s AND equipamento_id = %s AND suprimento_id = %s;", chave)
+    execute_strict("DELETE FROM trocas_mensais WHERE ano_mes = %s AND usuario_id = %s AND equipamento_id = %s AND suprimento_id = %s AND total <= 0;", chave)
+def delete_rollup_for(coluna, valores):
+    """Remove do rollup as contagens dos setores/equipamentos/suprimentos apagados com seus registros."""
+    if coluna not in _CHAVES_ROLLUP:
+        raise ValueError(f"Coluna de rollup inválida: {coluna}")
+    valores = list(valores)
+    if valores:
+        execute_strict(f"DELETE FROM trocas_mensais WHERE {coluna} IN ({', '.join(['%s'] * len(valores))});", tuple(valores))
+# --- CONSULTAS DOS GRÁFICOS ---
+def _where_rollup(categoria=None, setor=None, mes=None):
+    clauses, params = ["r.total > 0"], []
+    if categoria:
+        clauses.append("s.categoria = %s")
+        params.append(categoria)
+    if setor:
+        clauses.append("u.name = %s")
+        params.append(setor)
+    if mes:
+        clauses.append("r.ano_mes = %s")
+        params.append(mes)
+    return " WHERE " + " AND ".join(clauses), tuple(params)
+def get_rollup_filter_options():
+    """Valores disponíveis nos filtros de Categoria, Setor e Mês/Ano."""
+    categorias = execute_query(f"""
+        SELECT DISTINCT s.categoria {_FROM_ROLLUP}
+        WHERE r.total > 0 AND s.categoria IS NOT NULL
+        ORDER BY s.categoria;
+    """, fetch="all") or []
+    setores = execute_query(f"""
+        SELECT DISTINCT u.name {_FROM_ROLLUP}
+        WHERE r.total > 0 AND u.name IS NOT NULL
+        ORDER BY u.name;
+    """, fetch="all") or []
+    meses = execute_query("SELECT DISTINCT ano_mes FROM trocas_mensais WHERE total > 0 ORDER BY ano_mes DESC;", fetch="all") or []
+    return {
+        'categorias': [row['categoria'] for row in categorias],
+        'setores': [row['name'] for row in setores],
+        'meses': [row['ano_mes'] for row in meses],
+    }
+def count_rollup(categoria=None, setor=None, mes=None):
+    """Quantidade de trocas que atendem aos filtros."""
+    where, params = _where_rollup(categoria, setor, mes)
+    result = execute_query(f"SELECT COALESCE(SUM(r.total), 0) AS total {_FROM_ROLLUP}{where};", params, fetch="one")
+    return int(result['total']) if result else 0
+def count_rollup_by(coluna, categoria=None, setor=None, mes=None):
+    """Total de trocas por Setor/Equipamento/Suprimento/Categoria/Tipo."""
+    expr = COLUNAS_ROLLUP[coluna]
+    where, params = _where_rollup(categoria, setor, mes)
+    query = f"SELECT {expr} AS `{coluna}`, CAST(SUM(r.total) AS SIGNED) AS total {_FROM_ROLLUP}{where} GROUP BY 1 ORDER BY total DESC;"
+    return execute_query(query, params, fetch="all") or []
+def count_rollup_by_month(categoria=None, setor=None, mes=None):
+    """Total de trocas por mês ('AnoMês'), em ordem cronológica."""
+    where, params = _where_rollup(categoria, setor, mes)
+    query = f"SELECT r.ano_mes AS `AnoMês`, CAST(SUM(r.total) AS SIGNED) AS total {_FROM_ROLLUP}{where} GROUP BY 1 ORDER BY 1;"
+    return execute_query(query, params, fetch="all") or []
+def count_rollup_by_month_and_supply():
+    """Total de trocas por mês e id de suprimento, base da previsão de consumo."""
+    query = "SELECT ano_mes, suprimento_id, CAST(SUM(total) AS SIGNED) AS total FROM trocas_mensais WHERE total > 0 AND suprimento_id <> 0 GROUP BY 1, 2;"
+    return execute_query(query, fetch="all")
+if __name__ == "__main__":
+    # Reconstrução em lote: python rollup.py
+    rebuild_rollup()
+    total = count_rollup()
+    print(f"Rollup reconstruído: {total} trocas agregadas.")
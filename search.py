@@ -0,0 +1,91 @@
+import re
+from db import execute_strict, get_backend, commit_changes, rollback_changes
+# --- BUSCA TEXTUAL NO HISTÓRICO ---
+# trocas_busca guarda, para cada troca, um texto com a observação, os modelos do
+# equipamento e do suprimento, o tipo, a categoria e o setor. No MariaDB é uma
+# tabela com índice FULLTEXT e no SQLite uma tabela virtual FTS5 (rowid = id da
+# troca); as duas são criadas e populadas pela migração 0006_trocas_busca.sql.
+# Como o rollup, o índice é mantido pela aplicação na mesma transação de cada
+# INSERT/DELETE em trocas_cartucho (com execute_strict: uma falha no índice desfaz
+# a escrita inteira) e pode ser reconstruído com rebuild_busca().
+# A busca vira uma condição "t.id IN (...)" combinada com os demais filtros do
+# histórico no banco, de modo que a paginação e a ordenação continuam lá.
+# Coluna com o id da troca e condição de busca em cada backend.
+_DIALETOS = {
+    "mariadb": {"id": "troca_id", "casar": "MATCH(texto) AGAINST (%s IN BOOLEAN MODE)"},
+    "sqlite": {"id": "rowid", "casar": "trocas_busca MATCH %s"},
+}
+# Palavras menores que isto não entram no índice FULLTEXT do InnoDB
+# (innodb_ft_min_token_size); no MariaDB elas são procuradas com LIKE.
+_MIN_PALAVRA_FULLTEXT = 3
+_TEXTO_BUSCA = """
+    SELECT t.id, CONCAT_WS(' ', t.observacao, e.modelo, s.modelo, s.tipo, s.categoria, u.name)
+    FROM trocas_cartucho t
+    LEFT JOIN usuarios u ON t.usuario_id = u.id
+    LEFT JOIN equipamentos e ON t.equipamento_id = e.id
+    LEFT JOIN suprimentos s ON t.suprimento_id = s.id"""
+# Colunas de trocas_cartucho pelas quais as trocas podem ser reindexadas ou removidas.
+_CHAVES_BUSCA = ('id', 'usuario_id', 'equipamento_id', 'suprimento_id')
+def _dialeto():
+    return _DIALETOS[get_backend().name]
+def palavras(termo):
+    """Palavras do termo de busca, em minúsculas."""
+    return re.findall(r"\w+", (termo or "").lower())
+def busca_clause(termo):
+    """Condição (sql, params) "t.id IN (...)" das trocas que contêm todas as palavras do termo (prefixos valem)."""
+    dialeto = _dialeto()
+    termos = palavras(termo)
+    if get_backend().name == "sqlite":
+        # FTS5: palavras separadas por espaço são combinadas com AND; "x"* casa prefixos.
+        condicoes, params = [dialeto["casar"]], [" ".join(f'"{p}"*' for p in termos)]
+    else:
+        longas = [p for p in termos if len(p) >= _MIN_PALAVRA_FULLTEXT]
+        curtas = [p for p in termos if len(p) < _MIN_PALAVRA_FULLTEXT]
+        condicoes, params = [], []
+        if longas:
+            condicoes.append(dialeto["casar"])
+            params.append(" ".join(f"+{p}*" for p in longas))
+        for p in curtas:
+            condicoes.append("texto LIKE %s")
+            params.append(f"%{p}%")
+    return f"t.id IN (SELECT {dialeto['id']} FROM trocas_busca WHERE {' AND '.join(condicoes)})", tuple(params)
+def _ids_em(coluna, valores):
+    if coluna not in _CHAVES_BUSCA:
+        raise ValueError(f"Coluna de busca inválida: {coluna}")
+    return f"t.{coluna} IN ({', '.join(['%s'] * len(valores))})", tuple(valores)
+def indexar_trocas(coluna, valores):
+    """Inclui no índice as trocas com `coluna` em `valores` que ainda não estão nele. Deve rodar na transação do INSERT."""
+    valores = list(valores)
+    if not valores:
+        return
+    id_busca = _dialeto()["id"]
+    where, params = _ids_em(coluna, valores)
+    execute_strict(f"INSERT INTO trocas_busca ({id_busca}, texto){_TEXTO_BUSCA} WHERE {where} AND NOT EXISTS (SELECT 1 FROM trocas_busca b WHERE b.{id_busca} = t.id);", params)
+def indexar_novas(desde_id):
+    """Inclui no índice as trocas com id maior que `desde_id` (cargas em lote)."""
+    id_busca = _dialeto()["id"]
+    execute_strict(f"INSERT INTO trocas_busca ({id_busca}, texto){_TEXTO_BUSCA} WHERE t.id > %s AND NOT EXISTS (SELECT 1 FROM trocas_busca b WHERE b.{id_busca} = t.id);", (desde_id,))
+def remover_da_busca(coluna, valores):
+    """Tira do índice as trocas com `coluna` em `valores`. Deve rodar na transação, antes do DELETE das trocas."""
+    valores = list(valores)
+    if not valores:
+        return
+    where, params = _ids_em(coluna, valores)
+    execute_strict(f"DELETE FROM trocas_busca WHERE {_dialeto()['id']} IN (SELECT t.id FROM trocas_cartucho t WHERE {where});", params)
+def reindexar(coluna, valores):
+    """Refaz o texto das trocas de setores/equipamentos/suprimentos renomeados."""
+    remover_da_busca(coluna, valores)
+    indexar_trocas(coluna, valores)
+def rebuild_busca():
+    """Recalcula o índice inteiro a partir de trocas_cartucho, numa única transação."""
+    try:
+        execute_strict("DELETE FROM trocas_busca;")
+        indexar_novas(0)
+        commit_changes()
+    except Exception:
+        rollback_changes()
+        raise
+if __name__ == "__main__":
+    # Reconstrução em lote: python search.py
+    rebuild_busca()
+    print("Índice de busca reconstruído.")
@@ -0,0 +1,102 @@
+import os
+import sys
+import threading
+import tomllib
+from pathlib import Path
+from tenants import PADRAO, tenant_atual
+# --- CONFIGURAÇÃO (SECRETS) ---
+# Dentro do Streamlit as configurações vêm de st.secrets. Fora dele (API, CLIs)
+# o mesmo secrets.toml é lido direto com tomllib, sem importar o Streamlit: primeiro
+# ~/.streamlit/secrets.toml e depois .streamlit/secrets.toml do projeto, que tem
+# prioridade, como o Streamlit faz. SECRETS_FILE aponta para outro arquivo.
+_lock = threading.Lock()
+_secrets = None
+def _secrets_files():
+    if os.environ.get("SECRETS_FILE"):
+        return [Path(os.environ["SECRETS_FILE"])]
+    return [Path.home() / ".streamlit" / "secrets.toml", Path.cwd() / ".streamlit" / "secrets.toml"]
+def _merge(base, extra):
+    for chave, valor in extra.items():
+        if isinstance(valor, dict) and isinstance(base.get(chave), dict):
+            _merge(base[chave], valor)
+        else:
+            base[chave] = valor
+    return base
+def _in_streamlit():
+    if "streamlit" not in sys.modules:
+        return False
+    from streamlit import runtime
+    return runtime.exists()
+def get_secrets():
+    """Configurações da aplicação como mapeamento de seções ({'connections': {...}, ...})."""
+    global _secrets
+    if _in_streamlit():
+        import streamlit as st
+        return st.secrets
+    with _lock:
+        if _secrets is None:
+            secrets = {}
+            for path in _secrets_files():
+                if path.is_file():
+                    with path.open("rb") as f:
+                        _merge(secrets, tomllib.load(f))
+            _secrets = secrets
+        return _secrets
+def _copia(valor):
+    if hasattr(valor, "items"):
+        return {chave: _copia(v) for chave, v in valor.items()}
+    return valor
+def section(nome, tenant=None):
+    """Uma seção das secrets ({} se não existir), com as sobreposições de [tenants.<tenant>.<nome>].
+
+    Sem `tenant`, vale o tenant da operação corrente.
+    """
+    base = get_secrets().get(nome, {})
+    extra = tenant_config(tenant or tenant_atual()).get(nome)
+    if not hasattr(extra, "items"):
+        return base
+    return _merge(_copia(base), _copia(extra))
+# --- TENANTS ---
+# [tenants] lista os órgãos servidos pela instalação:
+#   [tenants.camara]
+#   nome = "Câmara Municipal"
+#   hosts = ["suprimentos.camara.exemplo.gov.br"]
+#   [tenants.camara.connections.mariadb]
+#   database = "suprimentos_camara"
+# Valores simples (nome, hosts) descrevem o tenant; tabelas sobrepõem a seção de
+# mesmo nome do nível superior. O tenant padrão (PADRAO) usa as configurações de
+# nível superior e sempre existe; [tenants.default] só lhe dá um nome.
+# O tenant é escolhido pelo host. Opções gerais também ficam em [tenants]:
+# por_parametro = true libera a escolha pelo parâmetro ?tenant= da URL (interface)
+# e pelo cabeçalho X-Tenant (API), para instalações sem um host por órgão; fica
+# desligado por padrão porque qualquer um poderia trocar de órgão pela URL.
+def tenant_config(tenant):
+    """Tabela [tenants.<tenant>] ({} se não existir)."""
+    valor = get_secrets().get("tenants", {}).get(tenant, {})
+    return valor if hasattr(valor, "items") else {}
+def tenants():
+    """Tenants configurados, {id: nome}, começando pelo padrão."""
+    configurados = {chave: valor for chave, valor in get_secrets().get("tenants", {}).items() if hasattr(valor, "items")}
+    nomes = {PADRAO: configurados.get(PADRAO, {}).get("nome", "Padrão")}
+    nomes.update({chave: valor.get("nome", chave) for chave, valor in configurados.items() if chave != PADRAO})
+    return nomes
+def tenant_do_host(host):
+    """Tenant cujo `hosts` contém o host informado (sem a porta), ou None."""
+    host = (host or "").split(":")[0].lower()
+    for chave, valor in get_secrets().get("tenants", {}).items():
+        if hasattr(valor, "items") and host in [h.lower() for h in valor.get("hosts", [])]:
+            return chave
+    return None
+def resolver_tenant(host=None, parametro=None):
+    """Tenant de uma sessão ou requisição: pelo host; senão pelo parâmetro (só com [tenants] por_parametro = true); senão o padrão.
+
+    Levanta ValueError para um tenant que não está configurado.
+    """
+    tenant = tenant_do_host(host)
+    if tenant:
+        return tenant
+    if parametro and get_secrets().get("tenants", {}).get("por_parametro", False):
+        if parametro not in tenants():
+            raise ValueError(f"Tenant desconhecido: {parametro}.")
+        return parametro
+    return PADRAO
@@ -0,0 +1,129 @@
+import argparse
+import sys
+import time
+from datetime import date
+import numpy as np
+from db import init_pool, execute_query, execute_many, commit_changes, rollback_changes
+from migrate import ensure_schema
+from queries import TIPOS_POR_CATEGORIA
+from rollup import rebuild_rollup
+from search import rebuild_busca
+from settings import tenants
+from tenants import PADRAO, definir_tenant
+# --- GERADOR DE DADOS SINTÉTICOS ---
+# Popula o banco configurado (normalmente um SQLite local) com setores,
+# equipamentos, suprimentos e milhões de trocas para medir o dashboard em escala.
+# As trocas são sorteadas de forma vetorizada com numpy: poucos setores e
+# equipamentos concentram a maior parte das trocas (distribuição de Zipf), cada
+# troca usa um suprimento da categoria do equipamento e as datas cobrem os
+# últimos `anos` anos; parte das trocas recebe uma observação de uma lista fixa,
+# para que a busca textual tenha o que encontrar. A gravação é feita em lotes com executemany, cada lote na
+# sua transação, e o rollup mensal e o índice de busca são reconstruídos no fim.
+# Uso: python synthetic_data.py --trocas 1000000 [--setores 40] [--equipamentos 400] [--suprimentos 120] [--anos 5] [--seed 42] [--limpar]
+TABELAS = ("estoque_movimentos", "estoque_saldos", "trocas_mensais", "trocas_busca", "trocas_cartucho", "equipamentos", "suprimentos", "usuarios")
+# Muda quando a mesma semente passa a gerar dados diferentes (bancos de benchmark são refeitos).
+VERSAO_GERADOR = 2
+OBSERVACOES = [
+    "Impressão falhada, cartucho substituído antes do fim",
+    "Manutenção preventiva do equipamento",
+    "Toner vazando na bandeja",
+    "Troca solicitada pela chefia do setor",
+    "Atolamento de papel recorrente",
+    "Cilindro riscando as folhas",
+    "Cor magenta fraca nas impressões",
+    "Substituição programada",
+]
+def _pesos_zipf(n, expoente=1.1):
+    pesos = 1.0 / np.arange(1, n + 1) ** expoente
+    return pesos / pesos.sum()
+def _inserir(query, linhas, tabela):
+    """Insere as linhas e devolve os ids gerados, em ordem de inserção."""
+    anterior = execute_query(f"SELECT COALESCE(MAX(id), 0) AS id FROM {tabela};", fetch="one")['id']
+    try:
+        execute_many(query, linhas)
+        commit_changes()
+    except Exception:
+        rollback_changes()
+        raise
+    return [row['id'] for row in execute_query(f"SELECT id FROM {tabela} WHERE id > %s ORDER BY id;", (anterior,), fetch="all")]
+def limpar():
+    """Apaga todos os dados das tabelas da aplicação."""
+    try:
+        for tabela in TABELAS:
+            execute_query(f"DELETE FROM {tabela};")
+        commit_changes()
+    except Exception:
+        rollback_changes()
+        raise
+def gerar_cadastros(rng, setores, equipamentos, suprimentos):
+    """Cria os cadastros e devolve (ids, setores e categorias dos equipamentos, ids de suprimento por categoria)."""
+    categorias = list(TIPOS_POR_CATEGORIA)
+    setor_ids = _inserir("INSERT INTO usuarios (name) VALUES (%s);", [(f"Setor {i:03d}",) for i in range(1, setores + 1)], "usuarios")
+    linhas_sup = []
+    for i in range(suprimentos):
+        categoria = categorias[i % len(categorias)]
+        tipos = TIPOS_POR_CATEGORIA[categoria]
+        linhas_sup.append((f"SUP-{i // len(categorias):04d}", categoria, tipos[(i // len(categorias)) % len(tipos)]))
+    sup_ids = _inserir("INSERT INTO suprimentos (modelo, categoria, tipo) VALUES (%s, %s, %s);", linhas_sup, "suprimentos")
+    sup_por_categoria = {c: np.array([i for i, (_, cat, _) in zip(sup_ids, linhas_sup) if cat == c]) for c in categorias}
+    eq_setor = rng.choice(setor_ids, size=equipamentos, p=_pesos_zipf(setores, 0.8))
+    eq_categoria = rng.integers(0, len(categorias), size=equipamentos)
+    linhas_eq = [(f"Impressora {i:04d}", int(s), categorias[c]) for i, (s, c) in enumerate(zip(eq_setor, eq_categoria), start=1)]
+    eq_ids = _inserir("INSERT INTO equipamentos (modelo, setor_id, categoria) VALUES (%s, %s, %s);", linhas_eq, "equipamentos")
+    return np.array(eq_ids), eq_setor, eq_categoria, [sup_por_categoria[c] for c in categorias]
+def gerar_trocas(rng, n, eq_ids, eq_setor, eq_categoria, sup_por_categoria, anos):
+    """Sorteia `n` trocas como arrays (setor, equipamento, data, suprimento, observação)."""
+    escolhido = rng.choice(len(eq_ids), size=n, p=_pesos_zipf(len(eq_ids)))
+    suprimento = np.zeros(n, dtype=np.int64)
+    for c, ids in enumerate(sup_por_categoria):
+        mascara = eq_categoria[escolhido] == c
+        suprimento[mascara] = rng.choice(ids, size=int(mascara.sum()))
+    hoje = np.datetime64(date.today(), "D")
+    datas = hoje - rng.integers(0, 365 * anos, size=n).astype("timedelta64[D]")
+    observacao = np.where(rng.random(n) < 0.15, np.array(OBSERVACOES, dtype=object)[rng.integers(0, len(OBSERVACOES), size=n)], None)
+    return eq_setor[escolhido], eq_ids[escolhido], datas, suprimento, observacao
+def gravar_trocas(setor, equipamento, datas, suprimento, observacao, lote=50000, progresso=None):
+    """Grava as trocas em lotes de `lote` linhas, cada lote numa transação."""
+    n = len(setor)
+    for inicio in range(0, n, lote):
+        fim = min(inicio + lote, n)
+        linhas = list(zip(setor[inicio:fim].tolist(), equipamento[inicio:fim].tolist(), datas[inicio:fim].tolist(), suprimento[inicio:fim].tolist(), observacao[inicio:fim].tolist()))
+        try:
+            execute_many("INSERT INTO trocas_cartucho (usuario_id, equipamento_id, data_troca, suprimento_id, observacao) VALUES (%s, %s, %s, %s, %s);", linhas, batch_size=lote)
+            commit_changes()
+        except Exception:
+            rollback_changes()
+            raise
+        if progresso:
+            progresso(fim, n)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Popula o banco com dados sintéticos para benchmarks.")
+    parser.add_argument("--trocas", type=int, default=100000)
+    parser.add_argument("--setores", type=int, default=40)
+    parser.add_argument("--equipamentos", type=int, default=400)
+    parser.add_argument("--suprimentos", type=int, default=120)
+    parser.add_argument("--anos", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--limpar", action="store_true", help="Apaga os dados existentes antes de gerar.")
+    parser.add_argument("--tenant", default=PADRAO, help="Tenant cujo banco é populado ([tenants.<id>] nas secrets).")
+    args = parser.parse_args(argv)
+    if args.tenant not in tenants():
+        parser.error(f"tenant desconhecido: {args.tenant}")
+    definir_tenant(args.tenant)
+    if not init_pool():
+        return 1
+    ensure_schema()
+    inicio = time.perf_counter()
+    if args.limpar:
+        limpar()
+    rng = np.random.default_rng(args.seed)
+    cadastros = gerar_cadastros(rng, args.setores, args.equipamentos, args.suprimentos)
+    trocas = gerar_trocas(rng, args.trocas, *cadastros, anos=args.anos)
+    gravar_trocas(*trocas, progresso=lambda feitas, total: print(f"\r{feitas}/{total} trocas", end="", file=sys.stderr))
+    print(file=sys.stderr)
+    rebuild_rollup()
+    rebuild_busca()
+    print(f"{args.trocas} trocas, {args.setores} setores, {args.equipamentos} equipamentos e {args.suprimentos} suprimentos gerados em {time.perf_counter() - inicio:.1f}s.")
+    return 0
+if __name__ == "__main__":
+    sys.exit(main())
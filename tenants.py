@@ -0,0 +1,65 @@
+import contextvars
+import threading
+from contextlib import contextmanager
+# --- TENANTS (VÁRIOS ÓRGÃOS NUMA MESMA INSTALAÇÃO) ---
+# Cada órgão atendido (tenant) continua com o seu próprio banco/schema, mas todos
+# são servidos pelo mesmo processo. O tenant da operação corrente fica numa
+# ContextVar: a interface o define a cada execução do script, a API a cada
+# requisição (e o threadpool do Starlette o copia para a thread que roda a
+# operação) e as threads de segundo plano o definem ao iniciar. A camada de dados
+# escolhe o pool de conexões pelo tenant corrente e cada estado mantido no
+# processo (cache de cadastros, retrato do histórico, previsão, auditoria...) é
+# guardado por tenant com PorTenant. As configurações de um tenant ficam em
+# [tenants.<id>] no secrets.toml e sobrepõem as de nível superior (ver settings.section).
+# Sem [tenants] tudo roda no tenant padrão, com as configurações de sempre.
+PADRAO = "default"
+_atual = contextvars.ContextVar("tenant", default=PADRAO)
+def tenant_atual():
+    """Tenant da operação corrente (PADRAO se nenhum foi definido)."""
+    return _atual.get()
+def definir_tenant(tenant):
+    """Define o tenant do contexto atual (a execução do script, a requisição ou a thread)."""
+    _atual.set(tenant or PADRAO)
+@contextmanager
+def usando_tenant(tenant):
+    """Executa um bloco em outro tenant e depois volta ao anterior."""
+    token = _atual.set(tenant or PADRAO)
+    try:
+        yield
+    finally:
+        _atual.reset(token)
+class PorTenant:
+    """Um objeto por tenant, criado por `fabrica()` (já no contexto do tenant) na primeira vez que é pedido.
+
+    Resultados None (ex.: banco fora do ar) não são guardados: a próxima chamada
+    tenta de novo. Cada tenant tem sua própria trava de criação, para que um banco
+    lento não segure a primeira página dos outros tenants.
+    """
+    def __init__(self, fabrica):
+        self._fabrica = fabrica
+        self._lock = threading.Lock()
+        self._travas = {}
+        self._itens = {}
+    def get(self, tenant=None):
+        tenant = tenant or tenant_atual()
+        item = self._itens.get(tenant)
+        if item is not None:
+            return item
+        with self._lock:
+            trava = self._travas.setdefault(tenant, threading.Lock())
+        with trava:
+            item = self._itens.get(tenant)
+            if item is None:
+                with usando_tenant(tenant):
+                    item = self._fabrica()
+                if item is not None:
+                    with self._lock:
+                        self._itens[tenant] = item
+        return item
+    def existente(self, tenant=None):
+        """O objeto do tenant, sem criá-lo (None se ainda não existe)."""
+        return self._itens.get(tenant or tenant_atual())
+    def itens(self):
+        """{tenant: objeto} dos tenants já em uso no processo."""
+        with self._lock:
+            return dict(self._itens)